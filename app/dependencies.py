@@ -1,12 +1,15 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
-from app.utils.database import get_clickhouse_client, get_mysql_connection
 from app.utils.redis import redis_client
-from app.services.user_service import get_user_role
+from app.utils.ttl_cache import TTLCache
+from app.services.user_service import get_cached_user_role
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from typing import Optional
-from config import APP_SECRET_KEY, APP_ALGORITHM, APP_ACCESS_TOKEN_EXPIRE_MINUTES
+import hashlib
+import time
+from config import APP_SECRET_KEY, APP_ALGORITHM, APP_ACCESS_TOKEN_EXPIRE_MINUTES, TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 
@@ -25,6 +28,26 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, APP_SECRET_KEY, algorithm=APP_ALGORITHM)
     return encoded_jwt
 
+# sha256(token) -> username của các JWT đã xác thực, hết hạn cùng lúc với token
+_token_cache = TTLCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL)
+
+def verify_token(token: str) -> str:
+    """Xác thực JWT và trả về username; kết quả được cache theo hash của token cho tới khi token hết hạn"""
+    token_key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    username = _token_cache.get(token_key)
+    if username is not None:
+        return username
+    payload = jwt.decode(token, APP_SECRET_KEY, algorithms=[APP_ALGORITHM])
+    username = payload.get("sub")
+    if username is None:
+        raise JWTError("Token has no subject")
+    ttl = TOKEN_CACHE_TTL
+    if payload.get("exp") is not None:
+        ttl = min(ttl, payload["exp"] - time.time())
+    if ttl > 0:
+        _token_cache.set(token_key, username, ttl)
+    return username
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -32,21 +55,31 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, APP_SECRET_KEY, algorithms=[APP_ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        return username
+        return verify_token(token)
     except JWTError:
         raise credentials_exception
 
-def get_admin_user(username: str = Depends(get_current_user)):
-    role = get_user_role(username)
-    if role != "superadmin":
-        raise HTTPException(status_code=403, detail="Admin access required")
-    return username
+class UserContext:
+    """
+    Thông tin user của một request, được tạo một lần cho mỗi request; role lấy từ cache ngắn hạn.
+    Quyền owner/shared của chart và dashboard được kiểm tra ngay trong query của model.
+    """
+    def __init__(self, username: str, role: Optional[str]):
+        self.username = username
+        self.role = role
+
+    @property
+    def is_admin(self) -> bool:
+        return self.role == "superadmin"
 
-def init_clients():
-    global clickhouse_client, mysql_conn
-    clickhouse_client = get_clickhouse_client()
-    mysql_conn = get_mysql_connection()
\ No newline at end of file
+async def get_user_context(request: Request, username: str = Depends(get_current_user)) -> UserContext:
+    context = getattr(request.state, "user_context", None)
+    if context is None or context.username != username:
+        context = UserContext(username, await run_in_threadpool(get_cached_user_role, username))
+        request.state.user_context = context
+    return context
+
+async def get_admin_user(user: UserContext = Depends(get_user_context)):
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return user.username
@@ -1,9 +1,36 @@
+import asyncio
+import logging
 from fastapi import FastAPI
-from app.routers import auth, chat, database_metadata, chart, dataset, dashboard, comment
-from app.dependencies import init_clients
+from fastapi.concurrency import run_in_threadpool
+from app.routers import auth, chat, database_metadata, chart, dataset, dashboard, comment, rollup, monitoring
+from app.dependencies import verify_token
+from app.model.profile import ProfileModel
+from app.services.prewarm_service import run_scheduled_prewarm
+from app.services.catalog_service import sync_redshift_catalog
+from app.services.profile_service import run_scheduled_profiling
+from app.services.rollup_service import run_scheduled_rollup_refresh
+from app.services.filter_value_service import run_scheduled_filter_value_refresh
+from app.services.query_stats_service import run_scheduled_query_stats_flush
+from app.services.health_service import run_warm_up, run_scheduled_pool_maintenance, mark_stopping, close_pools
+from app.utils.scheduler import start_periodic_task, stop_all_tasks
+from app.utils.serialization import FastJSONResponse
+from app.utils.compression import CompressionMiddleware
+from app.utils.metrics import MetricsMiddleware
+from app.utils.profiling import ProfilingMiddleware, SamplingProfiler
+from config import (
+    PREWARM_INTERVAL, COMPRESSION_MIN_SIZE, CATALOG_REFRESH_INTERVAL, DATASET_PROFILE_INTERVAL, ROLLUP_REFRESH_INTERVAL,
+    FILTER_VALUES_REFRESH_INTERVAL, SERVER_TIMING_ENABLED, QUERY_STATS_FLUSH_INTERVAL, PROFILING_ENABLED, PROFILING_SAMPLE_RATE,
+    PROFILING_HEADER_TOKEN, PROFILING_USERS, PROFILING_INTERVAL, PROFILING_MAX_CONCURRENT, POOL_MAINTENANCE_INTERVAL
+)
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI(title="AI Chat API", description="API for AI-powered chat and analytics")
+logger = logging.getLogger(__name__)
+
+app = FastAPI(
+    title="AI Chat API",
+    description="API for AI-powered chat and analytics",
+    default_response_class=FastJSONResponse
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000"],  # React/Next.js dev URL
@@ -11,10 +38,55 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=COMPRESSION_MIN_SIZE,
+    route_levels={
+        # Chart data và dashboard được gọi thường xuyên: ưu tiên nén nhanh
+        "/api/charts": {"zstd": 3, "br": 4, "gzip": 5},
+        "/api/dashboards": {"zstd": 3, "br": 4, "gzip": 5},
+        # Kết quả chat (Plotly dict) lớn, ít gọi: nén mạnh hơn
+        "/api/chat": {"zstd": 9, "br": 7, "gzip": 7},
+    },
+)
+if PROFILING_ENABLED:
+    async def store_profile(profile):
+        await run_in_threadpool(ProfileModel.save_profile, profile)
+
+    app.add_middleware(
+        ProfilingMiddleware,
+        profiler=SamplingProfiler(PROFILING_INTERVAL, PROFILING_MAX_CONCURRENT),
+        store=store_profile,
+        sample_rate=PROFILING_SAMPLE_RATE,
+        header_token=PROFILING_HEADER_TOKEN,
+        users=PROFILING_USERS,
+        verify_token=verify_token,
+    )
+# Ngoài cùng: latency đo cả thời gian nén response
+app.add_middleware(MetricsMiddleware, server_timing=SERVER_TIMING_ENABLED)
 
 @app.on_event("startup")
 async def startup_event():
-    init_clients()
+    # Warm-up chạy nền: /health/live trả lời ngay, /health/ready chỉ ready khi pool đã có connection
+    app.state.warm_up_task = asyncio.create_task(run_warm_up())
+    start_periodic_task("dashboard_prewarm", PREWARM_INTERVAL, run_scheduled_prewarm, initial_delay=30)
+    start_periodic_task("redshift_catalog", CATALOG_REFRESH_INTERVAL, sync_redshift_catalog)
+    start_periodic_task("dataset_profile", DATASET_PROFILE_INTERVAL, run_scheduled_profiling, initial_delay=120)
+    start_periodic_task("rollup_refresh", ROLLUP_REFRESH_INTERVAL, run_scheduled_rollup_refresh, initial_delay=60)
+    start_periodic_task("filter_values", FILTER_VALUES_REFRESH_INTERVAL, run_scheduled_filter_value_refresh, initial_delay=FILTER_VALUES_REFRESH_INTERVAL)
+    start_periodic_task("query_stats", QUERY_STATS_FLUSH_INTERVAL, run_scheduled_query_stats_flush, initial_delay=QUERY_STATS_FLUSH_INTERVAL)
+    start_periodic_task("pool_maintenance", POOL_MAINTENANCE_INTERVAL, run_scheduled_pool_maintenance, initial_delay=POOL_MAINTENANCE_INTERVAL)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    mark_stopping()
+    await stop_all_tasks()
+    # Ghi nốt thống kê query của cửa sổ hiện tại
+    try:
+        await run_scheduled_query_stats_flush()
+    except Exception as e:
+        logger.error(f"Failed to flush query stats on shutdown: {str(e)}")
+    await asyncio.to_thread(close_pools)
 
 
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
@@ -24,6 +96,8 @@ app.include_router(chart.router, prefix="/api/charts", tags=["charts"])
 app.include_router(database_metadata.router, prefix="/api/database", tags=["charts"])
 app.include_router(dashboard.router, prefix="/api/dashboards", tags=["dashboards"])
 app.include_router(comment.router, prefix="/api/comments", tags=["comments"])
+app.include_router(rollup.router, prefix="/api/rollups", tags=["rollups"])
+app.include_router(monitoring.router, tags=["monitoring"])
 
 # app.include_router(history.router, prefix="/history", tags=["History"])
 # app.include_router(admin.router, prefix="/admin", tags=["Admin"])
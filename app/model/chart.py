@@ -1,12 +1,17 @@
 from mysql.connector import Error as MySQLError
 from fastapi import HTTPException
 from app.utils.database import get_mysql_connection
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+from datetime import datetime, timezone
 import psycopg2
 from psycopg2.extras import RealDictCursor
 import json
 import logging
 from app.model.chart_query import ChartQueryModel
+from app.model.database_metadata import RedshiftMetadataModel
+from app.model.dataset import DatasetModel
+from app.utils import chart_cache
+from config import CHART_CACHE_TTL, INCREMENTAL_WINDOW_SECONDS
 
 logger = logging.getLogger(__name__)
 
@@ -70,6 +75,35 @@ class ChartModel:
                 cursor.close()
                 conn.close()
 
+    @staticmethod
+    def _validate_incremental_field(chart_id: int, chart_data: Dict):
+        """
+        Check that config.incrementalField is one of query.label_fields once the update is merged
+        with the stored query and config. Raises 400 if it is not.
+        """
+        query, config = chart_data.get("query"), chart_data.get("config")
+        if query is None or config is None:
+            conn = None
+            try:
+                conn = get_mysql_connection()
+                cursor = conn.cursor(dictionary=True)
+                cursor.execute("SELECT query, config FROM charts WHERE id = %s", (chart_id,))
+                stored = cursor.fetchone()
+            except MySQLError as e:
+                logger.error(f"Failed to fetch chart {chart_id}: {str(e)}")
+                raise HTTPException(status_code=500, detail=f"Failed to fetch chart: {str(e)}")
+            finally:
+                if conn:
+                    cursor.close()
+                    conn.close()
+            if not stored:
+                return
+            query = query if query is not None else json.loads(stored["query"])
+            config = config if config is not None else json.loads(stored["config"])
+        incremental_field = (config or {}).get("incrementalField")
+        if incremental_field and incremental_field not in (query or {}).get("label_fields", []):
+            raise HTTPException(status_code=400, detail="incrementalField must be one of the query label fields")
+
     @staticmethod
     def update_chart(chart_id: int, chart_data: Dict, current_user: str) -> bool:
         """
@@ -78,6 +112,8 @@ class ChartModel:
         Updates updated_at automatically.
         Returns True if updated, False if chart not found.
         """
+        if chart_data.get("query") or chart_data.get("config"):
+            ChartModel._validate_incremental_field(chart_id, chart_data)
         if chart_data.get("query") and chart_data["query"].get("dataset_id"):
             conn = None
             try:
@@ -290,6 +326,130 @@ class ChartModel:
                 cursor.close()
                 conn.close()
 
+    @staticmethod
+    def get_charts_by_ids(chart_ids: List[int]) -> List[Dict]:
+        """
+        Retrieve charts by IDs without access checks.
+        Used by background jobs (e.g. cache pre-warming), never exposed directly to users.
+        """
+        if not chart_ids:
+            return []
+        conn = None
+        try:
+            conn = get_mysql_connection()
+            cursor = conn.cursor(dictionary=True)
+
+            placeholders = ", ".join(["%s"] * len(chart_ids))
+            query = f"""
+            SELECT id, name, dataset_id, query, config,
+                   owner, created_at, updated_at
+            FROM charts
+            WHERE id IN ({placeholders})
+            """
+            cursor.execute(query, tuple(chart_ids))
+            charts = cursor.fetchall()
+            for chart in charts:
+                chart["query"] = json.loads(chart["query"])
+                chart["config"] = json.loads(chart["config"])
+            return charts
+        except MySQLError as e:
+            logger.error(f"Failed to fetch charts {chart_ids}: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Failed to fetch charts: {str(e)}")
+        finally:
+            if conn:
+                cursor.close()
+                conn.close()
+
+    @staticmethod
+    def get_accessible_charts(chart_ids: List[int], current_user: str) -> List[Dict]:
+        """
+        Retrieve the charts among chart_ids that the user owns or that are shared with them, in one query.
+        Charts the user cannot access are left out.
+        """
+        if not chart_ids:
+            return []
+        conn = None
+        try:
+            conn = get_mysql_connection()
+            cursor = conn.cursor(dictionary=True)
+
+            placeholders = ", ".join(["%s"] * len(chart_ids))
+            query = f"""
+            SELECT id, name, dataset_id, query, config,
+                   owner, created_at, updated_at
+            FROM charts
+            WHERE id IN ({placeholders})
+            AND (
+                owner = %s
+                OR EXISTS (
+                    SELECT 1 FROM shared
+                    WHERE resource_type = 'chart'
+                    AND resource_id = charts.id
+                    AND shared_with = %s
+                )
+            )
+            """
+            cursor.execute(query, (*chart_ids, current_user, current_user))
+            charts = cursor.fetchall()
+            for chart in charts:
+                chart["query"] = json.loads(chart["query"])
+                chart["config"] = json.loads(chart["config"])
+            return charts
+        except MySQLError as e:
+            logger.error(f"Failed to fetch charts {chart_ids}: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Failed to fetch charts: {str(e)}")
+        finally:
+            if conn:
+                cursor.close()
+                conn.close()
+
+    @staticmethod
+    def build_chart_query_data(chart: Dict) -> Dict:
+        """
+        Build the ChartQueryModel input for a stored chart.
+        Applies config limit and sort_order and normalizes legacy value_field.
+        """
+        query_data = chart["query"].copy()
+        query_data["limit"] = chart["config"].get("limit", 10)
+        query_data["sort_order"] = chart["config"].get("sortOrder", "desc")
+        # Ensure value_fields is used
+        if "value_field" in query_data:
+            query_data["value_fields"] = [query_data["value_field"]]
+            del query_data["value_field"]
+        return query_data
+
+    @staticmethod
+    def apply_dashboard_filters(charts: List[Dict], filters: Optional[Dict], redshift_config: Dict) -> List[Dict]:
+        """
+        Merge dashboard-level filters into the query filters of each chart.
+        A dashboard filter replaces the chart's own filter on the same column and is skipped for
+        charts whose dataset has no such column, or whose dataset cannot be loaded (the chart's own
+        query then reports the error in its item). Returns copies; the stored charts are not changed,
+        and the merged filters are part of the chart result cache key.
+        """
+        if not filters:
+            return charts
+        dataset_columns: Dict[int, set] = {}
+        merged_charts = []
+        for chart in charts:
+            dataset_id = chart["dataset_id"]
+            if dataset_id not in dataset_columns:
+                try:
+                    dataset = DatasetModel.get_dataset(dataset_id)
+                    columns = RedshiftMetadataModel.get_table_columns(redshift_config, dataset["table_name"], dataset["schema_name"])
+                    dataset_columns[dataset_id] = {column["column_name"] for column in columns}
+                except HTTPException as e:
+                    # Dataset đã bị xoá hoặc không đọc được cột: chart giữ filter riêng, lỗi được báo ở item của chart
+                    logger.warning(f"Skipping dashboard filters for dataset_id {dataset_id}: {e.detail}")
+                    dataset_columns[dataset_id] = set()
+            applicable = {column_name: item for column_name, item in filters.items() if column_name in dataset_columns[dataset_id]}
+            if not applicable:
+                merged_charts.append(chart)
+                continue
+            query = {**chart["query"], "filters": {**(chart["query"].get("filters") or {}), **applicable}}
+            merged_charts.append({**chart, "query": query})
+        return merged_charts
+
     @staticmethod
     def get_chart_data(chart_id: int, redshift_config: Dict, current_user: str) -> Dict:
         """
@@ -300,19 +460,131 @@ class ChartModel:
         chart = ChartModel.get_chart(chart_id, current_user)
         if not chart:
             raise HTTPException(status_code=404, detail="Chart not found or unauthorized")
+        data, _ = ChartModel.get_chart_data_with_freshness(chart, redshift_config)
+        return data
+
+    @staticmethod
+    def get_chart_data_with_freshness(chart: Dict, redshift_config: Dict, requester: Optional[Dict] = None) -> Tuple[Dict, Dict]:
+        """
+        Fetch data for a chart, serving from the chart result cache when possible.
+        Charts with config freshnessSeconds are served stale-while-revalidate: an older cached
+        result is returned immediately and freshness["refreshing"] tells the caller to run
+        revalidate_chart_data in the background.
+        Other charts recompute synchronously once the cached result is older than CHART_CACHE_TTL.
+        requester (username, role, priority) is used for admission control of the recomputation.
+        Returns (Chart.js-compatible data, freshness info).
+        """
+        cached = ChartModel.get_cached_chart_data(chart)
+        if cached:
+            return cached
+        entry = ChartModel.refresh_chart_data(chart, redshift_config, requester)
+        return entry["data"], ChartModel.get_entry_freshness(chart, entry)
+
+    @staticmethod
+    def _get_max_age(chart: Dict) -> int:
+        return chart["config"].get("freshnessSeconds") or CHART_CACHE_TTL
+
+    @staticmethod
+    def get_cached_chart_data(chart: Dict) -> Optional[Tuple[Dict, Dict]]:
+        """
+        Return (data, freshness) from the chart result cache if it can be served:
+        fresh, or stale within stale-while-revalidate (freshnessSeconds) charts.
+        Returns None when the chart must be recomputed.
+        """
+        query_data = ChartModel.build_chart_query_data(chart)
+        swr_max_age = chart["config"].get("freshnessSeconds")
+        max_age = ChartModel._get_max_age(chart)
+
+        entry = chart_cache.get_cached_result(query_data)
+        if entry:
+            age = chart_cache.get_entry_age(entry)
+            if age <= max_age:
+                return entry["data"], ChartModel._build_freshness(entry, max_age, stale=False, refreshing=False)
+            if swr_max_age:
+                # Chỉ một request được kích hoạt refresh nền, các request khác tiếp tục nhận dữ liệu cũ
+                refreshing = chart_cache.acquire_refresh_lock(query_data)
+                return entry["data"], ChartModel._build_freshness(entry, max_age, stale=True, refreshing=refreshing)
+        return None
 
+    @staticmethod
+    def get_entry_freshness(chart: Dict, entry: Dict) -> Dict:
+        """
+        Freshness info of a cache entry that was just recomputed.
+        """
+        return ChartModel._build_freshness(entry, ChartModel._get_max_age(chart), stale=False, refreshing=False)
+
+    @staticmethod
+    def _build_freshness(entry: Dict, max_age: int, stale: bool, refreshing: bool) -> Dict:
+        return {
+            "computed_at": datetime.fromtimestamp(entry["computed_at"], tz=timezone.utc),
+            "age_seconds": round(chart_cache.get_entry_age(entry), 3),
+            "max_age_seconds": max_age,
+            "stale": stale,
+            "refreshing": refreshing
+        }
+
+    @staticmethod
+    def refresh_chart_data(chart: Dict, redshift_config: Dict, requester: Optional[Dict] = None) -> Dict:
+        """
+        Execute the chart query on Redshift and store the result in the chart result cache.
+        Charts with config incrementalField (a time label) only re-query the recent window.
+        Returns the cache entry with data (Chart.js-compatible) and computed_at.
+        """
         # Use ChartQueryModel to execute the query with config limit and sort_order
-        query_data = chart["query"].copy()
-        query_data["limit"] = chart["config"].get("limit", 10)
-        query_data["sort_order"] = chart["config"].get("sortOrder", "desc")
-        # Ensure value_fields is used
-        if "value_field" in query_data:
-            query_data["value_fields"] = [query_data["value_field"]]
-            del query_data["value_field"]
-        chart_data = ChartQueryModel.build_and_execute_query(query_data, redshift_config)
+        query_data = ChartModel.build_chart_query_data(chart)
+        # chart_id chỉ dùng cho thống kê query (app.utils.query_stats)
+        requester = {**(requester or {}), "chart_id": chart["id"]}
+        incremental_field = chart["config"].get("incrementalField")
+        if incremental_field:
+            window = chart["config"].get("incrementalWindowSeconds") or INCREMENTAL_WINDOW_SECONDS
+            chart_data = ChartQueryModel.build_and_execute_incremental(
+                query_data, redshift_config, incremental_field, window, requester
+            )
+        else:
+            chart_data = ChartQueryModel.build_and_execute_query(query_data, redshift_config, requester)
+        return chart_cache.set_cached_result(query_data, chart_data)
+
+    @staticmethod
+    def group_charts_for_fusion(charts: List[Dict]) -> List[List[Dict]]:
+        """
+        Group charts whose queries can be fused into one Redshift query (same ChartQueryModel.fusion_key).
+        Incremental charts keep their own query and form groups of one.
+        """
+        groups: Dict[str, List[Dict]] = {}
+        for chart in charts:
+            if chart["config"].get("incrementalField"):
+                groups[f"chart:{chart['id']}"] = [chart]
+            else:
+                key = ChartQueryModel.fusion_key(ChartModel.build_chart_query_data(chart))
+                groups.setdefault(key, []).append(chart)
+        return list(groups.values())
+
+    @staticmethod
+    def refresh_chart_group(charts: List[Dict], redshift_config: Dict, requester: Optional[Dict] = None) -> List[Dict]:
+        """
+        Recompute a group from group_charts_for_fusion with one fused query and store
+        each chart's result in the chart result cache.
+        Returns the cache entries, in the order of charts.
+        """
+        if len(charts) == 1:
+            return [ChartModel.refresh_chart_data(charts[0], redshift_config, requester)]
+        query_datas = [ChartModel.build_chart_query_data(chart) for chart in charts]
+        results = ChartQueryModel.build_and_execute_fused(query_datas, redshift_config, requester)
+        return [chart_cache.set_cached_result(query_data, data) for query_data, data in zip(query_datas, results)]
+
+    @staticmethod
+    def revalidate_chart_data(chart: Dict, redshift_config: Dict):
+        """
+        Background refresh for stale-while-revalidate. Releases the refresh lock when done.
+        """
+        try:
+            ChartModel.refresh_chart_data(chart, redshift_config)
+            logger.info(f"Revalidated chart {chart['id']}")
+        except Exception as e:
+            logger.error(f"Failed to revalidate chart {chart['id']}: {str(e)}")
+        finally:
+            chart_cache.release_refresh_lock(ChartModel.build_chart_query_data(chart))
 
-        return chart_data
-    
     @staticmethod
     def share_chart(chart_id: int, shared_with: str, shared_by: str) -> bool:
         """
@@ -1,27 +1,149 @@
 from fastapi import HTTPException
-from app.utils.database import get_mysql_connection
+from app.utils.database import get_mysql_connection, get_redshift_connection
 from mysql.connector import Error as MySQLError
 import psycopg2
-from psycopg2.extras import RealDictCursor
-from typing import Dict, List
+from psycopg2.errors import QueryCanceled
+from contextlib import nullcontext
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 import re
 import logging
+from app.utils.serialization import dumps, loads
+from app.model.rollup import RollupModel
+from app.utils import chart_cache
+from app.utils.admission import admission, PRIORITY_BACKGROUND
+from app.utils.cancellation import CancelScope
+from app.utils.metrics import span
+from app.utils.query_stats import query_stats
+from app.utils.ttl_cache import TTLCache
+from datetime import date, datetime, timedelta
+import hashlib
+import json
+import time
+import uuid
+from config import (
+    QUERY_MAX_GROUPS, QUERY_AUTO_LIMIT, DIMENSION_MAX_DISTINCT, INCREMENTAL_FULL_REFRESH_INTERVAL,
+    QUERY_COST_CONFIRM_THRESHOLD, QUERY_COST_MAX, EXPLAIN_CACHE_TTL, EXPLAIN_CACHE_SIZE, QUERY_STATEMENT_TIMEOUT,
+    QUERY_FETCH_BATCH_SIZE, QUERY_FUSION_MAX_GROUPS
+)
 
 logger = logging.getLogger(__name__)
 
+# Kết quả EXPLAIN theo câu SQL đã compile (sql + params)
+_explain_cache = TTLCache(EXPLAIN_CACHE_SIZE, EXPLAIN_CACHE_TTL)
+EXPLAIN_COST_PATTERN = re.compile(r'cost=[\d.]+\.\.([\d.]+) rows=(\d+)')
+EXPLAIN_NODE_PATTERN = re.compile(r'^\s*(?:->\s*)?XN (\w+)')
+# Node chạy trên leader (sort/merge/limit cuối cùng): Redshift cộng thêm khoảng 1e12 vào cost của các node này
+LEADER_PLAN_NODES = {"Limit", "Merge", "Network", "Sort", "Unique"}
+# Label của giá trị NULL sau normalize_rows
+NULL_LABEL = str(None)
+
+class ChartResultFormatter:
+    """
+    Format the tuple rows of a chart query for Chart.js batch by batch.
+    Rows follow the SELECT order of build_query: label fields, the dimension field (if any), then value_0..value_n.
+    Without a dimension field a batch can also be formatted on its own (format_batch) for streaming;
+    with a dimension field rows are pivoted into one dataset per dimension value.
+    """
+    def __init__(self, plan: Dict):
+        self.value_fields = plan["value_fields"]
+        self.warnings = plan["warnings"]
+        self.label_count = len(plan["label_fields"])
+        self.has_dimension = bool(plan["dimension_field"])
+        self.value_start = self.label_count + (1 if self.has_dimension else 0)
+        self.labels: List[str] = []
+        self.label_positions: Dict[str, int] = {}
+        # Không có dimension: một list giá trị cho mỗi value field
+        self.values: List[List[float]] = [[] for _ in self.value_fields]
+        # Có dimension: dimension value -> list giá trị theo vị trí label
+        self.series: Dict[str, List[List[float]]] = {}
+
+    @property
+    def streamable(self) -> bool:
+        return not self.has_dimension
+
+    def _label(self, row: tuple) -> str:
+        return "_".join(str(value) for value in row[:self.label_count])
+
+    def _batch_values(self, rows: List[tuple]) -> List[List[float]]:
+        return [[float(row[self.value_start + i]) for row in rows] for i in range(len(self.value_fields))]
+
+    @span("format")
+    def format_batch(self, rows: List[tuple]) -> Dict:
+        """
+        Format one batch as a partial result (labels with values or datasets). Only for queries without a dimension field.
+        """
+        labels = [self._label(row) for row in rows]
+        values = self._batch_values(rows)
+        if len(self.value_fields) > 1:
+            return {
+                "labels": labels,
+                "datasets": [{"label": field, "data": values[i]} for i, field in enumerate(self.value_fields)]
+            }
+        return {"labels": labels, "values": values[0]}
+
+    @span("format")
+    def add_rows(self, rows: List[tuple]):
+        """
+        Accumulate a batch of rows into the result.
+        """
+        if not self.has_dimension:
+            self.labels.extend(self._label(row) for row in rows)
+            for i, values in enumerate(self._batch_values(rows)):
+                self.values[i].extend(values)
+            return
+
+        value_count = len(self.value_fields)
+        for row in rows:
+            label = self._label(row)
+            position = self.label_positions.get(label)
+            if position is None:
+                position = self.label_positions[label] = len(self.labels)
+                self.labels.append(label)
+            data = self.series.setdefault(str(row[self.label_count]), [])
+            # Bù 0 cho các label xuất hiện trước khi dimension value này có dữ liệu
+            while len(data) < len(self.labels):
+                data.append([0.0] * value_count)
+            data[position] = [float(row[self.value_start + i]) for i in range(value_count)]
+
+    @span("format")
+    def result(self) -> Dict:
+        """
+        Return the accumulated Chart.js data, plus warnings from the plan.
+        """
+        if self.has_dimension:
+            # Mỗi value field tạo một nhóm dataset, mỗi dimension value một dataset
+            chart_data = {
+                "labels": self.labels,
+                "datasets": [
+                    {"label": dimension_value, "data": [values[i] for values in data]}
+                    for i in range(len(self.value_fields))
+                    for dimension_value, data in self.series.items()
+                ]
+            }
+        elif len(self.value_fields) > 1:
+            chart_data = {
+                "labels": self.labels,
+                "datasets": [{"label": field, "data": self.values[i]} for i, field in enumerate(self.value_fields)]
+            }
+        else:
+            chart_data = {"labels": self.labels, "values": self.values[0]}
+        if self.warnings:
+            chart_data["warnings"] = self.warnings
+        return chart_data
+
 class ChartQueryModel:
     @staticmethod
     def get_dataset_details(dataset_id: int) -> Dict:
         """
         Fetch dataset details from MySQL.
-        Returns a dictionary with database, table_name, and schema_name.
+        Returns a dictionary with database, table_name, schema_name and the column profile (or None).
         """
         conn = None
         try:
             conn = get_mysql_connection()
             cursor = conn.cursor(dictionary=True)
             query = """
-            SELECT `database`, table_name, schema_name
+            SELECT `database`, table_name, schema_name, profile
             FROM datasets
             WHERE id = %s
             """
@@ -29,6 +151,7 @@ class ChartQueryModel:
             dataset = cursor.fetchone()
             if not dataset:
                 raise HTTPException(status_code=404, detail=f"Dataset ID {dataset_id} not found")
+            dataset["profile"] = loads(dataset["profile"]) if dataset["profile"] else None
             return dataset
         except MySQLError as e:
             logger.error(f"Failed to fetch dataset {dataset_id}: {str(e)}")
@@ -39,10 +162,56 @@ class ChartQueryModel:
                 conn.close()
 
     @staticmethod
-    def build_and_execute_query(query_data: Dict, redshift_config: Dict) -> Dict:
+    def estimate_group_count(profile: Optional[Dict], fields: List[str]) -> Optional[int]:
         """
-        Build and execute a SQL query on Redshift for a chart.
-        Returns Chart.js-compatible data with labels and values or datasets.
+        Estimate the number of result rows of a GROUP BY on fields from the dataset profile
+        (product of approximate distinct counts, capped by the table row count).
+        Returns None if the dataset or one of the fields has not been profiled.
+        """
+        if not profile:
+            return None
+        estimate = 1
+        for field in fields:
+            column = profile["columns"].get(field)
+            if column is None:
+                return None
+            # Giá trị NULL cũng tạo thành một nhóm
+            estimate *= column["approx_distinct"] + (1 if column["null_ratio"] > 0 else 0)
+        return min(estimate, profile["row_count"])
+
+    @staticmethod
+    def plan_result_size(profile: Optional[Dict], label_fields: List[str], dimension_field: Optional[str], limit: Optional[int]):
+        """
+        Check the expected result size against the dataset profile.
+        Returns (limit, warnings): a query without LIMIT whose estimated group count exceeds
+        QUERY_MAX_GROUPS is limited to QUERY_AUTO_LIMIT rows.
+        """
+        warnings = []
+        if dimension_field:
+            dimension_distinct = ChartQueryModel.estimate_group_count(profile, [dimension_field])
+            if dimension_distinct is not None and dimension_distinct > DIMENSION_MAX_DISTINCT:
+                warnings.append(
+                    f"Dimension field '{dimension_field}' has about {dimension_distinct} distinct values; "
+                    f"consider a field with fewer than {DIMENSION_MAX_DISTINCT} values"
+                )
+
+        group_fields = label_fields + ([dimension_field] if dimension_field else [])
+        estimated_groups = ChartQueryModel.estimate_group_count(profile, group_fields)
+        if estimated_groups is not None and estimated_groups > QUERY_MAX_GROUPS and limit is None:
+            limit = QUERY_AUTO_LIMIT
+            warnings.append(
+                f"Query would return about {estimated_groups} groups; result limited to {QUERY_AUTO_LIMIT} rows"
+            )
+        return limit, warnings
+
+    @staticmethod
+    def build_query(query_data: Dict, since: Optional[Tuple[str, str]] = None, order_and_limit: bool = True) -> Dict:
+        """
+        Build the SQL query on Redshift for a chart.
+        Queries are answered from a pre-aggregated rollup when one covers them.
+        since=(field, value) restricts the query to rows with field >= value; order_and_limit=False
+        skips ORDER BY/LIMIT (incremental refresh sorts and limits after merging).
+        Returns a dictionary with sql, params, fields, the effective limit/sort_order and warnings.
         """
         # Fetch dataset details
         dataset = ChartQueryModel.get_dataset_details(query_data["dataset_id"])
@@ -68,17 +237,37 @@ class ChartQueryModel:
                 raise HTTPException(status_code=400, detail=f"Invalid value field format: {value_field}")
         if dimension_field and not re.match(r'^[a-zA-Z0-9_]+$', dimension_field):
             raise HTTPException(status_code=400, detail=f"Invalid dimension field: {dimension_field}")
+        if sort_order:
+            sort_order = sort_order.upper()
+            if sort_order not in ["ASC", "DESC"]:
+                raise HTTPException(status_code=400, detail="Sort order must be 'asc' or 'desc'")
+        if limit is not None and (not isinstance(limit, int) or limit <= 0):
+            raise HTTPException(status_code=400, detail="Limit must be a positive integer")
 
-        # Build SELECT clause
+        # Dùng profile của dataset để cảnh báo hoặc tự giới hạn query có quá nhiều nhóm
+        limit, warnings = ChartQueryModel.plan_result_size(dataset["profile"], label_fields, dimension_field, limit)
+
+        # Route to the smallest rollup that contains every grouped/filtered column, else the base table
         select_fields = label_fields[:]
         if dimension_field:
             select_fields.append(dimension_field)
+        rollup = RollupModel.find_rollup(query_data["dataset_id"], select_fields + list(filters), value_fields)
+        if rollup:
+            logger.info(f"Routing query for dataset_id {query_data['dataset_id']} to rollup {rollup['id']}")
+            value_expressions = [RollupModel.rewrite_value_field(value_field) for value_field in value_fields]
+        else:
+            value_expressions = value_fields
+
+        # Build SELECT clause
         # Create aliases for value fields (e.g., SUM(amount) AS value_0, COUNT(transaction_id) AS value_1)
-        value_aliases = [f"{value_field} AS value_{i}" for i, value_field in enumerate(value_fields)]
+        value_aliases = [f"{expression} AS value_{i}" for i, expression in enumerate(value_expressions)]
         select_clause = ", ".join(select_fields + value_aliases)
 
         # Build FROM clause
-        from_clause = f"FROM {dataset['schema_name']}.{dataset['table_name']}"
+        if rollup:
+            from_clause = f"FROM {RollupModel.get_rollup_table(rollup)}"
+        else:
+            from_clause = f"FROM {dataset['schema_name']}.{dataset['table_name']}"
 
         # Build WHERE clause
         where_conditions = []
@@ -102,6 +291,9 @@ class ChartQueryModel:
             else:
                 where_conditions.append(f"{column_name} {operator} %s")
                 params.append(value)
+        if since:
+            where_conditions.append(f"{since[0]} >= %s")
+            params.append(since[1])
         where_clause = "WHERE " + " AND ".join(where_conditions) if where_conditions else ""
 
         # Build GROUP BY clause
@@ -112,18 +304,13 @@ class ChartQueryModel:
 
         # Build ORDER BY clause
         order_by_clause = ""
-        if sort_order:
-            sort_order = sort_order.upper()
-            if sort_order not in ["ASC", "DESC"]:
-                raise HTTPException(status_code=400, detail="Sort order must be 'asc' or 'desc'")
+        if sort_order and order_and_limit:
             # Order by the first value field for consistency
             order_by_clause = f"ORDER BY value_0 {sort_order}"
 
         # Build LIMIT clause
         limit_clause = ""
-        if limit is not None:
-            if not isinstance(limit, int) or limit <= 0:
-                raise HTTPException(status_code=400, detail="Limit must be a positive integer")
+        if limit is not None and order_and_limit:
             limit_clause = f"LIMIT {limit}"
 
         # Construct final query
@@ -136,79 +323,419 @@ class ChartQueryModel:
         {limit_clause}
         """.strip()
         logger.info(f"Generated SQL query for dataset_id {query_data['dataset_id']}: {sql_query}")
-        print(sql_query)
 
-        # Execute query on Redshift
+        return {
+            "dataset_id": query_data["dataset_id"],
+            "sql": sql_query,
+            "params": params,
+            "label_fields": label_fields,
+            "value_fields": value_fields,
+            "dimension_field": dimension_field,
+            "limit": limit,
+            "sort_order": sort_order,
+            "warnings": warnings
+        }
+
+    @staticmethod
+    def iter_query_batches(sql_query: str, params: List, redshift_config: Dict,
+                           cancel_scope: Optional[CancelScope] = None) -> Iterator[List[tuple]]:
+        """
+        Execute a chart query on Redshift through a named (server-side) cursor and yield
+        batches of at most QUERY_FETCH_BATCH_SIZE tuple rows, so only one batch is held in memory.
+        The query runs with statement_timeout = QUERY_STATEMENT_TIMEOUT and is cancelled
+        server-side through cancel_scope when the client disconnects.
+        The connection is returned to the pool when the generator is exhausted or closed early.
+        """
         conn = None
+        cursor = None
         try:
-            conn = psycopg2.connect(**redshift_config, cursor_factory=RealDictCursor)
-            cursor = conn.cursor()
-            cursor.execute(sql_query, params)
-            results = cursor.fetchall()
-
-            # Format results for Chart.js
-            if dimension_field or len(value_fields) > 1:
-                # Use datasets format
-                labels = []
-                if dimension_field:
-                    # Group by dimension_field
-                    datasets = {}
-                    for row in results:
-                        label = "_".join(str(row[field]) for field in label_fields)
-                        dimension_value = str(row[dimension_field])
-                        values = [float(row[f"value_{i}"]) for i in range(len(value_fields))]
-
-                        if label not in labels:
-                            labels.append(label)
-
-                        if dimension_value not in datasets:
-                            datasets[dimension_value] = {
-                                "label": dimension_value,
-                                "data": [[0.0] * len(value_fields) for _ in labels]
-                            }
-                        # Adjust data length
-                        while len(datasets[dimension_value]["data"]) < len(labels):
-                            datasets[dimension_value]["data"].append([0.0] * len(value_fields))
-                        datasets[dimension_value]["data"][labels.index(label)] = values
-
-                    # Flatten datasets for each value_field
-                    final_datasets = []
-                    for value_idx, value_field in enumerate(value_fields):
-                        for dim_value, dataset in datasets.items():
-                            final_datasets.append({
-                                "label": dim_value,  # Use only dimension value
-                                "data": [row[value_idx] for row in dataset["data"]]
-                            })
-                    return {
-                        "labels": labels,
-                        "datasets": final_datasets
-                    }
-                else:
-                    # Multiple value_fields without dimension_field
-                    labels = ["_".join(str(row[field]) for field in label_fields) for row in results]
-                    datasets = [
-                        {
-                            "label": value_field,
-                            "data": [float(row[f"value_{i}"]) for row in results]
-                        }
-                        for i, value_field in enumerate(value_fields)
-                    ]
-                    return {
-                        "labels": labels,
-                        "datasets": datasets
-                    }
-            else:
-                # Single value_field without dimension_field
-                labels = ["_".join(str(row[field]) for field in label_fields) for row in results]
-                values = [float(row["value_0"]) for row in results]
-                return {
-                    "labels": labels,
-                    "values": values
-                }
+            conn = get_redshift_connection(redshift_config)
+            with conn.cursor() as setup_cursor:
+                # SET LOCAL: chỉ áp dụng cho transaction này, connection trả về pool không giữ timeout
+                setup_cursor.execute("SET LOCAL statement_timeout TO %s", (QUERY_STATEMENT_TIMEOUT * 1000,))
+            # Named cursor: psycopg2 chạy DECLARE ... CURSOR rồi FETCH từng batch thay vì tải toàn bộ kết quả về client
+            cursor = conn.cursor(name=f"chart_{uuid.uuid4().hex}")
+            cursor.itersize = QUERY_FETCH_BATCH_SIZE
+            # conn.cancel() gửi cancel request tới backend đang chạy query (tương đương pg_cancel_backend)
+            with cancel_scope.guard(conn.cancel) if cancel_scope else nullcontext():
+                with span("warehouse"):
+                    cursor.execute(sql_query, params)
+                while True:
+                    with span("warehouse"):
+                        batch = cursor.fetchmany(QUERY_FETCH_BATCH_SIZE)
+                    if not batch:
+                        break
+                    yield batch
+        except QueryCanceled:
+            if cancel_scope and cancel_scope.cancelled:
+                logger.info("Cancelled Redshift query: client disconnected")
+                raise HTTPException(status_code=499, detail="Query cancelled: client disconnected")
+            logger.warning(f"Redshift query exceeded {QUERY_STATEMENT_TIMEOUT}s: {sql_query}")
+            raise HTTPException(status_code=504, detail=f"Query exceeded the time limit of {QUERY_STATEMENT_TIMEOUT} seconds")
         except psycopg2.Error as e:
             logger.error(f"Failed to execute Redshift query: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Failed to query Redshift: {str(e)}")
+        finally:
+            if conn:
+                if cursor is not None and not conn.closed:
+                    try:
+                        cursor.close()
+                    except psycopg2.Error:
+                        pass
+                conn.close()
+
+    @staticmethod
+    def estimate_query_cost(sql_query: str, params: List, redshift_config: Dict) -> Dict:
+        """
+        Estimate the cost of a query from its Redshift EXPLAIN plan (see parse_plan_cost).
+        Estimates are cached per compiled statement for EXPLAIN_CACHE_TTL seconds.
+        Returns a dictionary with cost and rows.
+        """
+        key = hashlib.sha256(json.dumps([sql_query, params], default=str).encode("utf-8")).hexdigest()
+        estimate = _explain_cache.get(key)
+        if estimate is not None:
+            return estimate
+
+        conn = None
+        try:
+            conn = get_redshift_connection(redshift_config)
+            cursor = conn.cursor()
+            with span("warehouse"):
+                cursor.execute(f"EXPLAIN {sql_query}", params)
+                plan_lines = [str(row[0]) for row in cursor.fetchall()]
+        except psycopg2.Error as e:
+            logger.error(f"Failed to explain Redshift query: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Failed to query Redshift: {str(e)}")
         finally:
             if conn:
                 cursor.close()
-                conn.close()
\ No newline at end of file
+                conn.close()
+
+        estimate = ChartQueryModel.parse_plan_cost(plan_lines)
+        _explain_cache.set(key, estimate)
+        return estimate
+
+    @staticmethod
+    def parse_plan_cost(plan_lines: List[str]) -> Dict:
+        """
+        Extract the cost and rows of a Redshift EXPLAIN plan from its first node below the leader-only
+        Limit/Merge/Network/Sort nodes (the aggregate or scan doing the work on the compute nodes).
+        Falls back to the top node when every node is leader-only.
+        Returns a dictionary with cost and rows.
+        """
+        estimate = None
+        for line in plan_lines:
+            match = EXPLAIN_COST_PATTERN.search(line)
+            if not match:
+                continue
+            node = EXPLAIN_NODE_PATTERN.match(line)
+            current = {"cost": float(match.group(1)), "rows": int(match.group(2))}
+            if node and node.group(1) in LEADER_PLAN_NODES:
+                estimate = estimate or current
+                continue
+            return current
+        return estimate or {"cost": 0.0, "rows": 0}
+
+    @staticmethod
+    def check_query_cost(plan: Dict, redshift_config: Dict, confirmed: bool) -> Dict:
+        """
+        Reject queries whose estimated cost exceeds QUERY_COST_MAX, and require confirmation
+        (confirmed=True) above QUERY_COST_CONFIRM_THRESHOLD.
+        Returns the cost estimate.
+        """
+        estimate = ChartQueryModel.estimate_query_cost(plan["sql"], plan["params"], redshift_config)
+        if estimate["cost"] > QUERY_COST_MAX:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Query is too expensive (estimated cost {estimate['cost']:.0f}, limit {QUERY_COST_MAX:.0f}); add filters or use a smaller dataset"
+            )
+        if not confirmed and estimate["cost"] > QUERY_COST_CONFIRM_THRESHOLD:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Query is expensive (estimated cost {estimate['cost']:.0f}, about {estimate['rows']} rows); resend with confirm_expensive=true to run it"
+            )
+        return estimate
+
+    @staticmethod
+    def iter_plan_batches(plan: Dict, redshift_config: Dict, requester: Optional[Dict] = None) -> Iterator[List[tuple]]:
+        """
+        Wait for a concurrency slot and yield the tuple rows of a planned query batch by batch.
+        The slot is held until the generator is exhausted or closed. The cost is not checked here
+        (see run_plan and stream_query).
+        """
+        requester = requester or {}
+        with admission.slot(requester.get("username"), requester.get("role"), requester.get("priority", PRIORITY_BACKGROUND)):
+            batches = ChartQueryModel.iter_query_batches(plan["sql"], plan["params"], redshift_config, requester.get("cancel_scope"))
+            # Chỉ tính thời gian chờ Redshift, không tính thời gian consumer xử lý từng batch
+            duration, row_count, size_bytes = 0.0, 0, 0
+            try:
+                while True:
+                    start = time.perf_counter()
+                    batch = next(batches, None)
+                    duration += time.perf_counter() - start
+                    if batch is None:
+                        break
+                    row_count += len(batch)
+                    # Ước lượng kích thước theo dòng đầu của batch, tránh serialize toàn bộ kết quả
+                    size_bytes += len(dumps(batch[0])) * len(batch)
+                    yield batch
+            finally:
+                batches.close()
+                query_stats.record(
+                    "chart", plan["sql"], duration, row_count, size_bytes,
+                    plan.get("dataset_id"), requester.get("chart_id"), requester.get("username")
+                )
+
+    @staticmethod
+    def run_plan(plan: Dict, redshift_config: Dict, requester: Optional[Dict] = None,
+                 consume: Optional[Callable[[List[tuple]], None]] = None) -> List[tuple]:
+        """
+        Check the estimated cost of a planned query, wait for a concurrency slot and execute it.
+        requester carries username, role, priority, confirmed (confirm_expensive) and an optional
+        cancel_scope; None means a background job (lowest priority, no per-user limit, no confirmation needed).
+        With consume, each batch of tuple rows is passed to it and nothing is kept;
+        otherwise all rows are returned.
+        """
+        requester = requester or {}
+        ChartQueryModel.check_query_cost(plan, redshift_config, requester.get("confirmed", True))
+        rows = []
+        for batch in ChartQueryModel.iter_plan_batches(plan, redshift_config, requester):
+            if consume:
+                consume(batch)
+            else:
+                rows.extend(batch)
+        return rows
+
+    @staticmethod
+    def result_columns(plan: Dict) -> List[str]:
+        """
+        Column names of the rows returned by a planned query, in SELECT order.
+        """
+        return (
+            plan["label_fields"]
+            + ([plan["dimension_field"]] if plan["dimension_field"] else [])
+            + [f"value_{i}" for i in range(len(plan["value_fields"]))]
+        )
+
+    @staticmethod
+    def format_results(results: List[tuple], plan: Dict) -> Dict:
+        """
+        Format query rows (tuples in result_columns order) for Chart.js.
+        Returns labels with values (single value field) or datasets, plus warnings from the plan.
+        """
+        formatter = ChartResultFormatter(plan)
+        formatter.add_rows(results)
+        return formatter.result()
+
+    @staticmethod
+    def build_and_execute_query(query_data: Dict, redshift_config: Dict, requester: Optional[Dict] = None) -> Dict:
+        """
+        Build and execute a SQL query on Redshift for a chart.
+        The query goes through cost estimation and admission control (see run_plan).
+        Returns Chart.js-compatible data with labels and values or datasets,
+        plus warnings when the dataset profile predicts a high-cardinality result.
+        """
+        plan = ChartQueryModel.build_query(query_data)
+        formatter = ChartResultFormatter(plan)
+        ChartQueryModel.run_plan(plan, redshift_config, requester, consume=formatter.add_rows)
+        return formatter.result()
+
+    @staticmethod
+    def fusion_key(query_data: Dict) -> str:
+        """
+        Key shared by chart queries that scan and group the same rows (dataset, label fields,
+        dimension field and filters) and can therefore be answered by one query.
+        """
+        return json.dumps([
+            query_data["dataset_id"],
+            query_data["label_fields"],
+            query_data.get("dimension_field"),
+            query_data.get("filters") or {}
+        ], sort_keys=True, default=str)
+
+    @staticmethod
+    def apply_order_and_limit(rows: List, value_key, sort_order: Optional[str], limit: Optional[int]) -> List:
+        """
+        Sort rows by row[value_key] and cut them to limit, like ORDER BY value_0 ... LIMIT in SQL:
+        NULL comes last with ASC and first with DESC.
+        """
+        if sort_order:
+            rows = sorted(
+                rows,
+                key=lambda row: (row[value_key] is None, row[value_key] or 0.0),
+                reverse=sort_order == "DESC"
+            )
+        if limit is not None:
+            rows = rows[:limit]
+        return rows
+
+    @staticmethod
+    def build_and_execute_fused(query_datas: List[Dict], redshift_config: Dict, requester: Optional[Dict] = None) -> List[Dict]:
+        """
+        Execute chart queries sharing the same fusion_key as one Redshift query selecting the union
+        of their value fields, then split the rows back per chart.
+        When every chart has the same sort order, limit and first value field, ORDER BY/LIMIT stay in SQL.
+        Otherwise the full grouped result is fetched and each chart is sorted and limited in Python;
+        this is only done when the dataset profile estimates at most QUERY_FUSION_MAX_GROUPS groups,
+        else the charts are queried one by one.
+        Returns Chart.js-compatible data for each query, in order.
+        """
+        if len({ChartQueryModel.fusion_key(query_data) for query_data in query_datas}) > 1:
+            raise HTTPException(status_code=400, detail="Only charts on the same dataset, labels and filters can be fused")
+        plans = [ChartQueryModel.build_query(query_data) for query_data in query_datas]
+        if len(plans) == 1:
+            return [ChartQueryModel.build_and_execute_query(query_datas[0], redshift_config, requester)]
+
+        # Giá trị đầu tiên của mỗi chart đứng trước để value_0 của query gộp trùng với value_0 của chart khi có thể
+        value_fields = []
+        for plan in plans:
+            for value_field in plan["value_fields"]:
+                if value_field not in value_fields:
+                    value_fields.append(value_field)
+        ordering = {(plan["sort_order"], plan["limit"], plan["value_fields"][0]) for plan in plans}
+        sql_ordering = len(ordering) == 1
+        if sql_ordering:
+            value_fields.remove(plans[0]["value_fields"][0])
+            value_fields.insert(0, plans[0]["value_fields"][0])
+        else:
+            first = plans[0]
+            profile = ChartQueryModel.get_dataset_details(query_datas[0]["dataset_id"])["profile"]
+            group_fields = first["label_fields"] + ([first["dimension_field"]] if first["dimension_field"] else [])
+            estimated_groups = ChartQueryModel.estimate_group_count(profile, group_fields)
+            if estimated_groups is None or estimated_groups > QUERY_FUSION_MAX_GROUPS:
+                return [ChartQueryModel.build_and_execute_query(query_data, redshift_config, requester) for query_data in query_datas]
+
+        fused_query = {
+            **query_datas[0],
+            "value_fields": value_fields,
+            "limit": plans[0]["limit"] if sql_ordering else None,
+            "sort_order": plans[0]["sort_order"] if sql_ordering else None
+        }
+        fused_plan = ChartQueryModel.build_query(fused_query, order_and_limit=sql_ordering)
+        rows = ChartQueryModel.run_plan(fused_plan, redshift_config, requester)
+        logger.info(f"Fused {len(plans)} chart queries on dataset_id {query_datas[0]['dataset_id']} into one query ({len(value_fields)} value fields)")
+
+        value_start = len(fused_plan["label_fields"]) + (1 if fused_plan["dimension_field"] else 0)
+        results = []
+        for plan in plans:
+            positions = [value_start + value_fields.index(value_field) for value_field in plan["value_fields"]]
+            chart_rows = [row[:value_start] + tuple(row[position] for position in positions) for row in rows]
+            if not sql_ordering:
+                chart_rows = ChartQueryModel.apply_order_and_limit(chart_rows, value_start, plan["sort_order"], plan["limit"])
+            results.append(ChartQueryModel.format_results(chart_rows, plan))
+        return results
+
+    @staticmethod
+    def stream_query(query_data: Dict, redshift_config: Dict, requester: Optional[Dict] = None) -> Iterator[bytes]:
+        """
+        Build a chart query, check its cost, and return a generator of newline-delimited JSON chunks.
+        Without a dimension field each fetched batch is sent as a partial result
+        ({"labels": [...], "values": [...]} or {"labels": [...], "datasets": [...]}) to be appended by the client;
+        with a dimension field the rows must be pivoted, so the full result is sent once.
+        The last line carries "done": true and the plan warnings. Errors raised after streaming
+        started are sent as a final {"error": ..., "status_code": ...} line.
+        """
+        plan = ChartQueryModel.build_query(query_data)
+        # Kiểm tra cost trước khi trả về generator để lỗi 400/409 vẫn có status code đúng
+        ChartQueryModel.check_query_cost(plan, redshift_config, (requester or {}).get("confirmed", True))
+        return ChartQueryModel._stream_lines(plan, redshift_config, requester)
+
+    @staticmethod
+    def _stream_lines(plan: Dict, redshift_config: Dict, requester: Optional[Dict]) -> Iterator[bytes]:
+        formatter = ChartResultFormatter(plan)
+        try:
+            for batch in ChartQueryModel.iter_plan_batches(plan, redshift_config, requester):
+                if formatter.streamable:
+                    yield dumps(formatter.format_batch(batch)) + b"\n"
+                else:
+                    formatter.add_rows(batch)
+        except HTTPException as e:
+            yield dumps({"error": e.detail, "status_code": e.status_code}) + b"\n"
+            return
+        final = {} if formatter.streamable else formatter.result()
+        final["done"] = True
+        final["warnings"] = plan["warnings"]
+        yield dumps(final) + b"\n"
+
+    @staticmethod
+    def normalize_rows(results: List[tuple], plan: Dict) -> List[Dict]:
+        """
+        Convert tuple rows to JSON-safe dictionaries that format the same way after a cache round-trip:
+        label and dimension fields become strings (as rendered in labels), values become floats.
+        """
+        columns = ChartQueryModel.result_columns(plan)
+        text_count = len(columns) - len(plan["value_fields"])
+        return [
+            {
+                **{columns[i]: str(row[i]) for i in range(text_count)},
+                **{columns[i]: None if row[i] is None else float(row[i]) for i in range(text_count, len(columns))}
+            }
+            for row in results
+        ]
+
+    @staticmethod
+    def shift_time_value(value: str, seconds: int) -> str:
+        """
+        Move a date or timestamp string (as rendered by str()) back by seconds, keeping its format.
+        Raises ValueError when value is not an ISO date or timestamp.
+        """
+        parsed = datetime.fromisoformat(value)
+        shifted = parsed - timedelta(seconds=seconds)
+        if len(value) == 10:
+            return date(shifted.year, shifted.month, shifted.day).isoformat()
+        return str(shifted)
+
+    @staticmethod
+    def build_and_execute_incremental(query_data: Dict, redshift_config: Dict, time_field: str, window_seconds: int,
+                                      requester: Optional[Dict] = None) -> Dict:
+        """
+        Execute a chart query grouped by a time label incrementally.
+        Rows for time buckets older than (latest non-NULL cached bucket - window_seconds) are reused from the
+        rows cache; only the recent window is re-queried on Redshift and merged in. The NULL time bucket
+        is kept from the last full recomputation.
+        A full recomputation runs when nothing is cached, every INCREMENTAL_FULL_REFRESH_INTERVAL
+        seconds (to pick up late-arriving data older than the window), or when the time labels are
+        not ISO dates or timestamps.
+        Sort order and limit are applied after merging.
+        Returns Chart.js-compatible data like build_and_execute_query.
+        """
+        if time_field not in query_data["label_fields"]:
+            raise HTTPException(status_code=400, detail=f"Incremental field {time_field} must be one of the label fields")
+
+        cached = chart_cache.get_cached_rows(query_data)
+        incremental = (
+            cached is not None
+            and cached["watermark"] is not None
+            and time.time() - cached["full_at"] < INCREMENTAL_FULL_REFRESH_INTERVAL
+        )
+        if incremental:
+            try:
+                cutoff = ChartQueryModel.shift_time_value(cached["watermark"], window_seconds)
+            except (ValueError, TypeError):
+                # Label không phải date/timestamp ISO (cột VARCHAR, bucket tháng "2024-01", năm kiểu số...): tính lại toàn bộ
+                logger.warning(
+                    f"Incremental field {time_field} of dataset_id {query_data['dataset_id']} has non-ISO value "
+                    f"{cached['watermark']!r}; running a full refresh"
+                )
+                incremental = False
+        if incremental:
+            plan = ChartQueryModel.build_query(query_data, since=(time_field, cutoff), order_and_limit=False)
+            new_rows = ChartQueryModel.normalize_rows(ChartQueryModel.run_plan(plan, redshift_config, requester), plan)
+            # Giữ các bucket cũ hơn cutoff từ cache, thay các bucket trong cửa sổ bằng kết quả mới.
+            # Bucket NULL không nằm trong kết quả since (col >= cutoff) nên được giữ từ lần tính toàn bộ gần nhất
+            rows = [row for row in cached["rows"] if row[time_field] < cutoff or row[time_field] == NULL_LABEL] + new_rows
+            full_at = cached["full_at"]
+            logger.info(f"Incremental refresh for dataset_id {query_data['dataset_id']}: {len(new_rows)} rows since {cutoff}")
+        else:
+            plan = ChartQueryModel.build_query(query_data, order_and_limit=False)
+            rows = ChartQueryModel.normalize_rows(ChartQueryModel.run_plan(plan, redshift_config, requester), plan)
+            full_at = time.time()
+
+        rows.sort(key=lambda row: row[time_field])
+        # Watermark chỉ lấy từ label khác NULL ("None" xếp sau mọi ngày ISO)
+        watermark = max((row[time_field] for row in rows if row[time_field] != NULL_LABEL), default=None)
+        chart_cache.set_cached_rows(query_data, rows, watermark, full_at)
+
+        rows = ChartQueryModel.apply_order_and_limit(rows, "value_0", plan["sort_order"], plan["limit"])
+        columns = ChartQueryModel.result_columns(plan)
+        return ChartQueryModel.format_results([tuple(row[column] for column in columns) for row in rows], plan)
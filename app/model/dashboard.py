@@ -3,17 +3,23 @@ from fastapi import HTTPException
 from app.utils.database import get_mysql_connection
 from typing import List, Dict, Optional
 from app.model.comment import CommentModel
+from app.utils.redis import redis_client
+import redis
 import json
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+HOT_DASHBOARDS_KEY = "dashboard:hot"
+DASHBOARD_VIEWS_KEY = "dashboard:views"
+
 class DashboardModel:
     @staticmethod
     def create_dashboard(dashboard_data: Dict, owner: str) -> int:
         """
         Insert a new dashboard into the dashboards table.
-        Sets owner, description, created_at, and updated_at.
+        Sets owner, description, dashboard-level filters, created_at, and updated_at.
         Returns the ID of the created dashboard.
         """
         conn = None
@@ -22,14 +28,15 @@ class DashboardModel:
             cursor = conn.cursor()
 
             query = """
-            INSERT INTO dashboards (name, layout, owner, description, created_at, updated_at)
-            VALUES (%s, %s, %s, %s, NOW(), NOW())
+            INSERT INTO dashboards (name, layout, owner, description, filters, created_at, updated_at)
+            VALUES (%s, %s, %s, %s, %s, NOW(), NOW())
             """
             values = (
                 dashboard_data["name"],
                 json.dumps(dashboard_data["layout"]),
                 owner,
-                dashboard_data.get("description")
+                dashboard_data.get("description"),
+                json.dumps(dashboard_data.get("filters") or {})
             )
             cursor.execute(query, values)
             conn.commit()
@@ -76,6 +83,9 @@ class DashboardModel:
             if "description" in dashboard_data:
                 updates.append("description = %s")
                 values.append(dashboard_data["description"])
+            if dashboard_data.get("filters") is not None:
+                updates.append("filters = %s")
+                values.append(json.dumps(dashboard_data["filters"]))
 
             if len(updates) == 1:  # Only updated_at
                 return True
@@ -152,7 +162,7 @@ class DashboardModel:
             cursor = conn.cursor(dictionary=True)
 
             query = """
-            SELECT d.id, d.name, d.layout, d.owner, d.description, d.created_at, d.updated_at
+            SELECT d.id, d.name, d.layout, d.owner, d.description, d.filters, d.created_at, d.updated_at
             FROM dashboards d
             WHERE d.owner = %s
             OR EXISTS (
@@ -167,6 +177,7 @@ class DashboardModel:
 
             for dashboard in dashboards:
                 dashboard["layout"] = json.loads(dashboard["layout"])
+                dashboard["filters"] = json.loads(dashboard["filters"]) if dashboard["filters"] else {}
                 # Fetch shared users
                 cursor.execute("""
                     SELECT shared_with
@@ -197,7 +208,7 @@ class DashboardModel:
                 cursor = conn.cursor(dictionary=True)
 
                 query = """
-                SELECT id, name, layout, owner, description, created_at, updated_at
+                SELECT id, name, layout, owner, description, filters, created_at, updated_at
                 FROM dashboards
                 WHERE id = %s
                 AND (
@@ -214,6 +225,7 @@ class DashboardModel:
                 dashboard = cursor.fetchone()
                 if dashboard:
                     dashboard["layout"] = json.loads(dashboard["layout"])
+                    dashboard["filters"] = json.loads(dashboard["filters"]) if dashboard["filters"] else {}
                     # Fetch shared users
                     cursor.execute("""
                         SELECT shared_with
@@ -322,4 +334,108 @@ class DashboardModel:
             if conn:
                 cursor.close()
                 conn.close()
-    
\ No newline at end of file
+
+    @staticmethod
+    def get_dashboards_by_ids(dashboard_ids: List[int]) -> List[Dict]:
+        """
+        Retrieve dashboards by IDs without access checks.
+        Used by background jobs (e.g. cache pre-warming), never exposed directly to users.
+        """
+        if not dashboard_ids:
+            return []
+        conn = None
+        try:
+            conn = get_mysql_connection()
+            cursor = conn.cursor(dictionary=True)
+
+            placeholders = ", ".join(["%s"] * len(dashboard_ids))
+            query = f"""
+            SELECT id, name, layout, owner, description, filters, created_at, updated_at
+            FROM dashboards
+            WHERE id IN ({placeholders})
+            """
+            cursor.execute(query, tuple(dashboard_ids))
+            dashboards = cursor.fetchall()
+            for dashboard in dashboards:
+                dashboard["layout"] = json.loads(dashboard["layout"])
+                dashboard["filters"] = json.loads(dashboard["filters"]) if dashboard["filters"] else {}
+            return dashboards
+        except MySQLError as e:
+            logger.error(f"Failed to fetch dashboards {dashboard_ids}: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Failed to fetch dashboards: {str(e)}")
+        finally:
+            if conn:
+                cursor.close()
+                conn.close()
+
+    @staticmethod
+    def set_dashboard_hot(dashboard_id: int, hot: bool, current_user: str) -> bool:
+        """
+        Mark or unmark a dashboard as hot so its charts are pre-warmed. Only the owner can change it.
+        Returns True if updated.
+        """
+        conn = None
+        try:
+            conn = get_mysql_connection()
+            cursor = conn.cursor()
+
+            # Check if dashboard exists and user is owner
+            cursor.execute("SELECT owner FROM dashboards WHERE id = %s", (dashboard_id,))
+            dashboard = cursor.fetchone()
+            if not dashboard:
+                raise HTTPException(status_code=404, detail="Dashboard not found")
+            if dashboard[0] != current_user:
+                raise HTTPException(status_code=403, detail="Only the owner can change the hot flag")
+        except MySQLError as e:
+            logger.error(f"Failed to fetch dashboard {dashboard_id}: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Failed to fetch dashboard: {str(e)}")
+        finally:
+            if conn:
+                cursor.close()
+                conn.close()
+
+        try:
+            if hot:
+                redis_client.sadd(HOT_DASHBOARDS_KEY, dashboard_id)
+            else:
+                redis_client.srem(HOT_DASHBOARDS_KEY, dashboard_id)
+            logger.info(f"Set hot={hot} for dashboard {dashboard_id} by {current_user}")
+            return True
+        except redis.RedisError as e:
+            logger.error(f"Failed to update hot flag for dashboard {dashboard_id}: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Failed to update hot flag: {str(e)}")
+
+    @staticmethod
+    def get_hot_dashboard_ids() -> List[int]:
+        """
+        Retrieve IDs of dashboards marked as hot.
+        """
+        try:
+            return [int(dashboard_id) for dashboard_id in redis_client.smembers(HOT_DASHBOARDS_KEY)]
+        except redis.RedisError as e:
+            logger.warning(f"Failed to fetch hot dashboards: {str(e)}")
+            return []
+
+    @staticmethod
+    def record_dashboard_view(dashboard_id: int):
+        """
+        Record the last time a dashboard was viewed, used to pick dashboards to pre-warm.
+        """
+        try:
+            redis_client.zadd(DASHBOARD_VIEWS_KEY, {str(dashboard_id): time.time()})
+        except redis.RedisError as e:
+            logger.warning(f"Failed to record view for dashboard {dashboard_id}: {str(e)}")
+
+    @staticmethod
+    def get_recently_viewed_dashboard_ids(window_seconds: int) -> List[int]:
+        """
+        Retrieve IDs of dashboards viewed within the last window_seconds.
+        Older entries are pruned.
+        """
+        min_score = time.time() - window_seconds
+        try:
+            redis_client.zremrangebyscore(DASHBOARD_VIEWS_KEY, "-inf", f"({min_score}")
+            return [int(dashboard_id) for dashboard_id in redis_client.zrangebyscore(DASHBOARD_VIEWS_KEY, min_score, "+inf")]
+        except redis.RedisError as e:
+            logger.warning(f"Failed to fetch recently viewed dashboards: {str(e)}")
+            return []
@@ -2,84 +2,235 @@ from fastapi import HTTPException
 import psycopg2
 from psycopg2.extras import RealDictCursor
 from typing import List, Dict, Optional
+import logging
+import threading
+import time
+import redis
+from app.utils.database import get_redshift_connection
+from app.utils.redis import redis_client
+from app.utils.serialization import dumps, loads
+from app.utils.prefix_index import PrefixIndex
+from config import CATALOG_REFRESH_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+CATALOG_KEY = "redshift:catalog"
+CATALOG_LOCK_KEY = "redshift:catalog_lock"
+
+# Snapshot catalog trong process: (snapshot, search index)
+_catalog_state = {"snapshot": None, "index": None}
+_catalog_lock = threading.Lock()
+# Chỉ một thread trong process build lại catalog từ Redshift, các thread khác chờ rồi dùng kết quả đó
+_catalog_rebuild_lock = threading.Lock()
 
 class RedshiftMetadataModel:
     @staticmethod
     def get_redshift_connection(redshift_config: Dict):
         """
-        Create and return a Redshift database connection.
+        Return a pooled Redshift database connection (closing it returns it to the pool).
         """
         try:
-            conn = psycopg2.connect(**redshift_config)
-            return conn
+            return get_redshift_connection(redshift_config)
         except psycopg2.Error as e:
             raise HTTPException(status_code=500, detail=f"Failed to connect to Redshift: {str(e)}")
 
     @staticmethod
-    def get_all_schemas(redshift_config: Dict) -> List[Dict]:
+    def build_catalog_snapshot(redshift_config: Dict) -> Dict:
         """
-        Retrieve a list of all schemas in the Redshift database.
-        Returns a list of dictionaries with schema_name.
+        Read schemas, tables and columns from Redshift system views in three queries.
+        pg_catalog and SVV_* views are much faster than information_schema on Redshift.
+        Returns a snapshot with built_at, schemas, tables (by schema) and columns (by schema.table).
         """
         conn = None
         try:
             conn = RedshiftMetadataModel.get_redshift_connection(redshift_config)
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            cursor = conn.cursor()
 
-            query = """
-            SELECT schema_name
-            FROM information_schema.schemata
-            WHERE schema_name NOT IN ('pg_catalog', 'information_schema')
-            ORDER BY schema_name
-            """
-            cursor.execute(query)
-            schemas = cursor.fetchall()
-            return schemas
+            cursor.execute("""
+            SELECT nspname
+            FROM pg_catalog.pg_namespace
+            WHERE nspname NOT IN ('pg_catalog', 'information_schema')
+            AND LEFT(nspname, 3) <> 'pg_'
+            ORDER BY nspname
+            """)
+            schemas = [row[0] for row in cursor.fetchall()]
+
+            cursor.execute("""
+            SELECT table_schema, table_name
+            FROM svv_tables
+            WHERE table_type = 'BASE TABLE'
+            AND table_schema NOT IN ('pg_catalog', 'information_schema')
+            ORDER BY table_schema, table_name
+            """)
+            tables: Dict[str, List[str]] = {}
+            table_keys = set()
+            for schema_name, table_name in cursor.fetchall():
+                tables.setdefault(schema_name, []).append(table_name)
+                table_keys.add(f"{schema_name}.{table_name}")
+
+            cursor.execute("""
+            SELECT table_schema, table_name, column_name, data_type
+            FROM svv_columns
+            WHERE table_schema NOT IN ('pg_catalog', 'information_schema')
+            ORDER BY table_schema, table_name, ordinal_position
+            """)
+            columns: Dict[str, List[Dict]] = {}
+            for schema_name, table_name, column_name, data_type in cursor.fetchall():
+                key = f"{schema_name}.{table_name}"
+                # svv_columns gồm cả view và external table, chỉ giữ BASE TABLE
+                if key not in table_keys:
+                    continue
+                columns.setdefault(key, []).append({"column_name": column_name, "data_type": data_type})
+
+            return {"built_at": time.time(), "schemas": schemas, "tables": tables, "columns": columns}
         except psycopg2.Error as e:
-            raise HTTPException(status_code=500, detail=f"Failed to fetch schemas: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Failed to build Redshift catalog: {str(e)}")
         finally:
             if conn:
                 cursor.close()
                 conn.close()
 
     @staticmethod
-    def get_all_tables(redshift_config: Dict, schema_name: Optional[str] = None) -> List[Dict]:
+    def build_search_index(snapshot: Dict) -> PrefixIndex:
         """
-        Retrieve a list of tables in the Redshift database, optionally filtered by schema.
-        Returns a list of dictionaries with schema_name and table_name.
+        Build an in-memory prefix index over schema, table and column names.
         """
-        conn = None
+        entries = [(schema_name, {"kind": "schema", "schema_name": schema_name}) for schema_name in snapshot["schemas"]]
+        for schema_name, table_names in snapshot["tables"].items():
+            for table_name in table_names:
+                entries.append((table_name, {"kind": "table", "schema_name": schema_name, "table_name": table_name}))
+                for column in snapshot["columns"].get(f"{schema_name}.{table_name}", []):
+                    entries.append((column["column_name"], {
+                        "kind": "column",
+                        "schema_name": schema_name,
+                        "table_name": table_name,
+                        "column_name": column["column_name"],
+                        "data_type": column["data_type"]
+                    }))
+        return PrefixIndex(entries)
+
+    @staticmethod
+    def _set_local_catalog(snapshot: Dict):
+        index = RedshiftMetadataModel.build_search_index(snapshot)
+        with _catalog_lock:
+            _catalog_state["snapshot"] = snapshot
+            _catalog_state["index"] = index
+
+    @staticmethod
+    def _load_shared_catalog() -> Optional[Dict]:
         try:
-            conn = RedshiftMetadataModel.get_redshift_connection(redshift_config)
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            raw = redis_client.get(CATALOG_KEY)
+            return loads(raw) if raw else None
+        except redis.RedisError as e:
+            logger.warning(f"Failed to read Redshift catalog from Redis: {str(e)}")
+            return None
 
-            query = """
-            SELECT table_schema AS schema_name, table_name
-            FROM information_schema.tables
-            WHERE table_type = 'BASE TABLE'
-            AND table_schema NOT IN ('pg_catalog', 'information_schema')
-            """
-            params = []
-            if schema_name:
-                query += " AND table_schema = %s"
-                params.append(schema_name)
-            query += " ORDER BY table_schema, table_name"
-            cursor.execute(query, params)
-            tables = cursor.fetchall()
-            return tables
-        except psycopg2.Error as e:
-            raise HTTPException(status_code=500, detail=f"Failed to fetch tables: {str(e)}")
-        finally:
-            if conn:
-                cursor.close()
-                conn.close()
+    @staticmethod
+    def refresh_catalog(redshift_config: Dict) -> Dict:
+        """
+        Rebuild the catalog snapshot from Redshift and publish it to Redis and this process.
+        Returns the new snapshot.
+        """
+        snapshot = RedshiftMetadataModel.build_catalog_snapshot(redshift_config)
+        try:
+            redis_client.set(CATALOG_KEY, dumps(snapshot), ex=CATALOG_REFRESH_INTERVAL * 3)
+        except redis.RedisError as e:
+            logger.warning(f"Failed to store Redshift catalog in Redis: {str(e)}")
+        RedshiftMetadataModel._set_local_catalog(snapshot)
+        logger.info(f"Refreshed Redshift catalog: {len(snapshot['schemas'])} schemas, {len(snapshot['columns'])} tables")
+        return snapshot
+
+    @staticmethod
+    def sync_catalog(redshift_config: Dict):
+        """
+        Scheduled refresh: one worker rebuilds the catalog from Redshift,
+        the others pick up the newer snapshot from Redis.
+        """
+        try:
+            acquired = redis_client.set(CATALOG_LOCK_KEY, 1, nx=True, ex=max(CATALOG_REFRESH_INTERVAL - 1, 1))
+        except redis.RedisError as e:
+            logger.warning(f"Failed to acquire Redshift catalog lock: {str(e)}")
+            acquired = True
+        if acquired:
+            RedshiftMetadataModel.refresh_catalog(redshift_config)
+            return
+
+        shared = RedshiftMetadataModel._load_shared_catalog()
+        local = _catalog_state["snapshot"]
+        if shared and (not local or shared["built_at"] > local["built_at"]):
+            RedshiftMetadataModel._set_local_catalog(shared)
+
+    @staticmethod
+    def _get_fresh_catalog() -> Optional[Dict]:
+        """
+        Return the in-process or Redis snapshot if it is younger than 2 * CATALOG_REFRESH_INTERVAL, else None.
+        """
+        snapshot = _catalog_state["snapshot"]
+        if snapshot and time.time() - snapshot["built_at"] < CATALOG_REFRESH_INTERVAL * 2:
+            return snapshot
+
+        shared = RedshiftMetadataModel._load_shared_catalog()
+        if shared and time.time() - shared["built_at"] < CATALOG_REFRESH_INTERVAL * 2:
+            RedshiftMetadataModel._set_local_catalog(shared)
+            return shared
+        return None
+
+    @staticmethod
+    def get_catalog(redshift_config: Dict) -> Dict:
+        """
+        Return the catalog snapshot: in-process copy first, then Redis, then Redshift.
+        Concurrent callers finding no fresh snapshot wait for a single rebuild instead of each scanning Redshift.
+        """
+        snapshot = RedshiftMetadataModel._get_fresh_catalog()
+        if snapshot:
+            return snapshot
+        with _catalog_rebuild_lock:
+            # Thread khác có thể vừa build xong trong lúc chờ lock
+            snapshot = RedshiftMetadataModel._get_fresh_catalog()
+            if snapshot:
+                return snapshot
+            return RedshiftMetadataModel.refresh_catalog(redshift_config)
+
+    @staticmethod
+    def get_all_schemas(redshift_config: Dict) -> List[Dict]:
+        """
+        Retrieve a list of all schemas in the Redshift database from the catalog snapshot.
+        Returns a list of dictionaries with schema_name.
+        """
+        catalog = RedshiftMetadataModel.get_catalog(redshift_config)
+        return [{"schema_name": schema_name} for schema_name in catalog["schemas"]]
+
+    @staticmethod
+    def get_all_tables(redshift_config: Dict, schema_name: Optional[str] = None) -> List[Dict]:
+        """
+        Retrieve a list of tables in the Redshift database from the catalog snapshot, optionally filtered by schema.
+        Returns a list of dictionaries with schema_name and table_name.
+        """
+        catalog = RedshiftMetadataModel.get_catalog(redshift_config)
+        schema_names = [schema_name] if schema_name else sorted(catalog["tables"])
+        return [
+            {"schema_name": name, "table_name": table_name}
+            for name in schema_names
+            for table_name in catalog["tables"].get(name, [])
+        ]
 
     @staticmethod
     def get_table_columns(redshift_config: Dict, table_name: str, schema_name: str) -> List[Dict]:
         """
         Retrieve a list of columns for a specific table in Redshift.
+        Served from the catalog snapshot; tables created after the last refresh, or all tables when
+        the catalog cannot be built, are looked up directly.
         Returns a list of dictionaries with column_name and data_type.
         """
+        try:
+            catalog = RedshiftMetadataModel.get_catalog(redshift_config)
+            columns = catalog["columns"].get(f"{schema_name}.{table_name}")
+        except HTTPException as e:
+            logger.warning(f"Redshift catalog unavailable, reading columns of {schema_name}.{table_name} directly: {e.detail}")
+            columns = None
+        if columns:
+            return columns
+
         conn = None
         try:
             conn = RedshiftMetadataModel.get_redshift_connection(redshift_config)
@@ -87,7 +238,7 @@ class RedshiftMetadataModel:
 
             query = """
             SELECT column_name, data_type
-            FROM information_schema.columns
+            FROM svv_columns
             WHERE table_name = %s
             AND table_schema = %s
             ORDER BY ordinal_position
@@ -102,4 +253,23 @@ class RedshiftMetadataModel:
         finally:
             if conn:
                 cursor.close()
-                conn.close()
\ No newline at end of file
+                conn.close()
+
+    @staticmethod
+    def search_catalog(redshift_config: Dict, prefix: str, kind: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        """
+        Search schemas, tables and columns whose name starts with prefix (case-insensitive).
+        Served entirely from the in-memory index.
+        """
+        RedshiftMetadataModel.get_catalog(redshift_config)
+        index = _catalog_state["index"]
+        if kind is None:
+            return index.search(prefix, limit)
+        start, end = index.range(prefix)
+        results = []
+        for value in index.values[start:end]:
+            if value["kind"] == kind:
+                results.append(value)
+                if len(results) >= limit:
+                    break
+        return results
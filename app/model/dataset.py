@@ -1,7 +1,21 @@
 from mysql.connector import Error
 from fastapi import HTTPException
 from app.utils.database import get_mysql_connection
-from typing import List, Dict
+from app.model.database_metadata import RedshiftMetadataModel
+from app.utils.serialization import dumps_str, loads
+from typing import List, Dict, Optional
+from datetime import datetime, timedelta
+import psycopg2
+from psycopg2.extras import RealDictCursor
+import logging
+from config import PROFILE_SAMPLE_ROWS, PROFILE_TOP_VALUES, PROFILE_TOP_VALUES_MAX_DISTINCT
+
+logger = logging.getLogger(__name__)
+
+# Kiểu dữ liệu Redshift không hỗ trợ COUNT(DISTINCT)/GROUP BY
+UNPROFILABLE_TYPES = ("super", "geometry", "geography", "hllsketch", "varbyte")
+# Kiểu dữ liệu có thể tính MIN/MAX
+ORDERABLE_TYPES = ("smallint", "integer", "bigint", "numeric", "real", "double", "date", "time", "character")
 
 class DatasetModel:
     @staticmethod
@@ -36,7 +50,7 @@ class DatasetModel:
     def get_all_datasets() -> List[Dict]:
         """
         Retrieve all datasets from the datasets table.
-        Returns a list of dictionaries with id, database, table_name, and schema_name.
+        Returns a list of dictionaries with id, database, table_name, schema_name and profiled_at.
         """
         conn = None
         try:
@@ -44,7 +58,7 @@ class DatasetModel:
             cursor = conn.cursor(dictionary=True)
 
             query = """
-            SELECT id, `database`, table_name, schema_name
+            SELECT id, `database`, table_name, schema_name, profiled_at
             FROM datasets
             """
             cursor.execute(query)
@@ -83,4 +97,176 @@ class DatasetModel:
         finally:
             if conn:
                 cursor.close()
-                conn.close()
\ No newline at end of file
+                conn.close()
+
+    @staticmethod
+    def get_dataset(dataset_id: int) -> Dict:
+        """
+        Retrieve a dataset by ID, including its column profile.
+        Raises 404 if the dataset does not exist.
+        """
+        conn = None
+        try:
+            conn = get_mysql_connection()
+            cursor = conn.cursor(dictionary=True)
+
+            query = """
+            SELECT id, `database`, table_name, schema_name, profile, profiled_at
+            FROM datasets
+            WHERE id = %s
+            """
+            cursor.execute(query, (dataset_id,))
+            dataset = cursor.fetchone()
+            if not dataset:
+                raise HTTPException(status_code=404, detail="Dataset not found")
+            dataset["profile"] = loads(dataset["profile"]) if dataset["profile"] else None
+            return dataset
+        except Error as e:
+            raise HTTPException(status_code=500, detail=f"Failed to fetch dataset: {str(e)}")
+        finally:
+            if conn:
+                cursor.close()
+                conn.close()
+
+    @staticmethod
+    def get_stale_profile_dataset_ids(max_age: int) -> List[int]:
+        """
+        Retrieve IDs of datasets that were never profiled or whose profile is older than max_age seconds.
+        """
+        conn = None
+        try:
+            conn = get_mysql_connection()
+            cursor = conn.cursor()
+
+            query = """
+            SELECT id
+            FROM datasets
+            WHERE profiled_at IS NULL OR profiled_at < %s
+            ORDER BY profiled_at IS NOT NULL, profiled_at, id
+            """
+            cursor.execute(query, (datetime.now() - timedelta(seconds=max_age),))
+            return [row[0] for row in cursor.fetchall()]
+        except Error as e:
+            raise HTTPException(status_code=500, detail=f"Failed to fetch datasets: {str(e)}")
+        finally:
+            if conn:
+                cursor.close()
+                conn.close()
+
+    @staticmethod
+    def save_dataset_profile(dataset_id: int, profile: Dict):
+        """
+        Store the column profile of a dataset and set profiled_at to now.
+        """
+        conn = None
+        try:
+            conn = get_mysql_connection()
+            cursor = conn.cursor()
+
+            query = """
+            UPDATE datasets
+            SET profile = %s, profiled_at = NOW()
+            WHERE id = %s
+            """
+            cursor.execute(query, (dumps_str(profile), dataset_id))
+            conn.commit()
+        except Error as e:
+            raise HTTPException(status_code=500, detail=f"Failed to save dataset profile: {str(e)}")
+        finally:
+            if conn:
+                cursor.close()
+                conn.close()
+
+    @staticmethod
+    def build_profile_query(qualified_table: str, columns: List[Dict]) -> str:
+        """
+        Build a single-scan statistics query: row count, then per column
+        APPROXIMATE COUNT(DISTINCT), null count and (for orderable types) MIN/MAX.
+        Column i is aliased c{i}_distinct, c{i}_nulls, c{i}_min, c{i}_max.
+        """
+        select_items = ["COUNT(*) AS row_count"]
+        for i, column in enumerate(columns):
+            name = f'"{column["column_name"]}"'
+            select_items.append(f"APPROXIMATE COUNT(DISTINCT {name}) AS c{i}_distinct")
+            select_items.append(f"SUM(CASE WHEN {name} IS NULL THEN 1 ELSE 0 END) AS c{i}_nulls")
+            if column["data_type"].startswith(ORDERABLE_TYPES):
+                select_items.append(f"MIN({name}) AS c{i}_min")
+                select_items.append(f"MAX({name}) AS c{i}_max")
+        return f"SELECT {', '.join(select_items)} FROM {qualified_table}"
+
+    @staticmethod
+    def profile_dataset(dataset_id: int, redshift_config: Dict) -> Dict:
+        """
+        Compute per-column statistics of a dataset on Redshift and store them on the datasets row.
+        Distinct counts use APPROXIMATE COUNT(DISTINCT) (HyperLogLog); top values are computed
+        on a random sample of about PROFILE_SAMPLE_ROWS rows and scaled to the full table.
+        Returns the profile.
+        """
+        dataset = DatasetModel.get_dataset(dataset_id)
+        schema_name, table_name = dataset["schema_name"], dataset["table_name"]
+        columns = [
+            column for column in RedshiftMetadataModel.get_table_columns(redshift_config, table_name, schema_name)
+            if not column["data_type"].startswith(UNPROFILABLE_TYPES)
+        ]
+        qualified_table = f'"{schema_name}"."{table_name}"'
+
+        conn = None
+        try:
+            conn = RedshiftMetadataModel.get_redshift_connection(redshift_config)
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+
+            cursor.execute(DatasetModel.build_profile_query(qualified_table, columns))
+            stats = cursor.fetchone()
+            row_count = stats["row_count"] or 0
+            fraction = min(1.0, PROFILE_SAMPLE_ROWS / row_count) if row_count else 1.0
+
+            profile_columns = {}
+            for i, column in enumerate(columns):
+                approx_distinct = stats[f"c{i}_distinct"] or 0
+                nulls = stats[f"c{i}_nulls"] or 0
+                column_profile = {
+                    "data_type": column["data_type"],
+                    "approx_distinct": approx_distinct,
+                    "null_ratio": round(nulls / row_count, 4) if row_count else 0.0,
+                    "min": stats.get(f"c{i}_min"),
+                    "max": stats.get(f"c{i}_max"),
+                    "top_values": None
+                }
+                if 0 < approx_distinct <= PROFILE_TOP_VALUES_MAX_DISTINCT:
+                    name = f'"{column["column_name"]}"'
+                    sample_clause = "WHERE RANDOM() < %s" if fraction < 1.0 else ""
+                    cursor.execute(
+                        f"SELECT {name} AS value, COUNT(*) AS count FROM {qualified_table} {sample_clause} "
+                        f"GROUP BY {name} ORDER BY count DESC LIMIT {PROFILE_TOP_VALUES}",
+                        (fraction,) if sample_clause else None
+                    )
+                    column_profile["top_values"] = [
+                        {"value": row["value"], "count": int(round(row["count"] / fraction))}
+                        for row in cursor.fetchall()
+                    ]
+                profile_columns[column["column_name"]] = column_profile
+
+            profile = {"row_count": row_count, "sample_fraction": fraction, "columns": profile_columns}
+        except psycopg2.Error as e:
+            logger.error(f"Failed to profile dataset {dataset_id}: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Failed to profile dataset: {str(e)}")
+        finally:
+            if conn:
+                cursor.close()
+                conn.close()
+
+        # Chuẩn hoá Decimal/date của min/max/top values về kiểu JSON trước khi lưu
+        profile = loads(dumps_str(profile))
+        DatasetModel.save_dataset_profile(dataset_id, profile)
+        logger.info(f"Profiled dataset {dataset_id}: {row_count} rows, {len(profile_columns)} columns")
+        return profile
+
+    @staticmethod
+    def get_dataset_profile(dataset_id: int) -> Optional[Dict]:
+        """
+        Return the stored column profile of a dataset with profiled_at, or None if never profiled.
+        """
+        dataset = DatasetModel.get_dataset(dataset_id)
+        if dataset["profile"] is None:
+            return None
+        return {"dataset_id": dataset_id, "profiled_at": dataset["profiled_at"], **dataset["profile"]}
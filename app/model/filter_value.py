@@ -0,0 +1,168 @@
+from fastapi import HTTPException
+from typing import List, Dict, Optional
+import heapq
+import threading
+import time
+import logging
+import psycopg2
+import redis
+from app.model.database_metadata import RedshiftMetadataModel
+from app.model.dataset import DatasetModel
+from app.utils.prefix_index import PrefixIndex
+from app.utils.redis import redis_client
+from app.utils.serialization import dumps, loads
+from config import FILTER_VALUES_SAMPLE_ROWS, FILTER_VALUES_MAX, FILTER_VALUES_REFRESH_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+VALUES_KEY_PREFIX = "filter_values"
+# Tập các cột đã được dùng để autocomplete ("dataset_id:column"), job định kỳ chỉ làm mới các cột này
+TRACKED_COLUMNS_KEY = "filter_values:columns"
+
+# Index trong process: (dataset_id, column) -> {"built_at", "index", "top"}
+_local_indexes: Dict[tuple, Dict] = {}
+_build_locks: Dict[tuple, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+class FilterValueModel:
+    @staticmethod
+    def _values_key(dataset_id: int, column: str) -> str:
+        return f"{VALUES_KEY_PREFIX}:{dataset_id}:{column}"
+
+    @staticmethod
+    def _get_build_lock(key: tuple) -> threading.Lock:
+        with _locks_guard:
+            return _build_locks.setdefault(key, threading.Lock())
+
+    @staticmethod
+    def get_dataset_column(dataset_id: int, column: str, redshift_config: Dict) -> Dict:
+        """
+        Return the dataset and check that column exists in its table (from the catalog snapshot).
+        """
+        dataset = DatasetModel.get_dataset(dataset_id)
+        columns = RedshiftMetadataModel.get_table_columns(redshift_config, dataset["table_name"], dataset["schema_name"])
+        if column not in {item["column_name"] for item in columns}:
+            raise HTTPException(status_code=400, detail=f"Column {column} not found in dataset {dataset_id}")
+        return dataset
+
+    @staticmethod
+    def sample_values(dataset_id: int, column: str, redshift_config: Dict) -> List[List]:
+        """
+        Sample distinct values of a column with their estimated row counts, most frequent first.
+        Uses a RANDOM() sample of about FILTER_VALUES_SAMPLE_ROWS rows and keeps at most FILTER_VALUES_MAX values.
+        """
+        dataset = FilterValueModel.get_dataset_column(dataset_id, column, redshift_config)
+        qualified_table = f'"{dataset["schema_name"]}"."{dataset["table_name"]}"'
+        profile = dataset["profile"]
+        row_count = profile["row_count"] if profile else None
+
+        conn = None
+        try:
+            conn = RedshiftMetadataModel.get_redshift_connection(redshift_config)
+            cursor = conn.cursor()
+            if row_count is None:
+                cursor.execute(f"SELECT COUNT(*) FROM {qualified_table}")
+                row_count = cursor.fetchone()[0]
+            fraction = min(1.0, FILTER_VALUES_SAMPLE_ROWS / row_count) if row_count else 1.0
+            sample_clause = "AND RANDOM() < %s" if fraction < 1.0 else ""
+            cursor.execute(
+                f'SELECT "{column}", COUNT(*) FROM {qualified_table} WHERE "{column}" IS NOT NULL {sample_clause} '
+                f'GROUP BY "{column}" ORDER BY 2 DESC LIMIT {FILTER_VALUES_MAX}',
+                (fraction,) if sample_clause else None
+            )
+            return [[str(value), int(round(count / fraction))] for value, count in cursor.fetchall()]
+        except psycopg2.Error as e:
+            logger.error(f"Failed to sample values of {column} in dataset {dataset_id}: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Failed to sample filter values: {str(e)}")
+        finally:
+            if conn:
+                cursor.close()
+                conn.close()
+
+    @staticmethod
+    def _set_local_index(dataset_id: int, column: str, entry: Dict):
+        index = PrefixIndex((value, (value, count)) for value, count in entry["values"])
+        _local_indexes[(dataset_id, column)] = {
+            "built_at": entry["built_at"],
+            "index": index,
+            # values đã được sắp xếp theo count giảm dần, dùng trực tiếp cho prefix rỗng
+            "top": [(value, count) for value, count in entry["values"]]
+        }
+
+    @staticmethod
+    def build_index(dataset_id: int, column: str, redshift_config: Dict) -> Dict:
+        """
+        Sample the values of a column and publish the index to Redis and this process.
+        """
+        entry = {"built_at": time.time(), "values": FilterValueModel.sample_values(dataset_id, column, redshift_config)}
+        try:
+            pipe = redis_client.pipeline()
+            pipe.set(FilterValueModel._values_key(dataset_id, column), dumps(entry), ex=FILTER_VALUES_REFRESH_INTERVAL * 3)
+            pipe.sadd(TRACKED_COLUMNS_KEY, f"{dataset_id}:{column}")
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Failed to store filter values of {column} in dataset {dataset_id}: {str(e)}")
+        FilterValueModel._set_local_index(dataset_id, column, entry)
+        logger.info(f"Built filter value index for dataset {dataset_id}.{column}: {len(entry['values'])} values")
+        return _local_indexes[(dataset_id, column)]
+
+    @staticmethod
+    def get_index(dataset_id: int, column: str, redshift_config: Dict) -> Dict:
+        """
+        Return the value index of a column: in-process copy first, then Redis, then a new sample from Redshift.
+        """
+        key = (dataset_id, column)
+        local = _local_indexes.get(key)
+        if local and time.time() - local["built_at"] < FILTER_VALUES_REFRESH_INTERVAL * 2:
+            return local
+
+        with FilterValueModel._get_build_lock(key):
+            local = _local_indexes.get(key)
+            if local and time.time() - local["built_at"] < FILTER_VALUES_REFRESH_INTERVAL * 2:
+                return local
+            try:
+                raw = redis_client.get(FilterValueModel._values_key(dataset_id, column))
+            except redis.RedisError as e:
+                logger.warning(f"Failed to read filter values from Redis: {str(e)}")
+                raw = None
+            if raw:
+                entry = loads(raw)
+                if time.time() - entry["built_at"] < FILTER_VALUES_REFRESH_INTERVAL * 2:
+                    FilterValueModel._set_local_index(dataset_id, column, entry)
+                    return _local_indexes[key]
+            return FilterValueModel.build_index(dataset_id, column, redshift_config)
+
+    @staticmethod
+    def search_values(dataset_id: int, column: str, prefix: str, limit: int, redshift_config: Dict) -> List[Dict]:
+        """
+        Return the top-k most frequent values of a column starting with prefix (case-insensitive).
+        """
+        index_entry = FilterValueModel.get_index(dataset_id, column, redshift_config)
+        if not prefix:
+            matches = index_entry["top"][:limit]
+        else:
+            index = index_entry["index"]
+            start, end = index.range(prefix)
+            matches = heapq.nlargest(limit, index.values[start:end], key=lambda item: item[1])
+        return [{"value": value, "count": count} for value, count in matches]
+
+    @staticmethod
+    def refresh_tracked_indexes(redshift_config: Dict, dataset_id: Optional[int] = None):
+        """
+        Rebuild the index of every column that has been used for autocomplete (optionally for one dataset).
+        """
+        try:
+            tracked = redis_client.smembers(TRACKED_COLUMNS_KEY)
+        except redis.RedisError as e:
+            logger.warning(f"Failed to read tracked filter columns: {str(e)}")
+            return
+        for member in sorted(m.decode("utf-8") if isinstance(m, bytes) else m for m in tracked):
+            member_dataset_id, column = member.split(":", 1)
+            if dataset_id is not None and int(member_dataset_id) != dataset_id:
+                continue
+            try:
+                FilterValueModel.build_index(int(member_dataset_id), column, redshift_config)
+            except HTTPException as e:
+                if e.status_code in (400, 404):
+                    redis_client.srem(TRACKED_COLUMNS_KEY, member)
+                logger.warning(f"Failed to refresh filter values of {member}: {e.detail}")
@@ -0,0 +1,78 @@
+from collections import Counter
+from typing import Dict, List, Optional
+import logging
+import redis
+from app.utils.redis import redis_client
+from app.utils.serialization import dumps, loads
+from config import PROFILING_MAX_PER_ROUTE, PROFILING_RETENTION
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ROUTES_KEY = "profiles:routes"
+
+class ProfileModel:
+    @staticmethod
+    def _route_key(route: str) -> str:
+        return f"profiles:route:{route}"
+
+    @staticmethod
+    def save_profile(profile: Dict):
+        """
+        Store a request profile under its route, keeping the PROFILING_MAX_PER_ROUTE most recent ones
+        for PROFILING_RETENTION seconds. Failures are logged and the profile is dropped.
+        """
+        key = ProfileModel._route_key(profile["route"])
+        try:
+            pipe = redis_client.pipeline()
+            pipe.lpush(key, dumps(profile))
+            pipe.ltrim(key, 0, PROFILING_MAX_PER_ROUTE - 1)
+            pipe.expire(key, PROFILING_RETENTION)
+            pipe.sadd(PROFILE_ROUTES_KEY, profile["route"])
+            pipe.expire(PROFILE_ROUTES_KEY, PROFILING_RETENTION)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Failed to store profile {profile['id']} of {profile['route']}: {str(e)}")
+
+    @staticmethod
+    def get_profiles(route: str) -> List[Dict]:
+        """
+        Retrieve the stored profiles of a route, most recent first.
+        """
+        try:
+            return [loads(raw) for raw in redis_client.lrange(ProfileModel._route_key(route), 0, -1)]
+        except redis.RedisError as e:
+            logger.warning(f"Failed to read profiles of {route}: {str(e)}")
+            return []
+
+    @staticmethod
+    def list_profiles(route: Optional[str] = None) -> List[Dict]:
+        """
+        Retrieve a summary (without stacks) of the stored profiles of one route, or of every route.
+        """
+        if route is not None:
+            routes = [route]
+        else:
+            try:
+                routes = sorted(member.decode("utf-8") if isinstance(member, bytes) else member
+                                for member in redis_client.smembers(PROFILE_ROUTES_KEY))
+            except redis.RedisError as e:
+                logger.warning(f"Failed to read profiled routes: {str(e)}")
+                return []
+        return [
+            {key: value for key, value in profile.items() if key != "stacks"}
+            for name in routes for profile in ProfileModel.get_profiles(name)
+        ]
+
+    @staticmethod
+    def merge_stacks(route: str, profile_id: Optional[str] = None) -> Optional[Dict[str, int]]:
+        """
+        Merge the sampled stacks of the stored profiles of a route (or only of profile_id).
+        Returns None when no matching profile is stored.
+        """
+        profiles = [profile for profile in ProfileModel.get_profiles(route) if profile_id is None or profile["id"] == profile_id]
+        if not profiles:
+            return None
+        stacks = Counter()
+        for profile in profiles:
+            stacks.update(profile["stacks"])
+        return dict(stacks)
@@ -0,0 +1,161 @@
+from mysql.connector import Error as MySQLError
+from fastapi import HTTPException
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from app.utils.database import get_mysql_connection
+from app.utils.query_stats import percentile_from_buckets
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Cột được phép dùng để sắp xếp top fingerprint
+TOP_ORDERS = {"total_time", "p95", "calls", "max_time", "total_rows", "total_bytes"}
+
+class QueryStatsModel:
+    @staticmethod
+    def insert_window(window_start: float, stats: List[Dict]):
+        """
+        Store the aggregated statistics of one flush window (one row per fingerprint, source, dataset, chart and user).
+        """
+        if not stats:
+            return
+        conn = None
+        try:
+            conn = get_mysql_connection()
+            cursor = conn.cursor()
+            query = """
+            INSERT INTO query_stats (
+                window_start, fingerprint, source, sample_query, dataset_id, chart_id, username,
+                calls, total_time, max_time, total_rows, total_bytes, latency_buckets
+            )
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """
+            started_at = datetime.fromtimestamp(window_start)
+            cursor.executemany(query, [
+                (
+                    started_at, entry["fingerprint"], entry["source"], entry["sample_query"], entry["dataset_id"],
+                    entry["chart_id"], entry["username"], entry["calls"], entry["total_time"], entry["max_time"],
+                    entry["total_rows"], entry["total_bytes"], json.dumps(entry["latency_buckets"])
+                )
+                for entry in stats
+            ])
+            conn.commit()
+        except MySQLError as e:
+            logger.error(f"Failed to store query stats: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Failed to store query stats: {str(e)}")
+        finally:
+            if conn:
+                cursor.close()
+                conn.close()
+
+    @staticmethod
+    def delete_before(cutoff: datetime) -> int:
+        """
+        Delete the windows that started before cutoff. Returns the number of deleted rows.
+        """
+        conn = None
+        try:
+            conn = get_mysql_connection()
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM query_stats WHERE window_start < %s", (cutoff,))
+            conn.commit()
+            return cursor.rowcount
+        except MySQLError as e:
+            logger.error(f"Failed to delete old query stats: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Failed to delete old query stats: {str(e)}")
+        finally:
+            if conn:
+                cursor.close()
+                conn.close()
+
+    @staticmethod
+    def get_top_fingerprints(hours: int, order_by: str = "total_time", limit: int = 20, source: Optional[str] = None) -> List[Dict]:
+        """
+        Aggregate the stored windows of the last hours by fingerprint and return the top entries by order_by.
+        Totals are summed in MySQL (GROUP BY fingerprint); only the latency histograms, datasets, charts and users
+        of the returned fingerprints are merged here. p95 is estimated from the merged histograms (upper bound of the bucket),
+        so ordering by p95 merges the histograms of every fingerprint in the period.
+        """
+        if order_by not in TOP_ORDERS:
+            raise HTTPException(status_code=400, detail=f"order_by must be one of {', '.join(sorted(TOP_ORDERS))}")
+        conditions = "window_start >= %s"
+        params = [datetime.now() - timedelta(hours=hours)]
+        if source:
+            conditions += " AND source = %s"
+            params.append(source)
+        conn = None
+        try:
+            conn = get_mysql_connection()
+            cursor = conn.cursor(dictionary=True)
+            # Mỗi fingerprint chỉ thuộc một source; MAX() để lấy một sample_query đại diện
+            query = f"""
+            SELECT fingerprint, MAX(source) AS source, MAX(sample_query) AS sample_query,
+                   SUM(calls) AS calls, SUM(total_time) AS total_time, MAX(max_time) AS max_time,
+                   SUM(total_rows) AS total_rows, SUM(total_bytes) AS total_bytes
+            FROM query_stats
+            WHERE {conditions}
+            GROUP BY fingerprint
+            """
+            if order_by != "p95":
+                query += f" ORDER BY {order_by} DESC LIMIT %s"
+                cursor.execute(query, tuple(params + [limit]))
+            else:
+                cursor.execute(query, tuple(params))
+            totals = cursor.fetchall()
+
+            rows = []
+            if totals:
+                placeholders = ", ".join(["%s"] * len(totals))
+                cursor.execute(f"""
+                SELECT fingerprint, dataset_id, chart_id, username, latency_buckets
+                FROM query_stats
+                WHERE {conditions} AND fingerprint IN ({placeholders})
+                """, tuple(params + [row["fingerprint"] for row in totals]))
+                rows = cursor.fetchall()
+        except MySQLError as e:
+            logger.error(f"Failed to fetch query stats: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Failed to fetch query stats: {str(e)}")
+        finally:
+            if conn:
+                cursor.close()
+                conn.close()
+
+        fingerprints: Dict[str, Dict] = {}
+        for row in totals:
+            fingerprints[row["fingerprint"]] = {
+                "fingerprint": row["fingerprint"],
+                "source": row["source"],
+                "sample_query": row["sample_query"],
+                "calls": int(row["calls"]),
+                "total_time": float(row["total_time"]),
+                "max_time": float(row["max_time"]),
+                "total_rows": int(row["total_rows"]),
+                "total_bytes": int(row["total_bytes"]),
+                "dataset_ids": set(),
+                "chart_ids": set(),
+                "users": set(),
+                "latency_buckets": None
+            }
+        for row in rows:
+            buckets = json.loads(row["latency_buckets"]) if isinstance(row["latency_buckets"], (str, bytes)) else row["latency_buckets"]
+            entry = fingerprints[row["fingerprint"]]
+            merged = entry["latency_buckets"]
+            entry["latency_buckets"] = buckets if merged is None else [a + b for a, b in zip(merged, buckets)]
+            for key, value in (("dataset_ids", row["dataset_id"]), ("chart_ids", row["chart_id"]), ("users", row["username"])):
+                if value is not None:
+                    entry[key].add(value)
+
+        results = []
+        for entry in fingerprints.values():
+            buckets = entry.pop("latency_buckets")
+            # Bucket +Inf: p95 lấy max_time thay cho cận trên không xác định
+            p95 = percentile_from_buckets(buckets, 0.95) if buckets else None
+            entry["p95"] = p95 if p95 is not None else entry["max_time"]
+            entry["avg_time"] = entry["total_time"] / entry["calls"] if entry["calls"] else 0.0
+            entry["dataset_ids"] = sorted(entry["dataset_ids"])
+            entry["chart_ids"] = sorted(entry["chart_ids"])
+            entry["users"] = sorted(entry["users"])
+            results.append(entry)
+        results.sort(key=lambda item: item[order_by], reverse=True)
+        return results[:limit]
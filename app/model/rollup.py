@@ -0,0 +1,335 @@
+from mysql.connector import Error as MySQLError
+from fastapi import HTTPException
+from app.utils.database import get_mysql_connection
+from app.model.database_metadata import RedshiftMetadataModel
+from app.model.dataset import DatasetModel
+from typing import List, Dict, Optional
+import psycopg2
+import json
+import re
+import logging
+from config import ROLLUP_SCHEMA
+
+logger = logging.getLogger(__name__)
+
+VALUE_FIELD_PATTERN = re.compile(r'^(SUM|COUNT|AVG|MIN|MAX)\(([a-zA-Z0-9_]+)\)$', re.IGNORECASE)
+
+# Cột cần lưu trong rollup cho từng hàm aggregate: AVG được tách thành SUM và COUNT để có thể gộp lại
+STORED_AGGREGATES = {
+    "SUM": ["SUM"],
+    "COUNT": ["COUNT"],
+    "AVG": ["SUM", "COUNT"],
+    "MIN": ["MIN"],
+    "MAX": ["MAX"]
+}
+
+class RollupModel:
+    @staticmethod
+    def parse_value_field(value_field: str):
+        """
+        Split an aggregate like SUM(amount) into ("SUM", "amount").
+        """
+        match = VALUE_FIELD_PATTERN.match(value_field)
+        if not match:
+            raise HTTPException(status_code=400, detail=f"Invalid value field format: {value_field}")
+        return match.group(1).upper(), match.group(2)
+
+    @staticmethod
+    def get_stored_columns(measures: List[str]) -> Dict[str, str]:
+        """
+        Map each stored rollup column (e.g. sum_amount) to the aggregate computed from the base table.
+        """
+        stored = {}
+        for measure in measures:
+            func, column = RollupModel.parse_value_field(measure)
+            for stored_func in STORED_AGGREGATES[func]:
+                stored[f"{stored_func.lower()}_{column}"] = f"{stored_func}({column})"
+        return stored
+
+    @staticmethod
+    def rewrite_value_field(value_field: str) -> str:
+        """
+        Rewrite an aggregate on the base table into the equivalent re-aggregation over rollup columns.
+        SUM -> SUM(sum_x), COUNT -> SUM(count_x), AVG -> SUM(sum_x) / SUM(count_x), MIN/MAX -> MIN/MAX.
+        """
+        func, column = RollupModel.parse_value_field(value_field)
+        if func == "SUM":
+            return f"SUM(sum_{column})"
+        if func == "COUNT":
+            return f"SUM(count_{column})"
+        if func == "AVG":
+            return f"SUM(sum_{column}) / NULLIF(SUM(count_{column}), 0)"
+        return f"{func}({func.lower()}_{column})"
+
+    @staticmethod
+    def _parse_rollup(rollup: Dict) -> Dict:
+        rollup["grain_columns"] = json.loads(rollup["grain_columns"])
+        rollup["measures"] = json.loads(rollup["measures"])
+        return rollup
+
+    @staticmethod
+    def create_rollup(dataset_id: int, rollup_data: Dict, owner: str) -> int:
+        """
+        Register a rollup definition (grain columns, measures and optional time column) for a dataset.
+        The rollup is materialized by refresh_rollup.
+        Returns the ID of the created rollup.
+        """
+        if rollup_data.get("time_column") and rollup_data["time_column"] not in rollup_data["grain_columns"]:
+            raise HTTPException(status_code=400, detail="time_column must be one of the grain columns")
+        RollupModel.get_stored_columns(rollup_data["measures"])
+
+        conn = None
+        try:
+            conn = get_mysql_connection()
+            cursor = conn.cursor()
+            cursor.execute("SELECT id FROM datasets WHERE id = %s", (dataset_id,))
+            if not cursor.fetchone():
+                raise HTTPException(status_code=404, detail=f"Dataset ID {dataset_id} not found")
+
+            query = """
+            INSERT INTO dataset_rollups (dataset_id, name, grain_columns, measures, time_column, owner, created_at)
+            VALUES (%s, %s, %s, %s, %s, %s, NOW())
+            """
+            values = (
+                dataset_id,
+                rollup_data["name"],
+                json.dumps(rollup_data["grain_columns"]),
+                json.dumps(rollup_data["measures"]),
+                rollup_data.get("time_column"),
+                owner
+            )
+            cursor.execute(query, values)
+            conn.commit()
+
+            rollup_id = cursor.lastrowid
+            logger.info(f"Created rollup {rollup_id} on dataset {dataset_id} by {owner}")
+            return rollup_id
+        except MySQLError as e:
+            logger.error(f"Failed to create rollup: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Failed to create rollup: {str(e)}")
+        finally:
+            if conn:
+                cursor.close()
+                conn.close()
+
+    @staticmethod
+    def get_rollups(dataset_id: Optional[int] = None) -> List[Dict]:
+        """
+        Retrieve rollup definitions and their refresh state, optionally for a single dataset.
+        """
+        conn = None
+        try:
+            conn = get_mysql_connection()
+            cursor = conn.cursor(dictionary=True)
+
+            query = """
+            SELECT id, dataset_id, name, grain_columns, measures, time_column, owner,
+                   row_count, watermark, refreshed_at, created_at
+            FROM dataset_rollups
+            """
+            params = ()
+            if dataset_id is not None:
+                query += " WHERE dataset_id = %s"
+                params = (dataset_id,)
+            cursor.execute(query + " ORDER BY id", params)
+            return [RollupModel._parse_rollup(rollup) for rollup in cursor.fetchall()]
+        except MySQLError as e:
+            logger.error(f"Failed to fetch rollups: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Failed to fetch rollups: {str(e)}")
+        finally:
+            if conn:
+                cursor.close()
+                conn.close()
+
+    @staticmethod
+    def get_rollup(rollup_id: int) -> Dict:
+        """
+        Retrieve a rollup by ID. Raises 404 if it does not exist.
+        """
+        conn = None
+        try:
+            conn = get_mysql_connection()
+            cursor = conn.cursor(dictionary=True)
+
+            query = """
+            SELECT id, dataset_id, name, grain_columns, measures, time_column, owner,
+                   row_count, watermark, refreshed_at, created_at
+            FROM dataset_rollups
+            WHERE id = %s
+            """
+            cursor.execute(query, (rollup_id,))
+            rollup = cursor.fetchone()
+            if not rollup:
+                raise HTTPException(status_code=404, detail="Rollup not found")
+            return RollupModel._parse_rollup(rollup)
+        except MySQLError as e:
+            logger.error(f"Failed to fetch rollup {rollup_id}: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Failed to fetch rollup: {str(e)}")
+        finally:
+            if conn:
+                cursor.close()
+                conn.close()
+
+    @staticmethod
+    def get_rollup_table(rollup: Dict) -> str:
+        """
+        Name of the Redshift table holding a materialized rollup.
+        """
+        return f"{ROLLUP_SCHEMA}.rollup_{rollup['dataset_id']}_{rollup['id']}"
+
+    @staticmethod
+    def build_rollup_select(rollup: Dict, source_table: str, where_clause: str = "") -> str:
+        """
+        Build the aggregation query that computes rollup rows from the base table.
+        """
+        grain = ", ".join(rollup["grain_columns"])
+        aggregates = ", ".join(
+            f"{expression} AS {name}" for name, expression in RollupModel.get_stored_columns(rollup["measures"]).items()
+        )
+        return f"SELECT {grain}, {aggregates} FROM {source_table} {where_clause} GROUP BY {grain}"
+
+    @staticmethod
+    def _save_refresh_state(rollup_id: int, row_count: int, watermark: Optional[str]):
+        conn = None
+        try:
+            conn = get_mysql_connection()
+            cursor = conn.cursor()
+            query = """
+            UPDATE dataset_rollups
+            SET row_count = %s, watermark = %s, refreshed_at = NOW()
+            WHERE id = %s
+            """
+            cursor.execute(query, (row_count, watermark, rollup_id))
+            conn.commit()
+        except MySQLError as e:
+            logger.error(f"Failed to save refresh state of rollup {rollup_id}: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Failed to save rollup state: {str(e)}")
+        finally:
+            if conn:
+                cursor.close()
+                conn.close()
+
+    @staticmethod
+    def refresh_rollup(rollup_id: int, redshift_config: Dict, full: bool = False) -> Dict:
+        """
+        Materialize a rollup in Redshift.
+        A full refresh rebuilds the table into a staging table and swaps it in.
+        An incremental refresh (rollup with time_column and a watermark) deletes and recomputes
+        only the rows whose time_column is at or after the last watermark, in one transaction.
+        Returns the rollup with its new row_count and watermark.
+        """
+        rollup = RollupModel.get_rollup(rollup_id)
+        dataset = DatasetModel.get_dataset(rollup["dataset_id"])
+        source_table = f"{dataset['schema_name']}.{dataset['table_name']}"
+        target_table = RollupModel.get_rollup_table(rollup)
+        time_column = rollup["time_column"]
+        incremental = not full and time_column and rollup["watermark"] is not None and rollup["refreshed_at"] is not None
+
+        conn = None
+        try:
+            conn = RedshiftMetadataModel.get_redshift_connection(redshift_config)
+            cursor = conn.cursor()
+            if incremental:
+                cursor.execute(f"DELETE FROM {target_table} WHERE {time_column} >= %s", (rollup["watermark"],))
+                cursor.execute(
+                    f"INSERT INTO {target_table} "
+                    + RollupModel.build_rollup_select(rollup, source_table, f"WHERE {time_column} >= %s"),
+                    (rollup["watermark"],)
+                )
+            else:
+                staging_table = f"{target_table}_staging"
+                cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {ROLLUP_SCHEMA}")
+                cursor.execute(f"DROP TABLE IF EXISTS {staging_table}")
+                cursor.execute(f"CREATE TABLE {staging_table} AS " + RollupModel.build_rollup_select(rollup, source_table))
+                cursor.execute(f"DROP TABLE IF EXISTS {target_table}")
+                cursor.execute(f"ALTER TABLE {staging_table} RENAME TO {target_table.split('.')[1]}")
+
+            cursor.execute(f"SELECT COUNT(*) FROM {target_table}")
+            row_count = cursor.fetchone()[0]
+            watermark = None
+            if time_column:
+                cursor.execute(f"SELECT MAX({time_column}) FROM {target_table}")
+                max_value = cursor.fetchone()[0]
+                watermark = str(max_value) if max_value is not None else None
+            conn.commit()
+        except psycopg2.Error as e:
+            if conn:
+                conn.rollback()
+            logger.error(f"Failed to refresh rollup {rollup_id}: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Failed to refresh rollup: {str(e)}")
+        finally:
+            if conn:
+                cursor.close()
+                conn.close()
+
+        RollupModel._save_refresh_state(rollup_id, row_count, watermark)
+        logger.info(f"Refreshed rollup {rollup_id} ({'incremental' if incremental else 'full'}): {row_count} rows")
+        return RollupModel.get_rollup(rollup_id)
+
+    @staticmethod
+    def delete_rollup(rollup_id: int, redshift_config: Dict) -> bool:
+        """
+        Drop the materialized table of a rollup and delete its definition.
+        Returns True if deleted.
+        """
+        rollup = RollupModel.get_rollup(rollup_id)
+        conn = None
+        try:
+            conn = RedshiftMetadataModel.get_redshift_connection(redshift_config)
+            cursor = conn.cursor()
+            cursor.execute(f"DROP TABLE IF EXISTS {RollupModel.get_rollup_table(rollup)}")
+            conn.commit()
+        except psycopg2.Error as e:
+            logger.error(f"Failed to drop rollup table {rollup_id}: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Failed to drop rollup table: {str(e)}")
+        finally:
+            if conn:
+                cursor.close()
+                conn.close()
+
+        conn = None
+        try:
+            conn = get_mysql_connection()
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM dataset_rollups WHERE id = %s", (rollup_id,))
+            conn.commit()
+            logger.info(f"Deleted rollup {rollup_id}")
+            return cursor.rowcount > 0
+        except MySQLError as e:
+            logger.error(f"Failed to delete rollup {rollup_id}: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Failed to delete rollup: {str(e)}")
+        finally:
+            if conn:
+                cursor.close()
+                conn.close()
+
+    @staticmethod
+    def can_answer(rollup: Dict, columns: List[str], value_fields: List[str]) -> bool:
+        """
+        A rollup can answer a query if every grouped/filtered column is a grain column
+        and every aggregate can be recombined from the stored columns.
+        """
+        if rollup["row_count"] is None:
+            return False
+        if not set(columns) <= set(rollup["grain_columns"]):
+            return False
+        stored = RollupModel.get_stored_columns(rollup["measures"])
+        for value_field in value_fields:
+            func, column = RollupModel.parse_value_field(value_field)
+            if any(f"{stored_func.lower()}_{column}" not in stored for stored_func in STORED_AGGREGATES[func]):
+                return False
+        return True
+
+    @staticmethod
+    def find_rollup(dataset_id: int, columns: List[str], value_fields: List[str]) -> Optional[Dict]:
+        """
+        Return the smallest materialized rollup (by row_count) that can answer the query, or None.
+        Errors while loading rollups are logged and the query falls back to the base table.
+        """
+        try:
+            rollups = RollupModel.get_rollups(dataset_id)
+        except HTTPException as e:
+            logger.warning(f"Rollup lookup failed for dataset {dataset_id}: {e.detail}")
+            return None
+        candidates = [rollup for rollup in rollups if RollupModel.can_answer(rollup, columns, value_fields)]
+        return min(candidates, key=lambda rollup: rollup["row_count"]) if candidates else None
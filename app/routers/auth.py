@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 from app.models import LoginRequest, SSORequest
 from app.dependencies import get_current_user, create_access_token
@@ -23,7 +24,7 @@ async def login(request: LoginRequest):
     Đăng nhập bằng username và password.
     Trả về JWT access token nếu xác thực thành công.
     """
-    if authenticate_user(request.username, request.password):
+    if await authenticate_user(request.username, request.password):
         access_token_expires = timedelta(minutes=APP_ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
             data={"sub": request.username}, expires_delta=access_token_expires
@@ -40,17 +41,17 @@ async def sso_login(request: SSORequest):
     try:
         sso = AppotaSSO()
         # Yêu cầu access token từ authorization code
-        access_token = sso.request_access_token(request.authorization_code)
+        access_token = await run_in_threadpool(sso.request_access_token, request.authorization_code)
         if not access_token:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Failed to obtain access token")
 
         # Lấy thông tin người dùng từ access token
-        user_info = sso.get_me(access_token)
+        user_info = await run_in_threadpool(sso.get_me, access_token)
         if not user_info:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Failed to fetch user info from SSO")
 
         # Kiểm tra xem người dùng có tồn tại trong hệ thống không
-        username = check_sso_user_exists(user_info)
+        username = await run_in_threadpool(check_sso_user_exists, user_info)
         avatar = user_info.get('avatar', None)
         if not username:
             raise HTTPException(
@@ -83,7 +84,7 @@ async def get_sso_redirect():
     """
     try:
         sso = AppotaSSO()
-        redirect_uri = sso.get_redirect_url()
+        redirect_uri = await run_in_threadpool(sso.get_redirect_url)
         if not redirect_uri:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to obtain redirect URL")
         return {"redirect_uri": redirect_uri}
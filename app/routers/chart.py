@@ -1,7 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from app.model.chart import ChartModel
 from app.model.chart_query import ChartQueryModel
-from app.dependencies import get_current_user
+from app.dependencies import get_current_user, get_user_context, UserContext
+from app.utils import chart_cache
+from app.utils.admission import build_requester, PRIORITY_DASHBOARD, PRIORITY_ADHOC
+from app.utils.cancellation import CancelScope, run_with_disconnect_cancel, stream_with_disconnect_cancel
+from app.utils.http_cache import build_etag, check_not_modified, CACHE_CONTROL_REVALIDATE
+from app.utils.serialization import FastJSONResponse
 from config import REDSHIFT_CONFIG
 from app.schemas.chart import ChartCreate, ChartUpdate, ChartResponse, ChartDataResponse, ChartListResponse
 from app.schemas.dashboard import ShareRequest, ShareResponse, SharedUsersResponse
@@ -64,40 +71,87 @@ async def delete_chart(chart_id: int, current_user: str = Depends(get_current_us
     }
 
 @router.get("/get", response_model=ChartListResponse)
-async def get_charts(current_user: str = Depends(get_current_user)):
+async def get_charts(request: Request, response: Response, current_user: str = Depends(get_current_user)):
     """
     Retrieve a list of all charts with schema_name.
+    Supports conditional requests with If-None-Match.
     Requires JWT authentication.
     """
     charts = ChartModel.get_all_charts(current_user)
+    not_modified = check_not_modified(request, response, build_etag(charts))
+    if not_modified:
+        return not_modified
     return {"charts": charts}
 
 
 @router.get("/{chart_id}", response_model=ChartDataResponse)
-async def get_chart_data(chart_id: int, current_user: str = Depends(get_current_user)):
+async def get_chart_data(chart_id: int, request: Request, response: Response, background_tasks: BackgroundTasks, user: UserContext = Depends(get_user_context)):
     """
     Retrieve a chart and its data for Chart.js rendering with schema_name.
+    Charts with config freshnessSeconds return the last cached result immediately
+    and refresh it in the background once it is older than freshnessSeconds.
+    The ETag changes when the chart is updated or its cached result is recomputed;
+    If-None-Match returns 304 Not Modified.
+    A running Redshift query is cancelled if the client disconnects.
     Requires JWT authentication.
     """
-    chart = ChartModel.get_chart(chart_id, current_user)
+    chart = ChartModel.get_chart(chart_id, user.username)
     if not chart:
         raise HTTPException(status_code=404, detail="Chart not found")
-    data = ChartModel.get_chart_data(chart_id, REDSHIFT_CONFIG, current_user)
-    return {
+    # Query Redshift có thể phải chờ slot trong hàng đợi, chạy trong threadpool để không chặn event loop
+    cancel_scope = CancelScope()
+    requester = build_requester(
+        user.username, user.role, PRIORITY_DASHBOARD, cancel_scope=cancel_scope
+    )
+    data, freshness = await run_with_disconnect_cancel(
+        request, cancel_scope, ChartModel.get_chart_data_with_freshness, chart, REDSHIFT_CONFIG, requester
+    )
+    if freshness["refreshing"]:
+        background_tasks.add_task(ChartModel.revalidate_chart_data, chart, REDSHIFT_CONFIG)
+
+    etag = build_etag(
+        chart["id"],
+        chart["updated_at"],
+        chart["shared_users"],
+        chart_cache.build_cache_key(ChartModel.build_chart_query_data(chart)),
+        freshness["computed_at"]
+    )
+    not_modified = check_not_modified(request, response, etag)
+    if not_modified:
+        return not_modified
+    # Dữ liệu chart được build sẵn đúng format ChartDataResponse, serialize trực tiếp để tránh validate lại
+    return FastJSONResponse({
         "chart": chart,
-        "data": data
-    }
+        "data": data,
+        "freshness": freshness
+    }, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL_REVALIDATE})
 
 # Chart query route
 @router.post("/query", response_model=ChartQueryResponse)
-async def build_and_execute_chart_query(query: ChartQueryRequest, current_user: str = Depends(get_current_user)):
+async def build_and_execute_chart_query(query: ChartQueryRequest, request: Request, user: UserContext = Depends(get_user_context)):
     """
     Build and execute a SQL query on Redshift for a chart.
+    Queries with a high estimated cost return 409 until resent with confirm_expensive=true.
+    The query is cancelled on Redshift if the client disconnects.
+    With stream=true the result is sent as newline-delimited JSON (application/x-ndjson):
+    one partial result per fetched batch, then a final line with "done": true.
     Returns Chart.js-compatible data with labels and values.
     Requires JWT authentication and query details in the request body.
     """
-    chart_data = ChartQueryModel.build_and_execute_query(query.dict(), REDSHIFT_CONFIG)
-    return chart_data
+    cancel_scope = CancelScope()
+    requester = build_requester(
+        user.username, user.role, PRIORITY_ADHOC, query.confirm_expensive, cancel_scope
+    )
+    query_data = query.dict(exclude={"confirm_expensive", "stream"})
+    if query.stream:
+        lines = await run_in_threadpool(ChartQueryModel.stream_query, query_data, REDSHIFT_CONFIG, requester)
+        return StreamingResponse(stream_with_disconnect_cancel(cancel_scope, lines), media_type="application/x-ndjson")
+    chart_data = await run_with_disconnect_cancel(
+        request, cancel_scope,
+        ChartQueryModel.build_and_execute_query, query_data, REDSHIFT_CONFIG, requester
+    )
+    # ChartQueryModel đã trả về đúng format ChartQueryResponse, không cần validate lại
+    return FastJSONResponse(chart_data)
 
 @router.post("/{chart_id}/share", response_model=ShareResponse)
 async def share_chart(chart_id: int, share_data: ShareRequest, current_user: str = Depends(get_current_user)):
@@ -1,14 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from app.models import QueryRequest, QueryResponse
 from app.dependencies import get_current_user
 from app.services.query_service import handle_query
+from app.utils.cancellation import CancelScope, run_with_disconnect_cancel
 
 router = APIRouter()
 
 @router.post("/query", response_model=QueryResponse)
-async def process_query(request: QueryRequest, username: str = Depends(get_current_user)):
+async def process_query(request: QueryRequest, http_request: Request, username: str = Depends(get_current_user)):
+    # Query ClickHouse bị KILL nếu client ngắt kết nối trước khi có kết quả
+    cancel_scope = CancelScope()
     try:
-        result = handle_query(request.question, username)
+        result = await run_with_disconnect_cancel(http_request, cancel_scope, handle_query, request.question, username, cancel_scope)
         return QueryResponse(**result)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error processing query: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error processing query: {str(e)}")
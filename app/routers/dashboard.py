@@ -1,7 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
-from app.schemas.dashboard import DashboardCreate, DashboardUpdate, DashboardResponse,DashboardDataResponse, DashboardListResponse, ShareResponse, ShareRequest, SharedUsersResponse
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from app.schemas.dashboard import DashboardCreate, DashboardUpdate, DashboardResponse,DashboardDataResponse, DashboardListResponse, ShareResponse, ShareRequest, SharedUsersResponse, HotDashboardResponse, PrewarmRequest, PrewarmResponse, DashboardChartsDataResponse
+from app.model.chart import ChartModel
 from app.model.dashboard import DashboardModel
-from app.dependencies import get_current_user
+from app.dependencies import get_current_user, get_user_context, UserContext, get_admin_user
+from app.services.prewarm_service import prewarm_dashboards
+from app.services.dashboard_service import load_dashboard_charts, get_charts_data
+from app.utils.admission import build_requester, PRIORITY_DASHBOARD
+from app.utils.cancellation import CancelScope, run_with_disconnect_cancel
+from app.utils.http_cache import build_etag, check_not_modified, CACHE_CONTROL_REVALIDATE
+from app.utils.serialization import FastJSONResponse
+from app.schemas.chart_query import FilterItem
+from pydantic import ValidationError, parse_obj_as
+from typing import Dict, Optional
+import json
+from config import REDSHIFT_CONFIG
 
 router = APIRouter()
 
@@ -21,37 +34,123 @@ async def create_dashboard(dashboard_data: DashboardCreate, current_user: str =
         "owner": dashboard["owner"],
         "layout": dashboard["layout"],
         "description": dashboard["description"],
+        "filters": dashboard["filters"],
         "message": "Dashboard created successfully"
     }
 
 @router.get("/get", response_model=DashboardListResponse)
-async def get_dashboards(current_user: str = Depends(get_current_user)):
+async def get_dashboards(request: Request, response: Response, current_user: str = Depends(get_current_user)):
     """
     Retrieve a list of all dashboards accessible to the user (owned or shared).
+    Supports conditional requests with If-None-Match.
     Requires JWT authentication.
     """
     dashboards = DashboardModel.get_all_dashboards(current_user)
+    not_modified = check_not_modified(request, response, build_etag(dashboards))
+    if not_modified:
+        return not_modified
     return {"dashboards": dashboards}
 
+@router.post("/prewarm", response_model=PrewarmResponse)
+async def prewarm_dashboard_charts(request: PrewarmRequest, background_tasks: BackgroundTasks, admin: str = Depends(get_admin_user)):
+    """
+    Re-compute and cache chart results for dashboards, e.g. right after a data load.
+    Defaults to hot and recently viewed dashboards; dataset_ids limits it to charts on those datasets.
+    Requires admin access. Runs in the background.
+    """
+    background_tasks.add_task(prewarm_dashboards, request.dashboard_ids, request.dataset_ids)
+    return {
+        "dashboard_ids": request.dashboard_ids,
+        "dataset_ids": request.dataset_ids,
+        "message": "Dashboard pre-warm scheduled"
+    }
+
 @router.get("/{dashboard_id}", response_model=DashboardDataResponse)
-async def get_dashboard(dashboard_id: int, current_user: str = Depends(get_current_user)):
+async def get_dashboard(dashboard_id: int, request: Request, response: Response, current_user: str = Depends(get_current_user)):
     """
     Retrieve a dashboard by ID.
+    The ETag changes when the dashboard is updated or its comments change;
+    If-None-Match returns 304 Not Modified.
     Requires JWT authentication.
     """
     dashboard = DashboardModel.get_dashboard(dashboard_id, current_user)
     if not dashboard:
         raise HTTPException(status_code=404, detail="Dashboard not found or unauthorized")
+    DashboardModel.record_dashboard_view(dashboard_id)
+
+    etag = build_etag(
+        dashboard["id"],
+        dashboard["updated_at"],
+        dashboard["shared_users"],
+        [comment["id"] for comment in dashboard["comments"]]
+    )
+    not_modified = check_not_modified(request, response, etag)
+    if not_modified:
+        return not_modified
     return {
         "id": dashboard["id"],
         "name": dashboard["name"],
         "owner": dashboard["owner"],
         "layout": dashboard["layout"],
         "description": dashboard["description"],
+        "filters": dashboard["filters"],
         "comments": dashboard["comments"],
         "message": "Dashboard retrieved successfully"
     }
 
+@router.get("/{dashboard_id}/data", response_model=DashboardChartsDataResponse)
+async def get_dashboard_data(dashboard_id: int, request: Request, response: Response, background_tasks: BackgroundTasks,
+                             filters: Optional[str] = Query(None, description="JSON object of filters applied on top of the dashboard filters"),
+                             user: UserContext = Depends(get_user_context)):
+    """
+    Retrieve the data of every chart on a dashboard in one request.
+    Dashboard filters (overridden per column by the filters parameter) are merged into the query
+    of every chart whose dataset has the filtered column, replacing the chart's own filter on that column.
+    Cached results are served directly; charts on the same dataset with the same labels and
+    filters are recomputed with a single fused Redshift query.
+    A chart that fails to load has an error instead of data; charts the user cannot access are left out.
+    Running Redshift queries are cancelled if the client disconnects.
+    Requires JWT authentication.
+    """
+    dashboard = DashboardModel.get_dashboard(dashboard_id, user.username)
+    if not dashboard:
+        raise HTTPException(status_code=404, detail="Dashboard not found or unauthorized")
+    DashboardModel.record_dashboard_view(dashboard_id)
+
+    effective_filters = dict(dashboard["filters"])
+    if filters:
+        try:
+            render_filters = parse_obj_as(Dict[str, FilterItem], json.loads(filters))
+        except (ValueError, ValidationError) as e:
+            raise HTTPException(status_code=400, detail=f"Invalid filters: {str(e)}")
+        effective_filters.update({column_name: item.dict() for column_name, item in render_filters.items()})
+
+    charts = await run_in_threadpool(load_dashboard_charts, dashboard, user.username, effective_filters)
+    cancel_scope = CancelScope()
+    requester = build_requester(
+        user.username, user.role, PRIORITY_DASHBOARD, cancel_scope=cancel_scope
+    )
+    items, revalidate = await run_with_disconnect_cancel(request, cancel_scope, get_charts_data, charts, requester)
+    for chart in revalidate:
+        background_tasks.add_task(ChartModel.revalidate_chart_data, chart, REDSHIFT_CONFIG)
+
+    etag = build_etag(
+        dashboard["id"],
+        dashboard["updated_at"],
+        effective_filters,
+        [(chart["id"], chart["updated_at"]) for chart in charts],
+        [(item["chart_id"], item["freshness"]["computed_at"] if item["freshness"] else None, item["error"]) for item in items]
+    )
+    not_modified = check_not_modified(request, response, etag)
+    if not_modified:
+        return not_modified
+    # Dữ liệu chart đã đúng format, serialize trực tiếp để tránh validate lại
+    return FastJSONResponse({
+        "dashboard_id": dashboard_id,
+        "filters": effective_filters,
+        "charts": items
+    }, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL_REVALIDATE})
+
 @router.put("/{dashboard_id}", response_model=DashboardResponse)
 async def update_dashboard(dashboard_id: int, dashboard_data: DashboardUpdate, current_user: str = Depends(get_current_user)):
     """
@@ -70,6 +169,7 @@ async def update_dashboard(dashboard_id: int, dashboard_data: DashboardUpdate, c
         "owner": updated_dashboard["owner"],
         "layout": updated_dashboard["layout"],
         "description": updated_dashboard["description"],
+        "filters": updated_dashboard["filters"],
         "message": "Dashboard updated successfully"
     }
 
@@ -90,6 +190,7 @@ async def delete_dashboard(dashboard_id: int, current_user: str = Depends(get_cu
         "owner": dashboard["owner"],
         "layout": dashboard["layout"],
         "description": dashboard["description"],
+        "filters": dashboard["filters"],
         "message": "Dashboard deleted successfully"
     }
 
@@ -119,4 +220,22 @@ async def get_shared_dashboard_users(dashboard_id: int, current_user: str = Depe
         "resource_type": "dashboard",
         "resource_id": dashboard_id,
         "shared_users": shared_users
-    }
\ No newline at end of file
+    }
+
+@router.put("/{dashboard_id}/hot", response_model=HotDashboardResponse)
+async def mark_dashboard_hot(dashboard_id: int, current_user: str = Depends(get_current_user)):
+    """
+    Mark a dashboard as hot so its chart results are pre-warmed periodically. Only the owner can mark.
+    Requires JWT authentication.
+    """
+    DashboardModel.set_dashboard_hot(dashboard_id, True, current_user)
+    return {"id": dashboard_id, "hot": True, "message": "Dashboard marked as hot"}
+
+@router.delete("/{dashboard_id}/hot", response_model=HotDashboardResponse)
+async def unmark_dashboard_hot(dashboard_id: int, current_user: str = Depends(get_current_user)):
+    """
+    Stop pre-warming a dashboard. Only the owner can unmark.
+    Requires JWT authentication.
+    """
+    DashboardModel.set_dashboard_hot(dashboard_id, False, current_user)
+    return {"id": dashboard_id, "hot": False, "message": "Dashboard unmarked as hot"}
@@ -1,40 +1,91 @@
-from fastapi import APIRouter, Depends, Query
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from app.model.database_metadata import RedshiftMetadataModel
-from app.dependencies import get_current_user
-from config import REDSHIFT_CONFIG
-from app.schemas.database_metadata import TableListResponse, ColumnListResponse, SchemaListResponse
+from app.dependencies import get_current_user, get_admin_user
+from config import REDSHIFT_CONFIG, METADATA_CACHE_MAX_AGE
+from app.utils.http_cache import build_etag, check_not_modified
+from app.schemas.database_metadata import TableListResponse, ColumnListResponse, SchemaListResponse, CatalogSearchResponse, CatalogRefreshResponse
 
 router = APIRouter()
+
+METADATA_CACHE_CONTROL = f"private, max-age={METADATA_CACHE_MAX_AGE}"
+
 # Redshift metadata routes
 @router.get("/schemas", response_model=SchemaListResponse)
-async def get_redshift_schemas(current_user: str = Depends(get_current_user)):
+async def get_redshift_schemas(request: Request, response: Response, current_user: str = Depends(get_current_user)):
     """
     Retrieve a list of all schemas in the Redshift database.
+    Cacheable by the client for METADATA_CACHE_MAX_AGE seconds, then revalidated with If-None-Match.
     Requires JWT authentication.
     """
-    schemas = RedshiftMetadataModel.get_all_schemas(REDSHIFT_CONFIG)
+    schemas = await run_in_threadpool(RedshiftMetadataModel.get_all_schemas, REDSHIFT_CONFIG)
+    not_modified = check_not_modified(request, response, build_etag(schemas), METADATA_CACHE_CONTROL)
+    if not_modified:
+        return not_modified
     return {"schemas": schemas}
 
 @router.get("/tables", response_model=TableListResponse)
 async def get_redshift_tables(
+    request: Request,
+    response: Response,
     schema_name: str = Query(..., description="Schema name of the table"),
     current_user: str = Depends(get_current_user)):
     """
     Retrieve a list of all tables in the Redshift database.
+    Cacheable by the client for METADATA_CACHE_MAX_AGE seconds, then revalidated with If-None-Match.
     Requires JWT authentication.
     """
-    tables = RedshiftMetadataModel.get_all_tables(REDSHIFT_CONFIG, schema_name)
+    tables = await run_in_threadpool(RedshiftMetadataModel.get_all_tables, REDSHIFT_CONFIG, schema_name)
+    not_modified = check_not_modified(request, response, build_etag(tables), METADATA_CACHE_CONTROL)
+    if not_modified:
+        return not_modified
     return {"tables": tables}
 
 @router.get("/columns", response_model=ColumnListResponse)
 async def get_redshift_columns(
+    request: Request,
+    response: Response,
     table_name: str = Query(..., description="Name of the table to fetch columns for"),
     schema_name: str = Query(..., description="Schema name of the table"),
     current_user: str = Depends(get_current_user)
 ):
     """
     Retrieve a list of columns for a specific table in Redshift.
+    Cacheable by the client for METADATA_CACHE_MAX_AGE seconds, then revalidated with If-None-Match.
     Requires JWT authentication, table_name, and schema_name as query parameters.
     """
-    columns = RedshiftMetadataModel.get_table_columns(REDSHIFT_CONFIG, table_name, schema_name)
-    return {"table_name": table_name, "schema_name": schema_name, "columns": columns}
\ No newline at end of file
+    columns = await run_in_threadpool(RedshiftMetadataModel.get_table_columns, REDSHIFT_CONFIG, table_name, schema_name)
+    not_modified = check_not_modified(request, response, build_etag(columns), METADATA_CACHE_CONTROL)
+    if not_modified:
+        return not_modified
+    return {"table_name": table_name, "schema_name": schema_name, "columns": columns}
+
+@router.get("/search", response_model=CatalogSearchResponse)
+async def search_redshift_catalog(
+    q: str = Query(..., min_length=1, description="Prefix of a schema, table or column name"),
+    kind: Optional[str] = Query(None, pattern="^(schema|table|column)$", description="Only return this kind of object"),
+    limit: int = Query(50, ge=1, le=500),
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Search schemas, tables and columns by name prefix across the whole Redshift catalog.
+    Served from the in-memory catalog index.
+    Requires JWT authentication.
+    """
+    results = await run_in_threadpool(RedshiftMetadataModel.search_catalog, REDSHIFT_CONFIG, q, kind, limit)
+    return {"query": q, "results": results}
+
+@router.post("/refresh", response_model=CatalogRefreshResponse)
+async def refresh_redshift_catalog(admin: str = Depends(get_admin_user)):
+    """
+    Rebuild the cached Redshift catalog now, e.g. after creating new tables.
+    Requires admin access.
+    """
+    snapshot = await run_in_threadpool(RedshiftMetadataModel.refresh_catalog, REDSHIFT_CONFIG)
+    return {
+        "built_at": snapshot["built_at"],
+        "schemas": len(snapshot["schemas"]),
+        "tables": len(snapshot["columns"]),
+        "message": "Catalog refreshed successfully"
+    }
@@ -1,7 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response
 from app.model.dataset import DatasetModel
+from app.model.filter_value import FilterValueModel
 from app.dependencies import get_current_user
-from app.schemas.dataset import DatasetCreate, DatasetResponse, DatasetListResponse, DatasetDeleteResponse
+from app.utils.http_cache import build_etag, check_not_modified
+from app.services.profile_service import profile_dataset_safely
+from config import REDSHIFT_CONFIG
+from app.schemas.dataset import (
+    DatasetCreate, DatasetResponse, DatasetListResponse, DatasetDeleteResponse,
+    DatasetProfileResponse, DatasetProfileRequestResponse, FilterValuesResponse
+)
 
 router = APIRouter()
 
@@ -24,12 +31,16 @@ async def create_dataset(dataset: DatasetCreate, current_user: str = Depends(get
     }
 
 @router.get("/get", response_model=DatasetListResponse)
-async def get_datasets(current_user: str = Depends(get_current_user)):
+async def get_datasets(request: Request, response: Response, current_user: str = Depends(get_current_user)):
     """
     Retrieve a list of all datasets with schema_name.
+    Supports conditional requests with If-None-Match.
     Requires JWT authentication.
     """
     datasets = DatasetModel.get_all_datasets()
+    not_modified = check_not_modified(request, response, build_etag(datasets))
+    if not_modified:
+        return not_modified
     return {"datasets": datasets}
 
 @router.delete("/delete/{dataset_id}", response_model=DatasetDeleteResponse)
@@ -47,3 +58,44 @@ async def delete_dataset(dataset_id: int, current_user: str = Depends(get_curren
         "message": "Dataset deleted successfully"
     }
 
+@router.post("/{dataset_id}/profile", response_model=DatasetProfileRequestResponse, status_code=202)
+async def profile_dataset(dataset_id: int, background_tasks: BackgroundTasks, current_user: str = Depends(get_current_user)):
+    """
+    Start computing column statistics (approximate distinct count, null ratio, min/max, top values) for a dataset.
+    The profile is computed in the background; fetch it with GET /{dataset_id}/profile.
+    Requires JWT authentication.
+    """
+    DatasetModel.get_dataset(dataset_id)
+    background_tasks.add_task(profile_dataset_safely, dataset_id)
+    return {"dataset_id": dataset_id, "message": "Dataset profiling started"}
+
+@router.get("/{dataset_id}/profile", response_model=DatasetProfileResponse)
+async def get_dataset_profile(dataset_id: int, request: Request, response: Response, current_user: str = Depends(get_current_user)):
+    """
+    Retrieve the stored column statistics of a dataset.
+    Supports conditional requests with If-None-Match.
+    Requires JWT authentication.
+    """
+    profile = DatasetModel.get_dataset_profile(dataset_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Dataset has not been profiled yet")
+    not_modified = check_not_modified(request, response, build_etag(dataset_id, profile["profiled_at"]))
+    if not_modified:
+        return not_modified
+    return profile
+
+@router.get("/{dataset_id}/values", response_model=FilterValuesResponse)
+async def search_filter_values(
+    dataset_id: int,
+    column: str = Query(..., pattern=r"^[a-zA-Z0-9_]+$"),
+    q: str = "",
+    limit: int = Query(10, ge=1, le=100),
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Autocomplete filter values: the most frequent values of a column starting with q (case-insensitive).
+    Values come from a sampled index kept in Redis and memory, refreshed periodically.
+    Requires JWT authentication.
+    """
+    values = FilterValueModel.search_values(dataset_id, column, q, limit, REDSHIFT_CONFIG)
+    return {"dataset_id": dataset_id, "column": column, "values": values}
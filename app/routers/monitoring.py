@@ -0,0 +1,76 @@
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, Response
+from app.dependencies import get_admin_user
+from app.model.profile import ProfileModel
+from app.model.query_stats import QueryStatsModel
+from app.schemas.monitoring import ProfileListResponse, QueryStatsResponse
+from app.services.health_service import readiness
+from app.utils.metrics import render_metrics, PROMETHEUS_CONTENT_TYPE
+from app.utils.profiling import folded_stacks
+from app.utils.serialization import FastJSONResponse
+
+router = APIRouter()
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Prometheus metrics: request latency per route and time spent per stage (mysql, warehouse, format, llm, chart, serialize).
+    """
+    return Response(content=render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+@router.get("/health/live", include_in_schema=False)
+async def liveness():
+    """
+    Liveness probe: the process is up and its event loop responds. Does not touch any backend.
+    """
+    return {"status": "alive"}
+
+@router.get("/health/ready", include_in_schema=False)
+async def readiness_probe():
+    """
+    Readiness probe: 200 once the connection pools are warmed up and the backends in READINESS_REQUIRED respond,
+    503 while warming up, shutting down or when a required backend is down. Backend checks are cached for READINESS_CHECK_TTL seconds.
+    """
+    status = await run_in_threadpool(readiness)
+    return FastJSONResponse(status, status_code=200 if status["status"] == "ready" else 503)
+
+@router.get("/api/monitoring/query-stats", response_model=QueryStatsResponse)
+async def get_query_stats(
+    hours: int = Query(24, ge=1, le=24 * 30),
+    order_by: Literal["total_time", "p95", "calls", "max_time", "total_rows", "total_bytes"] = "total_time",
+    limit: int = Query(20, ge=1, le=200),
+    source: Optional[Literal["chart", "chat"]] = None,
+    current_user: str = Depends(get_admin_user)
+):
+    """
+    Top warehouse query fingerprints of the last hours (chart queries on Redshift, chat queries on ClickHouse),
+    with calls, total/avg/p95/max time, rows and bytes, and the datasets, charts and users that ran them.
+    Statistics are flushed from each worker every QUERY_STATS_FLUSH_INTERVAL seconds.
+    Requires admin privileges.
+    """
+    fingerprints = await run_in_threadpool(QueryStatsModel.get_top_fingerprints, hours, order_by, limit, source)
+    return {"hours": hours, "order_by": order_by, "fingerprints": fingerprints}
+
+@router.get("/api/monitoring/profiles", response_model=ProfileListResponse)
+async def list_profiles(route: Optional[str] = None, current_user: str = Depends(get_admin_user)):
+    """
+    List the stored request profiles (most recent first per route), optionally only those of one route template
+    such as /api/dashboards/{dashboard_id}/data. Profiles are recorded when PROFILING_ENABLED is set.
+    Requires admin privileges.
+    """
+    profiles = await run_in_threadpool(ProfileModel.list_profiles, route)
+    return {"profiles": profiles}
+
+@router.get("/api/monitoring/profiles/flamegraph", response_class=PlainTextResponse)
+async def get_profile_flamegraph(route: str, profile_id: Optional[str] = None, current_user: str = Depends(get_admin_user)):
+    """
+    Sampled stacks of the stored profiles of a route (or of one profile) in folded format,
+    ready for flamegraph.pl, inferno or speedscope. Each stack starts with the thread name.
+    Requires admin privileges.
+    """
+    stacks = await run_in_threadpool(ProfileModel.merge_stacks, route, profile_id)
+    if stacks is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(folded_stacks(stacks))
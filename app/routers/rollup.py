@@ -0,0 +1,68 @@
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from app.model.rollup import RollupModel
+from app.dependencies import get_current_user, get_admin_user
+from app.services.rollup_service import is_rollup_refreshing, refresh_rollup_safely
+from config import REDSHIFT_CONFIG
+from app.schemas.rollup import RollupCreate, RollupResponse, RollupListResponse
+
+router = APIRouter()
+
+@router.post("/datasets/{dataset_id}", response_model=RollupResponse)
+async def create_rollup(dataset_id: int, rollup: RollupCreate, background_tasks: BackgroundTasks, current_user: str = Depends(get_admin_user)):
+    """
+    Define a rollup (grain columns and measures) for a dataset and materialize it in the background.
+    Chart queries on the dataset are routed to the smallest rollup that can answer them.
+    Requires admin privileges.
+    """
+    rollup_id = RollupModel.create_rollup(dataset_id, rollup.dict(), current_user)
+    background_tasks.add_task(refresh_rollup_safely, rollup_id, True)
+    return {
+        "id": rollup_id,
+        "dataset_id": dataset_id,
+        "name": rollup.name,
+        "message": "Rollup created, materialization started"
+    }
+
+@router.get("/datasets/{dataset_id}", response_model=RollupListResponse)
+async def get_dataset_rollups(dataset_id: int, current_user: str = Depends(get_current_user)):
+    """
+    Retrieve the rollups of a dataset with their row counts and refresh state.
+    Requires JWT authentication.
+    """
+    return {"rollups": RollupModel.get_rollups(dataset_id)}
+
+@router.post("/{rollup_id}/refresh", response_model=RollupResponse)
+async def refresh_rollup(rollup_id: int, background_tasks: BackgroundTasks, full: bool = False,
+                         current_user: str = Depends(get_admin_user)):
+    """
+    Start a refresh of a rollup in the background: incrementally from its watermark, or fully rebuilt with full=true.
+    Returns 409 if the rollup is already being refreshed.
+    Requires admin privileges.
+    """
+    rollup = await run_in_threadpool(RollupModel.get_rollup, rollup_id)
+    if await run_in_threadpool(is_rollup_refreshing, rollup_id):
+        raise HTTPException(status_code=409, detail="Rollup is already being refreshed")
+    background_tasks.add_task(refresh_rollup_safely, rollup_id, full)
+    return {
+        "id": rollup_id,
+        "dataset_id": rollup["dataset_id"],
+        "name": rollup["name"],
+        "message": "Rollup refresh started"
+    }
+
+@router.delete("/{rollup_id}", response_model=RollupResponse)
+async def delete_rollup(rollup_id: int, current_user: str = Depends(get_admin_user)):
+    """
+    Drop a rollup table and delete its definition.
+    Requires admin privileges.
+    """
+    rollup = RollupModel.get_rollup(rollup_id)
+    if not RollupModel.delete_rollup(rollup_id, REDSHIFT_CONFIG):
+        raise HTTPException(status_code=404, detail="Rollup not found")
+    return {
+        "id": rollup_id,
+        "dataset_id": rollup["dataset_id"],
+        "name": rollup["name"],
+        "message": "Rollup deleted successfully"
+    }
@@ -97,6 +97,9 @@ class ChartConfig(BaseModel):
     showLegend: bool
     limit: int
     sortOrder: str
+    freshnessSeconds: Optional[int] = None
+    incrementalField: Optional[str] = None
+    incrementalWindowSeconds: Optional[int] = None
 
     @validator('colorScheme')
     def validate_color_scheme(cls, v):
@@ -118,6 +121,24 @@ class ChartConfig(BaseModel):
             raise ValueError(f"Sort order must be one of {valid_orders}")
         return v.lower()
 
+    @validator('freshnessSeconds')
+    def validate_freshness_seconds(cls, v):
+        if v is not None and v <= 0:
+            raise ValueError("Freshness must be a positive number of seconds")
+        return v
+
+    @validator('incrementalField')
+    def validate_incremental_field(cls, v):
+        if v is not None and not re.match(r'^[a-zA-Z0-9_]+$', v):
+            raise ValueError("Incremental field must be alphanumeric with underscores")
+        return v
+
+    @validator('incrementalWindowSeconds')
+    def validate_incremental_window(cls, v):
+        if v is not None and v <= 0:
+            raise ValueError("Incremental window must be a positive number of seconds")
+        return v
+
 class ChartCreate(BaseModel):
     name: str
     query: ChartQuery
@@ -129,6 +150,13 @@ class ChartCreate(BaseModel):
             raise ValueError("Chart name cannot be empty")
         return v.strip()
 
+    @validator('config')
+    def validate_incremental_field_in_labels(cls, v, values):
+        query = values.get('query')
+        if v.incrementalField and query and v.incrementalField not in query.label_fields:
+            raise ValueError("incrementalField must be one of the query label fields")
+        return v
+
 class ChartUpdate(BaseModel):
     name: Optional[str] = None
     query: Optional[ChartQuery] = None
@@ -163,9 +191,17 @@ class ChartResponse(BaseModel):
     owner: str
     message: str
 
+class ChartFreshness(BaseModel):
+    computed_at: datetime
+    age_seconds: float
+    max_age_seconds: int
+    stale: bool
+    refreshing: bool
+
 class ChartDataResponse(BaseModel):
     chart: Chart
     data: Dict
+    freshness: Optional[ChartFreshness] = None
 
 class ChartListResponse(BaseModel):
     charts: List[Chart]
\ No newline at end of file
@@ -59,6 +59,8 @@ class ChartQueryRequest(BaseModel):
     limit: Optional[int] = 10
     sort_order: Optional[str] = "desc"
     dimension_field: Optional[str] = None
+    confirm_expensive: bool = False
+    stream: bool = False
 
     @validator('chart_type')
     def validate_chart_type(cls, v):
@@ -117,6 +119,7 @@ class ChartQueryResponse(BaseModel):
     labels: List[str]
     values: Optional[List[float]] = None
     datasets: Optional[List[DatasetItem]] = None
+    warnings: Optional[List[str]] = None
 
     @validator('datasets', always=True)
     def check_response_format(cls, v, values):
@@ -2,6 +2,9 @@ from pydantic import BaseModel, validator
 from typing import Optional, Dict, List
 from datetime import datetime
 from app.schemas.comment import Comment
+from app.schemas.chart import ChartFreshness
+from app.schemas.chart_query import FilterItem
+import re
 class LayoutItem(BaseModel):
     i: str
     x: int
@@ -43,10 +46,22 @@ class LayoutItem(BaseModel):
                 raise ValueError(f"{item_type.capitalize()} layout item style must be a dictionary")
         return v
 
+def validate_filter_columns(filters: Optional[Dict[str, FilterItem]]) -> Optional[Dict[str, FilterItem]]:
+    if filters:
+        for column_name in filters:
+            if not re.match(r'^[a-zA-Z0-9_]+$', column_name):
+                raise ValueError(f"Invalid column name in filter: {column_name}")
+    return filters
+
 class DashboardCreate(BaseModel):
     name: str
     layout: List[LayoutItem]
     description: Optional[str] = None
+    filters: Dict[str, FilterItem] = {}
+
+    @validator('filters')
+    def validate_filters(cls, v):
+        return validate_filter_columns(v)
 
     @validator('name')
     def validate_name(cls, v):
@@ -64,6 +79,11 @@ class DashboardUpdate(BaseModel):
     name: Optional[str] = None
     layout: Optional[List[LayoutItem]] = None
     description: Optional[str] = None
+    filters: Optional[Dict[str, FilterItem]] = None
+
+    @validator('filters')
+    def validate_filters(cls, v):
+        return validate_filter_columns(v)
 
     @validator('name')
     def validate_name(cls, v):
@@ -83,6 +103,7 @@ class Dashboard(BaseModel):
     layout: List[LayoutItem]
     owner: str
     description: Optional[str] = None
+    filters: Dict[str, FilterItem] = {}
     shared_users: List[str] = []
     comments: List[Comment] = []
     created_at: datetime
@@ -99,6 +120,7 @@ class DashboardResponse(BaseModel):
     owner: str
     description: Optional[str] = None
     layout: List[LayoutItem]
+    filters: Dict[str, FilterItem] = {}
     message: str
 
 class DashboardDataResponse(BaseModel):
@@ -107,6 +129,7 @@ class DashboardDataResponse(BaseModel):
     owner: str
     description: Optional[str] = None
     layout: List[LayoutItem]
+    filters: Dict[str, FilterItem] = {}
     comments: List[Comment] = []
     message: str
 class DashboardListResponse(BaseModel):
@@ -134,3 +157,27 @@ class SharedUsersResponse(BaseModel):
     resource_id: int
     shared_users: List[str]
 
+class HotDashboardResponse(BaseModel):
+    id: int
+    hot: bool
+    message: str
+
+class PrewarmRequest(BaseModel):
+    dashboard_ids: Optional[List[int]] = None
+    dataset_ids: Optional[List[int]] = None
+
+class PrewarmResponse(BaseModel):
+    dashboard_ids: Optional[List[int]] = None
+    dataset_ids: Optional[List[int]] = None
+    message: str
+
+class DashboardChartData(BaseModel):
+    chart_id: int
+    data: Optional[Dict] = None
+    freshness: Optional[ChartFreshness] = None
+    error: Optional[str] = None
+
+class DashboardChartsDataResponse(BaseModel):
+    dashboard_id: int
+    filters: Dict[str, FilterItem] = {}
+    charts: List[DashboardChartData]
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 
 class Schema(BaseModel):
     schema_name: str
@@ -21,4 +21,21 @@ class Column(BaseModel):
 class ColumnListResponse(BaseModel):
     table_name: str
     schema_name: str
-    columns: List[Column]
\ No newline at end of file
+    columns: List[Column]
+
+class CatalogSearchItem(BaseModel):
+    kind: str
+    schema_name: str
+    table_name: Optional[str] = None
+    column_name: Optional[str] = None
+    data_type: Optional[str] = None
+
+class CatalogSearchResponse(BaseModel):
+    query: str
+    results: List[CatalogSearchItem]
+
+class CatalogRefreshResponse(BaseModel):
+    built_at: float
+    schemas: int
+    tables: int
+    message: str
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
-from typing import List
+from typing import Any, Dict, List, Optional
+from datetime import datetime
 
 class DatasetCreate(BaseModel):
     table_name: str
@@ -11,6 +12,7 @@ class Dataset(BaseModel):
     database: str
     table_name: str
     schema_name: str
+    profiled_at: Optional[datetime] = None
 
 class DatasetResponse(BaseModel):
     id: int
@@ -23,4 +25,36 @@ class DatasetListResponse(BaseModel):
 
 class DatasetDeleteResponse(BaseModel):
     id: int
-    message: str
\ No newline at end of file
+    message: str
+
+class TopValue(BaseModel):
+    value: Any
+    count: int
+
+class ColumnProfile(BaseModel):
+    data_type: str
+    approx_distinct: int
+    null_ratio: float
+    min: Optional[Any] = None
+    max: Optional[Any] = None
+    top_values: Optional[List[TopValue]] = None
+
+class DatasetProfileResponse(BaseModel):
+    dataset_id: int
+    profiled_at: datetime
+    row_count: int
+    sample_fraction: float
+    columns: Dict[str, ColumnProfile]
+
+class DatasetProfileRequestResponse(BaseModel):
+    dataset_id: int
+    message: str
+
+class FilterValue(BaseModel):
+    value: str
+    count: int
+
+class FilterValuesResponse(BaseModel):
+    dataset_id: int
+    column: str
+    values: List[FilterValue]
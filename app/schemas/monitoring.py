@@ -0,0 +1,38 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+class QueryFingerprintStats(BaseModel):
+    fingerprint: str
+    source: str
+    sample_query: str
+    calls: int
+    total_time: float
+    avg_time: float
+    p95: float
+    max_time: float
+    total_rows: int
+    total_bytes: int
+    dataset_ids: List[int]
+    chart_ids: List[int]
+    users: List[str]
+
+class QueryStatsResponse(BaseModel):
+    hours: int
+    order_by: str
+    fingerprints: List[QueryFingerprintStats]
+
+class ProfileSummary(BaseModel):
+    id: str
+    route: str
+    method: str
+    path: str
+    status: int
+    duration_ms: float
+    started_at: float
+    trigger: str
+    username: Optional[str] = None
+    samples: int
+    interval_ms: float
+
+class ProfileListResponse(BaseModel):
+    profiles: List[ProfileSummary]
@@ -0,0 +1,56 @@
+from pydantic import BaseModel, validator
+from typing import List, Optional
+from datetime import datetime
+import re
+
+class RollupCreate(BaseModel):
+    name: str
+    grain_columns: List[str]
+    measures: List[str]
+    time_column: Optional[str] = None
+
+    @validator('grain_columns')
+    def validate_grain_columns(cls, v):
+        if not v:
+            raise ValueError("At least one grain column is required")
+        for column in v:
+            if not re.match(r'^[a-zA-Z0-9_]+$', column):
+                raise ValueError(f"Grain column '{column}' must be alphanumeric with underscores")
+        return v
+
+    @validator('measures')
+    def validate_measures(cls, v):
+        if not v:
+            raise ValueError("At least one measure is required")
+        for measure in v:
+            if not re.match(r'^(SUM|COUNT|AVG|MIN|MAX)\([a-zA-Z0-9_]+\)$', measure, re.IGNORECASE):
+                raise ValueError(f"Measure '{measure}' must be an aggregate function like SUM(column), COUNT(column), etc.")
+        return v
+
+    @validator('time_column')
+    def validate_time_column(cls, v, values):
+        if v is not None and v not in values.get('grain_columns', []):
+            raise ValueError("time_column must be one of the grain columns")
+        return v
+
+class Rollup(BaseModel):
+    id: int
+    dataset_id: int
+    name: str
+    grain_columns: List[str]
+    measures: List[str]
+    time_column: Optional[str] = None
+    owner: str
+    row_count: Optional[int] = None
+    watermark: Optional[str] = None
+    refreshed_at: Optional[datetime] = None
+    created_at: datetime
+
+class RollupResponse(BaseModel):
+    id: int
+    dataset_id: int
+    name: str
+    message: str
+
+class RollupListResponse(BaseModel):
+    rollups: List[Rollup]
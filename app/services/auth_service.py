@@ -1,8 +1,20 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
-from typing import Dict
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
 from app.utils.redis import redis_client
-from config import MAX_ATTEMPTS, LOCKOUT_TIME, BI_FRONTEND_URL
+from app.utils.ttl_cache import TTLCache
+from config import (
+    MAX_ATTEMPTS, LOCKOUT_TIME, BI_FRONTEND_URL, LOGIN_HASH_WORKERS, LOGIN_MAX_PENDING,
+    LOGIN_HASH_CACHE_SIZE, LOGIN_HASH_CACHE_TTL, SSO_POOL_SIZE, SSO_RETRIES, SSO_CONNECT_TIMEOUT,
+    SSO_READ_TIMEOUT, SSO_USER_CACHE_SIZE, SSO_USER_CACHE_TTL
+)
 import bcrypt
 import redis
 from app.utils.database import get_mysql_connection
@@ -13,9 +25,53 @@ AUTHENTICATION_CLIENT_ID = os.getenv('AUTHENTICATION_CLIENT_ID')
 AUTHENTICATION_CLIENT_SECRET = os.getenv('AUTHENTICATION_CLIENT_SECRET')
 APP_URL = os.getenv('APP_URL', 'http://localhost:8501')
 
+# Pool riêng cho bcrypt: giới hạn số core dùng cho hash mật khẩu, không chiếm threadpool phục vụ request
+_bcrypt_executor = ThreadPoolExecutor(max_workers=LOGIN_HASH_WORKERS, thread_name_prefix="bcrypt")
+# Số lượt kiểm tra mật khẩu đang chờ hoặc đang chạy (chỉ thay đổi trên event loop)
+_pending_logins = 0
+# username -> bcrypt hash, tránh mở kết nối MySQL cho mỗi lần đăng nhập
+_password_hash_cache = TTLCache(LOGIN_HASH_CACHE_SIZE, LOGIN_HASH_CACHE_TTL)
+
+def build_sso_session() -> requests.Session:
+    """Tạo HTTP session dùng chung (keep-alive, pool kết nối) với retry khi lỗi kết nối hoặc SSO trả về 502/503/504"""
+    retry = Retry(
+        total=SSO_RETRIES,
+        connect=SSO_RETRIES,
+        read=0,
+        status=SSO_RETRIES,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset(["POST"]),
+        backoff_factor=0.2,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=SSO_POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+_sso_session = build_sso_session()
+# sha256(access_token) -> user_info đã được SSO xác thực
+_sso_user_cache = TTLCache(SSO_USER_CACHE_SIZE, SSO_USER_CACHE_TTL)
+
 class AppotaSSO:
+    """
+    Client của Appota SSO. base_url và session có thể truyền vào (ví dụ trỏ tới loadtest.sso.StubSSOServer khi test);
+    mặc định dùng URL_AUTHENICATION_SERVICE và session dùng chung của process.
+    """
+    def __init__(self, base_url: Optional[str] = None, session: Optional[requests.Session] = None):
+        self.base_url = (base_url or URL_AUTHENICATION_SERVICE).rstrip("/")
+        self.session = session or _sso_session
+
+    def _post(self, path: str, headers: Dict, payload: Dict) -> Dict:
+        response = self.session.post(
+            f"{self.base_url}{path}", headers=headers, json=payload,
+            timeout=(SSO_CONNECT_TIMEOUT, SSO_READ_TIMEOUT)
+        )
+        response.raise_for_status()
+        return response.json()
+
     def get_redirect_url(self) -> str:
-        url = f"{URL_AUTHENICATION_SERVICE}/api/token"
         headers = {
             'Content-Type': 'application/json',
             'Authorization': AUTHENTICATION_API_KEY
@@ -29,90 +85,137 @@ class AppotaSSO:
             'redirect_uri': f"{frontend_url}/auth/callback",  # Thay đổi ở đây
             'response_type': 'code'
         }
-        response = requests.post(url, headers=headers, json=payload)
-        response.raise_for_status()
-        return response.json().get('redirect_uri')
+        return self._post("/api/token", headers, payload).get('redirect_uri')
 
     def request_access_token(self, code: str) -> str:
-        url = f"{URL_AUTHENICATION_SERVICE}/api/generate/access_token"
         headers = {'Authorization': AUTHENTICATION_API_KEY}
         payload = {
             'client_id': str(AUTHENTICATION_CLIENT_ID),
             'client_secret': AUTHENTICATION_CLIENT_SECRET,
             'authorization_code': code
         }
-        response = requests.post(url, headers=headers, json=payload)
-        response.raise_for_status()
-        return response.json().get('access_token')
+        return self._post("/api/generate/access_token", headers, payload).get('access_token')
 
     def get_me(self, token: str) -> Dict:
-        url = f"{URL_AUTHENICATION_SERVICE}/api/token/valid"
+        """Lấy thông tin user từ access token, cache SSO_USER_CACHE_TTL giây theo hash của token"""
+        token_key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+        user_info = _sso_user_cache.get(token_key)
+        if user_info is not None:
+            return user_info
         headers = {'Authorization': AUTHENTICATION_API_KEY}
         payload = {
             'client_id': str(AUTHENTICATION_CLIENT_ID),
             'access_token': token
         }
-        response = requests.post(url, headers=headers, json=payload)
-        response.raise_for_status()
-        return response.json().get('user_info')
+        user_info = self._post("/api/token/valid", headers, payload).get('user_info')
+        if user_info:
+            _sso_user_cache.set(token_key, user_info)
+        return user_info
     
     
-def authenticate_user(username: str, password: str) -> bool:
+def _attempts_key(username: str) -> str:
+    return f"failed_attempts:{username}"
+
+# Giữ chỗ một lượt thử đăng nhập: nếu đã đủ ARGV[1] lượt và khoá còn hạn thì trả về {1, TTL},
+# ngược lại INCR + EXPIRE ARGV[2] giây và trả về {0, số lượt}. Chạy nguyên tử trên Redis nên các lượt
+# đăng nhập đồng thời không thể cùng vượt qua MAX_ATTEMPTS.
+_RESERVE_ATTEMPT_LUA = """
+local attempts = tonumber(redis.call('GET', KEYS[1]) or '0')
+if attempts >= tonumber(ARGV[1]) then
+    local ttl = redis.call('TTL', KEYS[1])
+    if ttl > 0 then
+        return {1, ttl}
+    end
+    redis.call('DEL', KEYS[1])
+end
+attempts = redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return {0, attempts}
+"""
+_reserve_attempt_script = redis_client.register_script(_RESERVE_ATTEMPT_LUA)
+
+def reserve_login_attempt(username: str):
+    """
+    Kiểm tra khoá tài khoản và tính lượt thử hiện tại vào số lần thử trong một lệnh Lua.
+    Lượt thử được tính trước khi kiểm tra mật khẩu, đăng nhập thành công sẽ xoá bộ đếm.
+    """
+    locked, value = _reserve_attempt_script(keys=[_attempts_key(username)], args=[MAX_ATTEMPTS, LOCKOUT_TIME])
+    if locked:
+        raise Exception(f"Account locked. Try again in {value} seconds")
+
+def get_password_hash(username: str) -> Optional[str]:
+    """Lấy mật khẩu đã hash của user từ MySQL, cache trong process LOGIN_HASH_CACHE_TTL giây"""
+    hashed_password = _password_hash_cache.get(username)
+    if hashed_password is not None:
+        return hashed_password
+    conn = get_mysql_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT password FROM users WHERE username = %s", (username,))
+        result = cursor.fetchone()
+    finally:
+        cursor.close()
+        conn.close()
+    if not result:
+        return None
+    _password_hash_cache.set(username, result[0])
+    return result[0]
+
+def load_login_state(username: str) -> Optional[str]:
+    """Giữ chỗ một lượt thử (lỗi nếu tài khoản đang bị khoá) rồi lấy mật khẩu đã hash (None nếu username không tồn tại)"""
+    reserve_login_attempt(username)
+    return get_password_hash(username)
+
+def verify_password(password: str, hashed_password: str) -> bool:
+    """So sánh mật khẩu với bcrypt hash (tốn CPU, chạy trong pool riêng)"""
+    return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+async def authenticate_user(username: str, password: str) -> bool:
     """
     Xác thực người dùng dựa trên username và password.
-    
+    Truy vấn MySQL/Redis chạy trong threadpool, bcrypt chạy trong pool riêng LOGIN_HASH_WORKERS thread
+    để không chặn event loop; khi quá LOGIN_MAX_PENDING lượt đang chờ thì trả về 503.
+
     Args:
         username (str): Tên đăng nhập của người dùng.
         password (str): Mật khẩu chưa mã hóa để so sánh với mật khẩu đã hash trong DB.
-    
+
     Returns:
         bool: True nếu xác thực thành công, False nếu thất bại.
-    
+
     Raises:
-        Exception: Nếu có lỗi khi truy cập cơ sở dữ liệu hoặc Redis.
+        HTTPException: 503 nếu có quá nhiều lượt đăng nhập đang chờ kiểm tra mật khẩu.
+        Exception: Nếu tài khoản bị khoá hoặc có lỗi khi truy cập cơ sở dữ liệu hoặc Redis.
     """
+    global _pending_logins
     try:
-        # Kiểm tra giới hạn số lần đăng nhập thất bại
-        attempts_key = f"failed_attempts:{username}"
-        attempts = int(redis_client.get(attempts_key) or 0)
-        if attempts >= MAX_ATTEMPTS:
-            remaining_time = redis_client.ttl(attempts_key)
-            if remaining_time > 0:
-                raise Exception(f"Account locked. Try again in {remaining_time} seconds")
-            else:
-                redis_client.delete(attempts_key)  # Xóa khóa nếu đã hết thời gian khóa
-
-        # Kết nối tới cơ sở dữ liệu và lấy mật khẩu đã hash
-        conn = get_mysql_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT password FROM users WHERE username = %s", (username,))
-        result = cursor.fetchone()
+        # Giới hạn số lượt chờ bcrypt để một đợt đăng nhập dồn dập không làm request treo lâu
+        # (kiểm tra trước khi giữ chỗ lượt thử để request bị từ chối không bị tính là đăng nhập sai)
+        if _pending_logins >= LOGIN_MAX_PENDING:
+            raise HTTPException(status_code=503, detail="Too many login attempts in progress, please retry shortly")
 
-        # Đóng kết nối
-        cursor.close()
-        conn.close()
-
-        # Kiểm tra kết quả truy vấn
-        if not result:
-            # Tăng số lần thử thất bại nếu username không tồn tại
-            redis_client.incr(attempts_key)
-            redis_client.expire(attempts_key, LOCKOUT_TIME)
+        hashed_password = await run_in_threadpool(load_login_state, username)
+        if not hashed_password:
+            # Username không tồn tại: lượt thử đã được tính trong load_login_state
             return False
 
-        # So sánh mật khẩu
-        hashed_password = result[0]
-        if bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8')):
+        _pending_logins += 1
+        try:
+            valid = await asyncio.get_running_loop().run_in_executor(_bcrypt_executor, verify_password, password, hashed_password)
+        finally:
+            _pending_logins -= 1
+
+        if valid:
             # Xóa số lần thử thất bại nếu đăng nhập thành công
-            redis_client.delete(attempts_key)
+            await run_in_threadpool(redis_client.delete, _attempts_key(username))
             return True
-        else:
-            # Tăng số lần thử thất bại nếu mật khẩu sai
-            redis_client.incr(attempts_key)
-            if attempts + 1 >= MAX_ATTEMPTS:
-                redis_client.expire(attempts_key, LOCKOUT_TIME)
-            return False
+        # Mật khẩu có thể vừa được đổi, lần thử sau đọc lại hash từ MySQL
+        _password_hash_cache.pop(username)
+        return False
 
+    except HTTPException:
+        raise
     except redis.RedisError as e:
         raise Exception(f"Redis error: {str(e)}")
     except Exception as e:
-        raise Exception(f"Authentication error: {str(e)}")
\ No newline at end of file
+        raise Exception(f"Authentication error: {str(e)}")
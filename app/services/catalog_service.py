@@ -0,0 +1,7 @@
+import asyncio
+from app.model.database_metadata import RedshiftMetadataModel
+from config import REDSHIFT_CONFIG
+
+async def sync_redshift_catalog():
+    """Job định kỳ làm mới catalog Redshift (chạy trong thread để không chặn event loop)"""
+    await asyncio.to_thread(RedshiftMetadataModel.sync_catalog, REDSHIFT_CONFIG)
@@ -0,0 +1,64 @@
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from fastapi import HTTPException
+from app.model.chart import ChartModel
+from app.services.prewarm_service import get_layout_chart_ids
+from config import REDSHIFT_CONFIG, DASHBOARD_QUERY_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+# Pool chạy song song các nhóm query của một dashboard
+_executor = ThreadPoolExecutor(max_workers=DASHBOARD_QUERY_CONCURRENCY, thread_name_prefix="dashboard")
+
+def load_dashboard_charts(dashboard: Dict, current_user: str, filters: Optional[Dict] = None) -> List[Dict]:
+    """Lấy các chart trên layout của dashboard mà user có quyền xem (theo thứ tự trên layout), đã gộp filter của dashboard"""
+    chart_ids = get_layout_chart_ids([dashboard])
+    charts = {chart["id"]: chart for chart in ChartModel.get_accessible_charts(chart_ids, current_user)}
+    charts = [charts[chart_id] for chart_id in chart_ids if chart_id in charts]
+    return ChartModel.apply_dashboard_filters(charts, filters, REDSHIFT_CONFIG)
+
+def get_charts_data(charts: List[Dict], requester: Optional[Dict] = None) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Lấy dữ liệu các chart của dashboard: chart có cache được trả về ngay, các chart còn lại được gộp
+    thành một query cho mỗi nhóm cùng dataset/label/filter và các nhóm chạy song song.
+    Trả về (danh sách {chart_id, data, freshness, error}, các chart cần refresh nền)
+    """
+    items: Dict[int, Dict] = {}
+    revalidate = []
+    misses = []
+    for chart in charts:
+        cached = ChartModel.get_cached_chart_data(chart)
+        if cached is None:
+            misses.append(chart)
+            continue
+        data, freshness = cached
+        items[chart["id"]] = {"chart_id": chart["id"], "data": data, "freshness": freshness, "error": None}
+        if freshness["refreshing"]:
+            revalidate.append(chart)
+
+    groups = ChartModel.group_charts_for_fusion(misses)
+    # Mỗi nhóm chạy trong context của request để timing warehouse/format được tính vào Server-Timing
+    futures = [
+        (group, _executor.submit(contextvars.copy_context().run, ChartModel.refresh_chart_group, group, REDSHIFT_CONFIG, requester))
+        for group in groups
+    ]
+    for group, future in futures:
+        try:
+            entries = future.result()
+        except HTTPException as e:
+            # Lỗi của một nhóm không làm hỏng các chart còn lại của dashboard
+            logger.warning(f"Failed to load charts {[chart['id'] for chart in group]}: {e.detail}")
+            for chart in group:
+                items[chart["id"]] = {"chart_id": chart["id"], "data": None, "freshness": None, "error": e.detail}
+            continue
+        for chart, entry in zip(group, entries):
+            items[chart["id"]] = {
+                "chart_id": chart["id"],
+                "data": entry["data"],
+                "freshness": ChartModel.get_entry_freshness(chart, entry),
+                "error": None
+            }
+    logger.info(f"Loaded {len(charts)} charts: {len(charts) - len(misses)} from cache, {len(misses)} in {len(groups)} queries")
+    return [items[chart["id"]] for chart in charts], revalidate
@@ -0,0 +1,20 @@
+import asyncio
+import logging
+import redis
+from app.model.filter_value import FilterValueModel
+from app.utils.redis import redis_client
+from config import REDSHIFT_CONFIG, FILTER_VALUES_REFRESH_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+FILTER_VALUES_LOCK_KEY = "filter_values:refresh_lock"
+
+async def run_scheduled_filter_value_refresh():
+    """Job định kỳ lấy mẫu lại giá trị các cột dùng cho autocomplete; worker khác đọc index mới từ Redis"""
+    try:
+        acquired = redis_client.set(FILTER_VALUES_LOCK_KEY, 1, nx=True, ex=max(FILTER_VALUES_REFRESH_INTERVAL - 1, 1))
+    except redis.RedisError as e:
+        logger.warning(f"Failed to acquire filter values refresh lock: {str(e)}")
+        return
+    if acquired:
+        await asyncio.to_thread(FilterValueModel.refresh_tracked_indexes, REDSHIFT_CONFIG)
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Callable, Dict
+from app.services.permission_service import get_cached_allowed_tables
+from app.services.role_service import get_available_roles
+from app.services.user_service import prime_user_roles
+from app.utils.database import all_pools, clickhouse_pool, get_redshift_pool, mysql_pool
+from app.utils.redis import redis_client
+from config import REDSHIFT_CONFIG, REDIS_POOL_MIN_SIZE, READINESS_REQUIRED, READINESS_CHECK_TTL
+
+logger = logging.getLogger(__name__)
+
+# warming: đang warm-up sau khi khởi động; ready: đã warm-up; stopping: đang shutdown (load balancer ngừng gửi request)
+_state = {"phase": "warming", "started_at": time.time(), "warmed_at": None, "warm_up": {}}
+# backend -> (thời điểm kiểm tra, kết quả) của lần kiểm tra readiness gần nhất
+_checks: Dict[str, tuple] = {}
+_checks_lock = threading.Lock()
+
+def warm_redis(size: int = REDIS_POOL_MIN_SIZE) -> int:
+    """Mở sẵn size connection trong pool của redis_client"""
+    pool = redis_client.connection_pool
+    connections = []
+    try:
+        for _ in range(size):
+            # get_connection kết nối (và kiểm tra) connection trước khi trả về
+            connections.append(pool.get_connection("PING"))
+    finally:
+        for connection in connections:
+            pool.release(connection)
+    return len(connections)
+
+def _backends() -> Dict[str, Callable[[], object]]:
+    """Hàm warm-up của từng backend"""
+    return {
+        "mysql": mysql_pool.warm,
+        "redshift": get_redshift_pool(REDSHIFT_CONFIG).warm,
+        "clickhouse": clickhouse_pool.warm,
+        "redis": warm_redis,
+    }
+
+def warm_up() -> Dict:
+    """
+    Mở sẵn connection của các pool tới min size và nạp cache role / bảng được phép theo role.
+    Lỗi của một backend được ghi lại và không chặn các backend khác.
+    """
+    start = time.perf_counter()
+    results = {}
+    for name, warm in _backends().items():
+        backend_start = time.perf_counter()
+        try:
+            results[name] = {"ok": True, "connections": warm()}
+        except Exception as e:
+            logger.error(f"Failed to warm up {name} connections: {str(e)}")
+            results[name] = {"ok": False, "error": str(e)}
+        results[name]["seconds"] = round(time.perf_counter() - backend_start, 3)
+
+    try:
+        users = prime_user_roles()
+        roles = get_available_roles()
+        for role in roles:
+            get_cached_allowed_tables(role)
+        results["caches"] = {"ok": True, "users": users, "roles": len(roles)}
+    except Exception as e:
+        logger.error(f"Failed to prime role caches: {str(e)}")
+        results["caches"] = {"ok": False, "error": str(e)}
+
+    if _state["phase"] == "warming":
+        _state["phase"] = "ready"
+    _state["warmed_at"] = time.time()
+    _state["warm_up"] = results
+    logger.info(f"Warm-up finished in {time.perf_counter() - start:.2f}s: {results}")
+    return results
+
+async def run_warm_up():
+    """Warm-up chạy nền khi khởi động: liveness trả lời ngay, readiness chỉ ready sau khi warm-up xong"""
+    await asyncio.to_thread(warm_up)
+
+def mark_stopping():
+    """Đánh dấu worker đang shutdown để readiness trả về 503 trong lúc xử lý nốt các request"""
+    _state["phase"] = "stopping"
+
+def _check_backend(name: str) -> Dict:
+    start = time.perf_counter()
+    try:
+        if name == "redis":
+            redis_client.ping()
+        elif name == "mysql":
+            mysql_pool.check()
+        elif name == "redshift":
+            get_redshift_pool(REDSHIFT_CONFIG).check()
+        elif name == "clickhouse":
+            clickhouse_pool.check()
+        return {"healthy": True, "latency_ms": round((time.perf_counter() - start) * 1000, 1)}
+    except Exception as e:
+        return {"healthy": False, "latency_ms": round((time.perf_counter() - start) * 1000, 1), "error": str(e)}
+
+def check_backends() -> Dict[str, Dict]:
+    """Kết quả kiểm tra kết nối từng backend, dùng lại trong READINESS_CHECK_TTL giây để probe không tạo tải"""
+    results = {}
+    now = time.monotonic()
+    for name in _backends():
+        with _checks_lock:
+            cached = _checks.get(name)
+        if cached and now - cached[0] < READINESS_CHECK_TTL:
+            results[name] = cached[1]
+            continue
+        result = _check_backend(name)
+        with _checks_lock:
+            _checks[name] = (now, result)
+        results[name] = result
+    return results
+
+def readiness() -> Dict:
+    """
+    Trạng thái readiness: ready khi đã warm-up, chưa shutdown và các backend trong READINESS_REQUIRED kết nối được.
+    Kèm kết quả kiểm tra và thống kê pool của mọi backend.
+    """
+    backends = check_backends() if _state["phase"] == "ready" else {}
+    pools = {pool.name: pool.stats() for pool in all_pools()}
+    for name, result in backends.items():
+        if name in pools:
+            result["pool"] = pools[name]
+    ready = _state["phase"] == "ready" and all(backends.get(name, {}).get("healthy") for name in READINESS_REQUIRED)
+    return {
+        "status": "ready" if ready else "not_ready",
+        "phase": _state["phase"],
+        "uptime_seconds": round(time.time() - _state["started_at"], 1),
+        "required": READINESS_REQUIRED,
+        "backends": backends,
+        "warm_up": _state["warm_up"],
+    }
+
+def maintain_pools():
+    """Đóng connection rảnh đã hết hạn và bổ sung các pool về min size"""
+    for pool in all_pools():
+        try:
+            pool.maintain()
+        except Exception as e:
+            logger.warning(f"Failed to refill {pool.name} pool: {str(e)}")
+
+async def run_scheduled_pool_maintenance():
+    """Job định kỳ bảo trì pool connection"""
+    await asyncio.to_thread(maintain_pools)
+
+def close_pools():
+    """Đóng các connection rảnh khi shutdown"""
+    for pool in all_pools():
+        pool.close_all()
@@ -1,39 +1,29 @@
 import json
+import logging
 import uuid
-from datetime import datetime, date
-import numpy as np
+import orjson
 import pandas as pd
 from app.utils.database import get_mysql_connection
+from app.utils.serialization import dumps_str, loads
 
-class CustomJSONEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, (date, datetime)):
-            return obj.isoformat()
-        if isinstance(obj, np.integer):
-            return int(obj)
-        if isinstance(obj, np.floating):
-            return float(obj)
-        if isinstance(obj, np.ndarray):
-            return obj.tolist()
-        if isinstance(obj, pd.Series):
-            return obj.tolist()
-        return super().default(obj)
-    
-def convert_numpy_types(data):
-    """Chuyển đổi các kiểu dữ liệu NumPy trong dict thành Python native types"""
-    if isinstance(data, dict):
-        return {key: convert_numpy_types(value) for key, value in data.items()}
-    elif isinstance(data, list):
-        return [convert_numpy_types(item) for item in data]
-    elif isinstance(data, np.integer):
-        return int(data)
-    elif isinstance(data, np.floating):
-        return float(data)
-    elif isinstance(data, np.ndarray):
-        return data.tolist()
-    elif isinstance(data, pd.Series):
-        return data.tolist()
-    return data
+logger = logging.getLogger(__name__)
+
+def _loads_history(data_json):
+    """Parse JSON của lịch sử; dòng cũ ghi bằng json.dumps có thể chứa NaN mà orjson không đọc được"""
+    try:
+        return loads(data_json)
+    except orjson.JSONDecodeError:
+        return json.loads(data_json)
+
+def _load_chart_fig(chart_json):
+    """Parse chart_fig; lỗi chỉ làm mất biểu đồ của dòng đó, không làm mất cả lịch sử"""
+    if not isinstance(chart_json, str) or not chart_json.strip():
+        return None
+    try:
+        return _loads_history(chart_json)
+    except ValueError as e:
+        logger.warning(f"Failed to parse chart_fig of query history: {str(e)}")
+        return None
 
 def deserialize_dataframe(data_json):
     """Chuyển đổi JSON thành DataFrame với xử lý datetime"""
@@ -41,7 +31,7 @@ def deserialize_dataframe(data_json):
         return None
     
     try:
-        df_dict = json.loads(data_json)
+        df_dict = _loads_history(data_json)
         df = pd.DataFrame.from_dict(df_dict)
         
         # Cố gắng chuyển đổi các cột có dạng datetime string về datetime
@@ -71,13 +61,12 @@ def save_query_history(username, question, explanation, sql_query, df=None, char
                     df_copy[column] = df_copy[column].astype(str)
                 elif pd.api.types.is_numeric_dtype(df_copy[column]):
                     df_copy[column] = df_copy[column].astype(float)
-            df_dict = df_copy.to_dict()
-            df_dict = convert_numpy_types(df_dict)
-            data_json = json.dumps(df_dict, cls=CustomJSONEncoder)
+            # orjson serialize trực tiếp numpy types, không cần duyệt đệ quy để chuyển đổi
+            data_json = dumps_str(df_copy.to_dict())
         
         chart_json = None
         if chart_fig is not None:
-            chart_json = json.dumps(convert_numpy_types(chart_fig), cls=CustomJSONEncoder)
+            chart_json = dumps_str(chart_fig)
         else:
             chart_json = json.dumps({})
         
@@ -117,7 +106,7 @@ def load_query_history(username):
                 "sql_query": row[4],
                 "data": deserialize_dataframe(row[5]) if row[5] else None,
                 "chart_type": row[6],
-                "chart_fig": json.loads(row[7]) if isinstance(row[7], str) and row[7].strip() else None,
+                "chart_fig": _load_chart_fig(row[7]),
                 "chart_title": row[8]
             }
             for row in result
@@ -1,10 +1,25 @@
-from app.utils.database import get_mysql_connection
-from clickhouse_driver import Client
+from __future__ import annotations
+from app.utils.database import get_mysql_connection, get_clickhouse_client
+from contextlib import nullcontext
+from config import QUERY_STATEMENT_TIMEOUT, USER_ROLE_CACHE_TTL
+import logging
+import time
+import uuid
 from app.services.group_service import get_table_groups
-from app.services.user_service import get_user_role
-import pandas as pd
+from app.services.user_service import get_cached_user_role
+from app.utils.ttl_cache import TTLCache
+from app.utils.query_stats import query_stats
 import re
-from typing import List, Optional, Dict
+from typing import TYPE_CHECKING, List, Optional, Dict
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from clickhouse_driver import Client
+
+logger = logging.getLogger(__name__)
+
+# role -> danh sách bảng được phép truy cập
+_allowed_tables_cache = TTLCache(256, USER_ROLE_CACHE_TTL)
 
 def get_allowed_tables_prompt(role: str) -> str:
     """Tạo phần prompt về các bảng được phép truy cập theo role"""
@@ -48,12 +63,20 @@ def get_allowed_tables(role: str) -> List[str]:
     except Exception as e:
         return []
 
+def get_cached_allowed_tables(role: str) -> List[str]:
+    """Lấy danh sách bảng được phép truy cập theo role, cache trong process USER_ROLE_CACHE_TTL giây"""
+    tables = _allowed_tables_cache.get(role)
+    if tables is None:
+        tables = get_allowed_tables(role)
+        _allowed_tables_cache.set(role, tables)
+    return tables
+
 def check_table_access(sql_query: str, role: str) -> bool:
     """Kiểm tra quyền truy cập các bảng trong câu query"""
     if role == 'admin':
         return True
         
-    allowed_tables = get_allowed_tables(role)
+    allowed_tables = get_cached_allowed_tables(role)
     
     # Tìm tất cả các bảng trong câu query
     table_pattern = r'(?:FROM|JOIN)\s+([a-zA-Z_][a-zA-Z0-9_]*(?:\.[a-zA-Z_][a-zA-Z0-9_]*)?)'
@@ -102,9 +125,20 @@ def get_role_table_groups(role: str) -> List[Dict]:
     except Exception as e:
         return []
 
-def execute_query_with_permission(client: Client, sql_query: str, username: str) -> Optional[pd.DataFrame]:
-    """Thực thi query sau khi kiểm tra quyền"""
-    role = get_user_role(username)
+def kill_clickhouse_query(query_id: str):
+    """Huỷ query đang chạy trên ClickHouse theo query_id (dùng kết nối riêng vì kết nối chính đang bận)"""
+    client = get_clickhouse_client()
+    try:
+        client.execute("KILL QUERY WHERE query_id = %(query_id)s ASYNC", {"query_id": query_id})
+        logger.info(f"Killed ClickHouse query {query_id}")
+    finally:
+        client.disconnect()
+
+def execute_query_with_permission(client: Client, sql_query: str, username: str, cancel_scope=None) -> Optional[pd.DataFrame]:
+    """Thực thi query sau khi kiểm tra quyền, giới hạn thời gian chạy và huỷ được khi client ngắt kết nối"""
+    from clickhouse_driver.errors import ErrorCodes, ServerException
+
+    role = get_cached_user_role(username)
     if not role:
         raise Exception("Không tìm thấy role của user")
         
@@ -112,4 +146,27 @@ def execute_query_with_permission(client: Client, sql_query: str, username: str)
         raise Exception("Bạn không có quyền truy cập các bảng này")
         
     # Thực thi query nếu có quyền
-    return client.execute(sql_query, with_column_types=True)
\ No newline at end of file
+    query_id = str(uuid.uuid4())
+    start = time.perf_counter()
+    row_count, size_bytes = 0, 0
+    try:
+        with cancel_scope.guard(lambda: kill_clickhouse_query(query_id)) if cancel_scope else nullcontext():
+            result = client.execute(
+                sql_query,
+                with_column_types=True,
+                query_id=query_id,
+                settings={"max_execution_time": QUERY_STATEMENT_TIMEOUT}
+            )
+        # profile_info do ClickHouse trả về cùng kết quả: số byte của các block kết quả
+        profile_info = getattr(getattr(client, "last_query", None), "profile_info", None)
+        row_count, size_bytes = len(result[0]), getattr(profile_info, "bytes", 0) or 0
+        return result
+    except ServerException as e:
+        if e.code == ErrorCodes.TIMEOUT_EXCEEDED:
+            raise Exception(f"Query vượt quá thời gian cho phép ({QUERY_STATEMENT_TIMEOUT} giây)")
+        if e.code == ErrorCodes.QUERY_WAS_CANCELLED:
+            raise Exception("Query đã bị huỷ do client ngắt kết nối")
+        raise
+    finally:
+        # Query lỗi/timeout vẫn được ghi nhận để thấy trong slow query log
+        query_stats.record("chat", sql_query, time.perf_counter() - start, row_count, size_bytes, username=username)
\ No newline at end of file
@@ -0,0 +1,88 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+import redis
+from app.model.chart import ChartModel
+from app.model.dashboard import DashboardModel
+from app.utils import chart_cache
+from app.utils.redis import redis_client
+from config import REDSHIFT_CONFIG, PREWARM_CONCURRENCY, PREWARM_INTERVAL, PREWARM_RECENT_WINDOW
+
+logger = logging.getLogger(__name__)
+
+PREWARM_LOCK_KEY = "dashboard:prewarm_lock"
+
+# Pool riêng cho pre-warm để không chiếm thread pool phục vụ request của người dùng
+_executor = ThreadPoolExecutor(max_workers=PREWARM_CONCURRENCY, thread_name_prefix="prewarm")
+
+def get_prewarm_dashboard_ids() -> List[int]:
+    """Lấy danh sách dashboard cần pre-warm: dashboard được đánh dấu hot hoặc được xem gần đây"""
+    hot_ids = DashboardModel.get_hot_dashboard_ids()
+    recent_ids = DashboardModel.get_recently_viewed_dashboard_ids(PREWARM_RECENT_WINDOW)
+    return sorted(set(hot_ids) | set(recent_ids))
+
+def get_layout_chart_ids(dashboards: List[Dict]) -> List[int]:
+    """Lấy danh sách chart_id (không trùng lặp) từ layout của các dashboard"""
+    chart_ids = []
+    for dashboard in dashboards:
+        for item in dashboard["layout"]:
+            chart_id = item.get("content", {}).get("chart_id")
+            if item.get("type") == "chart" and chart_id and chart_id not in chart_ids:
+                chart_ids.append(chart_id)
+    return chart_ids
+
+def load_prewarm_charts(dashboard_ids: List[int], dataset_ids: Optional[List[int]] = None) -> List[Dict]:
+    """Lấy các chart nằm trên các dashboard (đã gộp filter của từng dashboard), lọc theo dataset nếu có"""
+    dashboards = DashboardModel.get_dashboards_by_ids(dashboard_ids)
+    charts_by_id = {chart["id"]: chart for chart in ChartModel.get_charts_by_ids(get_layout_chart_ids(dashboards))}
+    if dataset_ids:
+        charts_by_id = {chart_id: chart for chart_id, chart in charts_by_id.items() if chart["dataset_id"] in dataset_ids}
+
+    # Một chart nằm trên nhiều dashboard với filter khác nhau có nhiều cache key, warm từng biến thể một lần
+    charts = []
+    seen = set()
+    for dashboard in dashboards:
+        dashboard_charts = [charts_by_id[chart_id] for chart_id in get_layout_chart_ids([dashboard]) if chart_id in charts_by_id]
+        for chart in ChartModel.apply_dashboard_filters(dashboard_charts, dashboard["filters"], REDSHIFT_CONFIG):
+            key = chart_cache.build_cache_key(ChartModel.build_chart_query_data(chart))
+            if key not in seen:
+                seen.add(key)
+                charts.append(chart)
+    return charts
+
+def warm_chart_group(charts: List[Dict]) -> int:
+    """Tính lại dữ liệu một nhóm chart (gộp thành một query) và lưu vào cache, trả về số chart đã warm"""
+    try:
+        ChartModel.refresh_chart_group(charts, REDSHIFT_CONFIG)
+        return len(charts)
+    except Exception as e:
+        logger.warning(f"Failed to pre-warm charts {[chart['id'] for chart in charts]}: {str(e)}")
+        return 0
+
+async def prewarm_dashboards(dashboard_ids: Optional[List[int]] = None, dataset_ids: Optional[List[int]] = None) -> Dict:
+    """Pre-warm cache cho các chart của dashboard (gộp query theo nhóm) với số query song song giới hạn bởi PREWARM_CONCURRENCY"""
+    loop = asyncio.get_running_loop()
+    if dashboard_ids is None:
+        dashboard_ids = await loop.run_in_executor(_executor, get_prewarm_dashboard_ids)
+    if not dashboard_ids:
+        return {"dashboards": 0, "charts": 0, "warmed": 0}
+
+    charts = await loop.run_in_executor(_executor, load_prewarm_charts, dashboard_ids, dataset_ids)
+    groups = await loop.run_in_executor(_executor, ChartModel.group_charts_for_fusion, charts)
+    results = await asyncio.gather(*(loop.run_in_executor(_executor, warm_chart_group, group) for group in groups))
+
+    summary = {"dashboards": len(dashboard_ids), "charts": len(charts), "queries": len(groups), "warmed": sum(results)}
+    logger.info(f"Pre-warmed dashboards: {summary}")
+    return summary
+
+async def run_scheduled_prewarm():
+    """Job định kỳ: chỉ một worker được chạy pre-warm trong mỗi chu kỳ"""
+    try:
+        acquired = redis_client.set(PREWARM_LOCK_KEY, 1, nx=True, ex=max(PREWARM_INTERVAL - 1, 1))
+    except redis.RedisError as e:
+        logger.warning(f"Failed to acquire pre-warm lock: {str(e)}")
+        return
+    if not acquired:
+        return
+    await prewarm_dashboards()
@@ -0,0 +1,36 @@
+import asyncio
+import logging
+import redis
+from app.model.dataset import DatasetModel
+from app.utils.redis import redis_client
+from config import REDSHIFT_CONFIG, DATASET_PROFILE_INTERVAL, DATASET_PROFILE_MAX_AGE
+
+logger = logging.getLogger(__name__)
+
+PROFILE_LOCK_KEY = "dataset:profile_lock"
+
+def profile_dataset_safely(dataset_id: int) -> bool:
+    """Profile một dataset, ghi log và trả về False nếu lỗi (dùng cho background task)"""
+    try:
+        DatasetModel.profile_dataset(dataset_id, REDSHIFT_CONFIG)
+        return True
+    except Exception as e:
+        logger.warning(f"Failed to profile dataset {dataset_id}: {str(e)}")
+        return False
+
+def profile_stale_datasets():
+    """Profile lần lượt các dataset chưa có profile hoặc profile đã cũ (tuần tự để hạn chế tải lên Redshift)"""
+    dataset_ids = DatasetModel.get_stale_profile_dataset_ids(DATASET_PROFILE_MAX_AGE)
+    profiled = sum(profile_dataset_safely(dataset_id) for dataset_id in dataset_ids)
+    if dataset_ids:
+        logger.info(f"Scheduled profiling: {profiled}/{len(dataset_ids)} datasets profiled")
+
+async def run_scheduled_profiling():
+    """Job định kỳ profile dataset; chỉ một worker chạy trong mỗi chu kỳ nhờ lock trên Redis"""
+    try:
+        acquired = redis_client.set(PROFILE_LOCK_KEY, 1, nx=True, ex=max(DATASET_PROFILE_INTERVAL - 1, 1))
+    except redis.RedisError as e:
+        logger.warning(f"Failed to acquire dataset profile lock: {str(e)}")
+        return
+    if acquired:
+        await asyncio.to_thread(profile_stale_datasets)
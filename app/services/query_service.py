@@ -1,17 +1,33 @@
-from app.utils.utils import handle_query
-from app.utils.database import get_clickhouse_client
+from app.utils.utils import handle_query as run_question
+from app.utils.database import pooled_clickhouse_client
+from app.utils.serialization import dumps, loads
 
-def handle_query(question: str, username: str) -> dict:
-    client = get_clickhouse_client()
-    df_display, chart_fig, sql_query, explanation, recommendation, chart_title = handle_query(
-        question, client, username, selected_model="Gemini"
-    )
+# type của trace Plotly -> tên loại biểu đồ (như gemini/openai đề xuất); px.line và px.scatter đều tạo trace scatter
+CHART_TYPES_BY_TRACE = {"bar": "Bar Chart", "pie": "Pie Chart", "box": "Box Plot"}
+
+def chart_type_of(chart_fig: dict) -> str:
+    """Loại biểu đồ của figure Plotly (dict) theo trace đầu tiên, mặc định Bar Chart"""
+    traces = chart_fig.get("data") or []
+    if not traces:
+        return "Bar Chart"
+    trace = traces[0]
+    if trace.get("type") == "scatter":
+        return "Scatter Plot" if trace.get("mode") == "markers" else "Line Chart"
+    return CHART_TYPES_BY_TRACE.get(trace.get("type"), "Bar Chart")
+
+def handle_query(question: str, username: str, cancel_scope=None) -> dict:
+    """Chuyển câu hỏi thành SQL, chạy trên ClickHouse và trả về kết quả cho API chat"""
+    with pooled_clickhouse_client() as client:
+        df_display, chart_fig, sql_query, explanation, recommendation, chart_title = run_question(
+            question, client, username, selected_model="Gemini", cancel_scope=cancel_scope
+        )
     return {
         "sql_query": sql_query,
         "explanation": explanation,
         "chart_title": chart_title,
-        "suggested_chart_type": "Bar Chart" if not df_display else chart_fig.get("layout", {}).get("template", "Bar Chart"),
+        "suggested_chart_type": "Bar Chart" if df_display is None or not chart_fig else chart_type_of(chart_fig),
         "recommendation": recommendation,
         "data": df_display.to_dict(orient="records") if df_display is not None else None,
-        "chart": chart_fig if chart_fig else None
-    }
\ No newline at end of file
+        # Figure Plotly chứa numpy array mà response_model (pydantic) không serialize được: chuyển qua JSON bằng orjson
+        "chart": loads(dumps(chart_fig)) if chart_fig else None
+    }
@@ -0,0 +1,51 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+import redis
+from fastapi import HTTPException
+from app.model.query_stats import QueryStatsModel
+from app.utils.query_stats import query_stats
+from app.utils.redis import redis_client
+from config import QUERY_STATS_FLUSH_INTERVAL, QUERY_STATS_RETENTION_HOURS
+
+logger = logging.getLogger(__name__)
+
+QUERY_STATS_PURGE_LOCK_KEY = "query_stats:purge_lock"
+
+def flush_query_stats():
+    """Ghi thống kê query đã gộp trong process vào bảng query_stats; nếu lỗi thì giữ lại cho lần flush sau"""
+    drained = query_stats.drain()
+    if drained["dropped"]:
+        logger.warning(f"Dropped query stats of {drained['dropped']} queries: QUERY_STATS_MAX_KEYS reached")
+    if not drained["stats"]:
+        return
+    try:
+        QueryStatsModel.insert_window(drained["window_start"], drained["stats"])
+    except HTTPException:
+        drained["dropped"] = 0
+        query_stats.restore(drained)
+        raise
+    logger.info(f"Flushed stats of {len(drained['stats'])} query fingerprints")
+
+def purge_query_stats():
+    """Xoá thống kê cũ hơn QUERY_STATS_RETENTION_HOURS; mỗi chu kỳ flush chỉ một worker chạy"""
+    try:
+        acquired = redis_client.set(QUERY_STATS_PURGE_LOCK_KEY, 1, nx=True, ex=max(QUERY_STATS_FLUSH_INTERVAL - 1, 1))
+    except redis.RedisError as e:
+        logger.warning(f"Failed to acquire query stats purge lock: {str(e)}")
+        acquired = True
+    if not acquired:
+        return
+    try:
+        deleted = QueryStatsModel.delete_before(datetime.now() - timedelta(hours=QUERY_STATS_RETENTION_HOURS))
+    except HTTPException:
+        return
+    if deleted:
+        logger.info(f"Deleted {deleted} query stats rows older than {QUERY_STATS_RETENTION_HOURS} hours")
+
+async def run_scheduled_query_stats_flush():
+    """Job định kỳ flush thống kê query rồi xoá thống kê hết hạn lưu giữ"""
+    try:
+        await asyncio.to_thread(flush_query_stats)
+    finally:
+        await asyncio.to_thread(purge_query_stats)
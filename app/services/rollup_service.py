@@ -0,0 +1,66 @@
+import asyncio
+import logging
+import redis
+from app.model.rollup import RollupModel
+from app.utils.redis import redis_client
+from config import REDSHIFT_CONFIG, ROLLUP_REFRESH_INTERVAL, ROLLUP_REFRESH_LOCK_TIME
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_LOCK_KEY = "dataset:rollup_refresh_lock"
+
+def _rollup_lock_key(rollup_id: int) -> str:
+    return f"dataset:rollup_refresh_lock:{rollup_id}"
+
+def is_rollup_refreshing(rollup_id: int) -> bool:
+    """Rollup có đang được làm mới (bởi worker bất kỳ) hay không"""
+    try:
+        return bool(redis_client.exists(_rollup_lock_key(rollup_id)))
+    except redis.RedisError as e:
+        logger.warning(f"Failed to read refresh lock of rollup {rollup_id}: {str(e)}")
+        return False
+
+def refresh_rollup_safely(rollup_id: int, full: bool = False) -> bool:
+    """
+    Làm mới một rollup, giữ lock NX theo rollup trên Redis để các lần làm mới (tạo mới, thủ công, định kỳ)
+    không chạy chồng nhau và xoá bảng staging của nhau. Ghi log và trả về False nếu lỗi hoặc rollup đang được làm mới.
+    """
+    lock = redis_client.lock(_rollup_lock_key(rollup_id), timeout=ROLLUP_REFRESH_LOCK_TIME, blocking=False)
+    try:
+        acquired = lock.acquire()
+    except redis.RedisError as e:
+        # Redis lỗi: vẫn làm mới (không có lock) thay vì bỏ lỡ lần làm mới
+        logger.warning(f"Failed to acquire refresh lock of rollup {rollup_id}: {str(e)}")
+        acquired = None
+    if acquired is False:
+        logger.info(f"Rollup {rollup_id} is already being refreshed, skipping")
+        return False
+    try:
+        RollupModel.refresh_rollup(rollup_id, REDSHIFT_CONFIG, full)
+        return True
+    except Exception as e:
+        logger.warning(f"Failed to refresh rollup {rollup_id}: {str(e)}")
+        return False
+    finally:
+        if acquired:
+            try:
+                lock.release()
+            except redis.RedisError as e:
+                logger.warning(f"Failed to release refresh lock of rollup {rollup_id}: {str(e)}")
+
+def refresh_all_rollups():
+    """Làm mới tuần tự tất cả rollup (incremental nếu có time_column, ngược lại build lại toàn bộ)"""
+    rollups = RollupModel.get_rollups()
+    refreshed = sum(refresh_rollup_safely(rollup["id"]) for rollup in rollups)
+    if rollups:
+        logger.info(f"Scheduled rollup refresh: {refreshed}/{len(rollups)} rollups refreshed")
+
+async def run_scheduled_rollup_refresh():
+    """Job định kỳ làm mới rollup; chỉ một worker chạy trong mỗi chu kỳ nhờ lock trên Redis"""
+    try:
+        acquired = redis_client.set(ROLLUP_LOCK_KEY, 1, nx=True, ex=max(ROLLUP_REFRESH_INTERVAL - 1, 1))
+    except redis.RedisError as e:
+        logger.warning(f"Failed to acquire rollup refresh lock: {str(e)}")
+        return
+    if acquired:
+        await asyncio.to_thread(refresh_all_rollups)
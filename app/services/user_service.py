@@ -1,7 +1,13 @@
 from app.utils.database import get_mysql_connection
+from app.utils.ttl_cache import TTLCache
 from typing import List, Optional, Dict
+from config import USER_CACHE_SIZE, USER_ROLE_CACHE_TTL
 import bcrypt
 
+# username -> role, tránh truy vấn MySQL ở mỗi request (role=None cũng được cache)
+_role_cache = TTLCache(USER_CACHE_SIZE, USER_ROLE_CACHE_TTL)
+_MISSING = object()
+
 def create_user(username, password, email):
     """Tạo tài khoản mới với mật khẩu đã hash"""
     hashed_password = bcrypt.hashpw(password, bcrypt.gensalt()).decode()
@@ -41,6 +47,36 @@ def get_user_role(username: str) -> str:
     except Exception as e:
         return None
 
+def get_cached_user_role(username: str) -> Optional[str]:
+    """Lấy role của user, cache trong process USER_ROLE_CACHE_TTL giây"""
+    role = _role_cache.get(username, _MISSING)
+    if role is _MISSING:
+        role = get_user_role(username)
+        _role_cache.set(username, role)
+    return role
+
+def prime_user_roles() -> int:
+    """Nạp role của mọi user đang active vào cache bằng một query (warm-up khi khởi động), trả về số user"""
+    conn = get_mysql_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+        SELECT ur.username, r.role_name
+        FROM roles r
+        JOIN user_roles ur ON r.id = ur.role_id
+        JOIN users u ON u.username = ur.username
+        WHERE u.active = 1
+        """)
+        roles = {}
+        for username, role_name in cursor.fetchall():
+            roles.setdefault(username, role_name)
+        cursor.close()
+    finally:
+        conn.close()
+    for username, role_name in roles.items():
+        _role_cache.set(username, role_name)
+    return len(roles)
+
 def get_users() -> List[Dict]:
     """Lấy danh sách tất cả user từ database"""
     try:
@@ -80,6 +116,7 @@ def update_user_role_and_active(username: str, role: str, active: bool) -> bool:
         conn.commit()
         cursor.close()
         conn.close()
+        _role_cache.pop(username)
         return True
     except Exception as e:
         return False
@@ -99,6 +136,7 @@ def delete_user(username: str) -> bool:
 
         cursor.close()
         conn.close()
+        _role_cache.pop(username)
         return True
     except Exception as e:
         return False
@@ -0,0 +1,98 @@
+import itertools
+import threading
+import time
+from bisect import insort
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Optional
+from fastapi import HTTPException
+from config import (
+    QUERY_MAX_CONCURRENCY, QUERY_USER_CONCURRENCY, QUERY_ROLE_CONCURRENCY,
+    QUERY_DEFAULT_ROLE_CONCURRENCY, QUERY_QUEUE_TIMEOUT
+)
+
+# Độ ưu tiên (số nhỏ được chạy trước): render dashboard > khám phá ad-hoc > job nền
+PRIORITY_DASHBOARD = 0
+PRIORITY_ADHOC = 1
+PRIORITY_BACKGROUND = 2
+
+class QueryAdmission:
+    """
+    Giới hạn số query warehouse chạy đồng thời trong process: tổng, theo user và theo role.
+    Query phải chờ được xếp hàng theo độ ưu tiên; query bị chặn bởi giới hạn user/role
+    không chặn các query khác phía sau.
+    """
+    def __init__(self, max_concurrency: int, user_limit: int, role_limits: Dict[str, int], default_role_limit: int):
+        self.max_concurrency = max_concurrency
+        self.user_limit = user_limit
+        self.role_limits = role_limits
+        self.default_role_limit = default_role_limit
+        self._cond = threading.Condition()
+        self._running = 0
+        self._running_users: Counter = Counter()
+        self._running_roles: Counter = Counter()
+        self._waiting = []
+        self._seq = itertools.count()
+
+    def _eligible(self, username: Optional[str], role: Optional[str]) -> bool:
+        if self._running >= self.max_concurrency:
+            return False
+        if username is None:
+            return True
+        if self._running_users[username] >= self.user_limit:
+            return False
+        return self._running_roles[role] < self.role_limits.get(role, self.default_role_limit)
+
+    def acquire(self, username: Optional[str], role: Optional[str], priority: int, timeout: float) -> bool:
+        """Chờ tới lượt chạy; trả về False nếu hết timeout"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            entry = (priority, next(self._seq), username, role)
+            insort(self._waiting, entry)
+            try:
+                while True:
+                    first = next((w for w in self._waiting if self._eligible(w[2], w[3])), None)
+                    if first is entry:
+                        self._running += 1
+                        if username is not None:
+                            self._running_users[username] += 1
+                            self._running_roles[role] += 1
+                        return True
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting.remove(entry)
+                self._cond.notify_all()
+
+    def release(self, username: Optional[str], role: Optional[str]):
+        with self._cond:
+            self._running -= 1
+            if username is not None:
+                self._running_users[username] -= 1
+                self._running_roles[role] -= 1
+            self._cond.notify_all()
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {"running": self._running, "waiting": len(self._waiting)}
+
+    @contextmanager
+    def slot(self, username: Optional[str] = None, role: Optional[str] = None, priority: int = PRIORITY_BACKGROUND,
+             timeout: float = QUERY_QUEUE_TIMEOUT):
+        """Context manager giữ một slot chạy query, trả về 503 nếu phải chờ quá lâu"""
+        if not self.acquire(username, role, priority, timeout):
+            raise HTTPException(status_code=503, detail="Too many concurrent queries, please retry later")
+        try:
+            yield
+        finally:
+            self.release(username, role)
+
+def build_requester(username: str, role: Optional[str], priority: int, confirmed: bool = True, cancel_scope=None) -> Dict:
+    """Thông tin người gửi query dùng cho admission control, xác nhận query tốn kém và huỷ query khi client ngắt kết nối"""
+    return {"username": username, "role": role, "priority": priority, "confirmed": confirmed, "cancel_scope": cancel_scope}
+
+admission = QueryAdmission(
+    QUERY_MAX_CONCURRENCY, QUERY_USER_CONCURRENCY, QUERY_ROLE_CONCURRENCY, QUERY_DEFAULT_ROLE_CONCURRENCY
+)
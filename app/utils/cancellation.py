@@ -0,0 +1,70 @@
+import asyncio
+import itertools
+import logging
+import threading
+from contextlib import contextmanager
+from typing import AsyncIterator, Callable, Dict, Iterator
+from fastapi import HTTPException, Request
+from fastapi.concurrency import iterate_in_threadpool, run_in_threadpool
+from config import DISCONNECT_POLL_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+class CancelScope:
+    """
+    Tập các hàm huỷ query đang chạy trên warehouse thuộc một request.
+    cancel() được gọi khi client ngắt kết nối: các query đang chạy bị huỷ phía server,
+    query chưa bắt đầu sẽ không được gửi đi.
+    """
+    def __init__(self):
+        self.cancelled = False
+        self._callbacks: Dict[int, Callable[[], None]] = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def guard(self, cancel_callback: Callable[[], None]):
+        """Đăng ký hàm huỷ cho query đang chạy trong khối with"""
+        with self._lock:
+            if self.cancelled:
+                raise HTTPException(status_code=499, detail="Query cancelled: client disconnected")
+            token = next(self._ids)
+            self._callbacks[token] = cancel_callback
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._callbacks.pop(token, None)
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            callbacks = list(self._callbacks.values())
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"Failed to cancel running query: {str(e)}")
+
+async def run_with_disconnect_cancel(request: Request, scope: CancelScope, func: Callable, *args, **kwargs):
+    """Chạy hàm blocking trong threadpool; nếu client ngắt kết nối trước khi xong thì huỷ các query của scope"""
+    task = asyncio.ensure_future(run_in_threadpool(func, *args, **kwargs))
+    while not task.done():
+        await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+        if not task.done() and await request.is_disconnected():
+            logger.info(f"Client disconnected from {request.url.path}, cancelling running queries")
+            await run_in_threadpool(scope.cancel)
+            break
+    return await task
+
+async def stream_with_disconnect_cancel(scope: CancelScope, iterator: Iterator[bytes]) -> AsyncIterator[bytes]:
+    """Phát các chunk của iterator blocking qua threadpool; nếu response bị dừng giữa chừng (client ngắt kết nối) thì huỷ các query của scope"""
+    completed = False
+    try:
+        async for chunk in iterate_in_threadpool(iterator):
+            yield chunk
+        completed = True
+    finally:
+        if not completed:
+            logger.info("Streaming response stopped early, cancelling running queries")
+            scope.cancel()
@@ -0,0 +1,81 @@
+import hashlib
+import json
+import logging
+import time
+from typing import Dict, List, Optional
+import redis
+from app.utils.redis import redis_client
+from app.utils.serialization import dumps, loads
+from config import CHART_CACHE_MAX_STALE, CHART_REFRESH_LOCK_TIME
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY_PREFIX = "chart_result"
+REFRESH_LOCK_PREFIX = "chart_refresh"
+ROWS_KEY_PREFIX = "chart_rows"
+
+def build_cache_key(query_data: Dict) -> str:
+    """Tạo key cache từ nội dung query (dataset, fields, filters, limit, sort)"""
+    payload = json.dumps(query_data, sort_keys=True, default=str)
+    return f"{CACHE_KEY_PREFIX}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+def get_cached_result(query_data: Dict) -> Optional[Dict]:
+    """Lấy kết quả chart đã cache dạng {"data", "computed_at"}, trả về None nếu chưa có"""
+    try:
+        raw = redis_client.get(build_cache_key(query_data))
+    except redis.RedisError as e:
+        logger.warning(f"Failed to read chart cache: {str(e)}")
+        return None
+    if not raw:
+        return None
+    return loads(raw)
+
+def set_cached_result(query_data: Dict, data: Dict) -> Dict:
+    """Lưu kết quả chart vào cache và trả về entry đã lưu"""
+    entry = {"data": data, "computed_at": time.time()}
+    try:
+        # Giữ entry lâu hơn thời gian tươi để có thể phục vụ dữ liệu cũ trong lúc refresh
+        redis_client.set(build_cache_key(query_data), dumps(entry), ex=CHART_CACHE_MAX_STALE)
+    except redis.RedisError as e:
+        logger.warning(f"Failed to write chart cache: {str(e)}")
+    return entry
+
+def get_cached_rows(query_data: Dict) -> Optional[Dict]:
+    """Lấy các dòng kết quả (theo từng bucket thời gian) đã cache cho refresh incremental"""
+    key = build_cache_key(query_data).replace(CACHE_KEY_PREFIX, ROWS_KEY_PREFIX, 1)
+    try:
+        raw = redis_client.get(key)
+    except redis.RedisError as e:
+        logger.warning(f"Failed to read chart rows cache: {str(e)}")
+        return None
+    return loads(raw) if raw else None
+
+def set_cached_rows(query_data: Dict, rows: List[Dict], watermark: Optional[str], full_at: float):
+    """Lưu các dòng kết quả kèm watermark (bucket thời gian mới nhất) và thời điểm tính lại toàn bộ gần nhất"""
+    key = build_cache_key(query_data).replace(CACHE_KEY_PREFIX, ROWS_KEY_PREFIX, 1)
+    entry = {"rows": rows, "watermark": watermark, "full_at": full_at}
+    try:
+        redis_client.set(key, dumps(entry), ex=CHART_CACHE_MAX_STALE)
+    except redis.RedisError as e:
+        logger.warning(f"Failed to write chart rows cache: {str(e)}")
+
+def get_entry_age(entry: Dict) -> float:
+    """Tuổi (giây) của một entry trong cache"""
+    return max(time.time() - entry["computed_at"], 0.0)
+
+def acquire_refresh_lock(query_data: Dict) -> bool:
+    """Giữ quyền refresh nền cho một query, tránh nhiều request cùng refresh một chart"""
+    key = build_cache_key(query_data).replace(CACHE_KEY_PREFIX, REFRESH_LOCK_PREFIX, 1)
+    try:
+        return bool(redis_client.set(key, 1, nx=True, ex=CHART_REFRESH_LOCK_TIME))
+    except redis.RedisError as e:
+        logger.warning(f"Failed to acquire chart refresh lock: {str(e)}")
+        return False
+
+def release_refresh_lock(query_data: Dict):
+    """Giải phóng quyền refresh nền của một query"""
+    key = build_cache_key(query_data).replace(CACHE_KEY_PREFIX, REFRESH_LOCK_PREFIX, 1)
+    try:
+        redis_client.delete(key)
+    except redis.RedisError as e:
+        logger.warning(f"Failed to release chart refresh lock: {str(e)}")
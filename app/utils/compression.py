@@ -0,0 +1,185 @@
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+# brotli và zstandard có trong requirements.txt; môi trường thiếu một trong hai thì bỏ encoding đó (gzip luôn có)
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DEFAULT_LEVELS = {"zstd": 3, "br": 4, "gzip": 6}
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson", "application/javascript", "application/xml")
+
+class _GzipEncoder:
+    def __init__(self, level: int):
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self.compressor.flush()
+
+class _BrotliEncoder:
+    def __init__(self, level: int):
+        self.compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.process(data) + self.compressor.flush()
+
+    def finish(self) -> bytes:
+        return self.compressor.finish()
+
+class _ZstdEncoder:
+    def __init__(self, level: int):
+        self.compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.compress(data) + self.compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self.compressor.flush()
+
+ENCODERS = {"gzip": _GzipEncoder}
+if brotli is not None:
+    ENCODERS["br"] = _BrotliEncoder
+if zstandard is not None:
+    ENCODERS["zstd"] = _ZstdEncoder
+
+# Thứ tự ưu tiên khi client chấp nhận nhiều encoding với cùng q-value
+PREFERENCE = ["zstd", "br", "gzip"]
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Chọn encoding tốt nhất mà cả client (header Accept-Encoding) và server hỗ trợ"""
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token] = q
+
+    candidates = []
+    for encoding in PREFERENCE:
+        if encoding not in ENCODERS:
+            continue
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > 0:
+            candidates.append((q, -PREFERENCE.index(encoding), encoding))
+    return max(candidates)[2] if candidates else None
+
+def encode_etag(etag: str, encoding: str) -> str:
+    """ETag của bản nén phải khác bản gốc: "abc" -> "abc-gzip\""""
+    if etag.endswith('"'):
+        return f'{etag[:-1]}-{encoding}"'
+    return etag
+
+def strip_etag_encoding(etag: str) -> str:
+    """Bỏ hậu tố encoding khỏi ETag client gửi lên trong If-None-Match"""
+    for encoding in PREFERENCE:
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)] + '"'
+    return etag
+
+class CompressionMiddleware:
+    """
+    ASGI middleware nén response theo Accept-Encoding (zstd, br nếu có thư viện, gzip).
+    Response nhỏ hơn minimum_size không được nén; mức nén có thể cấu hình theo prefix của route.
+    Hỗ trợ cả StreamingResponse (nén từng chunk và flush ngay).
+    """
+    def __init__(self, app, minimum_size: int = 1024, route_levels: Optional[Dict[str, Dict[str, int]]] = None):
+        self.app = app
+        self.minimum_size = minimum_size
+        # Prefix dài hơn được ưu tiên
+        self.route_levels: List[Tuple[str, Dict[str, int]]] = sorted(
+            (route_levels or {}).items(), key=lambda item: len(item[0]), reverse=True
+        )
+
+    def get_level(self, path: str, encoding: str) -> int:
+        for prefix, levels in self.route_levels:
+            if path.startswith(prefix) and encoding in levels:
+                return levels[encoding]
+        return DEFAULT_LEVELS[encoding]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        encoding = negotiate_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        level = self.get_level(scope["path"], encoding)
+        state = {"start": None, "encoder": None, "passthrough": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["start"] = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            if state["passthrough"]:
+                await send(message)
+                return
+
+            start = state["start"]
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if state["encoder"] is None:
+                response_headers = [(k.lower(), v) for k, v in start["headers"]]
+                content_type = next((v.decode("latin-1") for k, v in response_headers if k == b"content-type"), "")
+                already_encoded = any(k == b"content-encoding" for k, _ in response_headers)
+                compressible = content_type.startswith(COMPRESSIBLE_TYPES)
+                too_small = not more_body and len(body) < self.minimum_size
+                if already_encoded or not compressible or too_small or start["status"] in (204, 304):
+                    state["passthrough"] = True
+                    if compressible and not already_encoded:
+                        start["headers"] = response_headers + [(b"vary", b"Accept-Encoding")]
+                    await send(start)
+                    await send(message)
+                    return
+
+                state["encoder"] = ENCODERS[encoding](level)
+                new_headers = [
+                    (k, encode_etag(v.decode("latin-1"), encoding).encode("latin-1") if k == b"etag" else v)
+                    for k, v in response_headers if k != b"content-length"
+                ]
+                new_headers += [(b"content-encoding", encoding.encode("latin-1")), (b"vary", b"Accept-Encoding")]
+
+                if not more_body:
+                    compressed = state["encoder"].compress(body) + state["encoder"].finish()
+                    new_headers.append((b"content-length", str(len(compressed)).encode("latin-1")))
+                    start["headers"] = new_headers
+                    await send(start)
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+
+                start["headers"] = new_headers
+                await send(start)
+
+            chunk = state["encoder"].compress(body) if body else b""
+            if not more_body:
+                chunk += state["encoder"].finish()
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
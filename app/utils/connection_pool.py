@@ -0,0 +1,172 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class PooledConnection:
+    """
+    Connection lấy từ ConnectionPool: close() trả connection về pool thay vì đóng,
+    các thuộc tính khác chuyển tiếp tới connection thật.
+    """
+    def __init__(self, pool: "ConnectionPool", conn: Any):
+        self._pool = pool
+        self._conn = conn
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._pool.release(conn)
+
+    def discard(self):
+        """Đóng hẳn connection (ví dụ sau lỗi kết nối), không trả về pool"""
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._pool.discard(conn)
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise AttributeError(f"Connection already returned to pool {self._pool.name}")
+        return getattr(self._conn, name)
+
+class ConnectionPool:
+    """
+    Pool connection thread-safe: giữ tối đa max_idle connection rảnh, tạo mới khi không còn connection rảnh
+    (số query đồng thời đã được giới hạn bởi admission control). Connection rảnh quá idle_timeout giây bị đóng,
+    rảnh quá validate_after giây được kiểm tra bằng validate() trước khi dùng lại; reset() chạy khi trả về pool
+    (rollback transaction đang mở...). warm() và maintain() giữ ít nhất min_size connection rảnh.
+    """
+    def __init__(self, name: str, factory: Callable[[], Any], close: Callable[[Any], None],
+                 reset: Optional[Callable[[Any], None]] = None, validate: Optional[Callable[[Any], None]] = None,
+                 min_size: int = 0, max_idle: int = 8, idle_timeout: float = 300, validate_after: float = 30):
+        self.name = name
+        self.factory = factory
+        self.close_func = close
+        self.reset = reset
+        self.validate = validate
+        self.min_size = min_size
+        self.max_idle = max(max_idle, min_size)
+        self.idle_timeout = idle_timeout
+        self.validate_after = validate_after
+        # (connection, thời điểm trả về pool), connection dùng gần nhất ở cuối
+        self._idle: Deque[Tuple[Any, float]] = deque()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.discarded = 0
+        self.last_error: Optional[str] = None
+
+    def _create(self) -> Any:
+        try:
+            conn = self.factory()
+        except Exception as e:
+            self.last_error = str(e)
+            raise
+        self.last_error = None
+        with self._lock:
+            self.created += 1
+        return conn
+
+    def _close(self, conn: Any):
+        with self._lock:
+            self.discarded += 1
+        try:
+            self.close_func(conn)
+        except Exception as e:
+            logger.debug(f"Failed to close {self.name} connection: {str(e)}")
+
+    def acquire(self) -> Any:
+        """Lấy connection rảnh (còn dùng được) hoặc tạo connection mới"""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                conn, released_at = self._idle.pop()
+            idle_for = time.monotonic() - released_at
+            if idle_for > self.idle_timeout:
+                self._close(conn)
+                continue
+            if self.validate and idle_for > self.validate_after:
+                try:
+                    self.validate(conn)
+                except Exception:
+                    self._close(conn)
+                    continue
+            return conn
+        return self._create()
+
+    def connection(self) -> PooledConnection:
+        return PooledConnection(self, self.acquire())
+
+    def release(self, conn: Any):
+        if self.reset:
+            try:
+                self.reset(conn)
+            except Exception as e:
+                logger.debug(f"Discarding {self.name} connection that failed to reset: {str(e)}")
+                self._close(conn)
+                return
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append((conn, time.monotonic()))
+                return
+        self._close(conn)
+
+    def discard(self, conn: Any):
+        self._close(conn)
+
+    def warm(self, size: Optional[int] = None) -> int:
+        """Tạo connection cho tới khi có ít nhất size (mặc định min_size) connection rảnh, trả về số connection đã tạo"""
+        target = self.min_size if size is None else min(size, self.max_idle)
+        created = 0
+        while True:
+            with self._lock:
+                if len(self._idle) >= target:
+                    return created
+            conn = self._create()
+            created += 1
+            with self._lock:
+                self._idle.append((conn, time.monotonic()))
+
+    def maintain(self) -> int:
+        """Đóng connection rảnh quá idle_timeout rồi bổ sung lại tới min_size"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [conn for conn, released_at in self._idle if now - released_at > self.idle_timeout]
+            self._idle = deque((conn, released_at) for conn, released_at in self._idle if now - released_at <= self.idle_timeout)
+        for conn in expired:
+            self._close(conn)
+        return self.warm()
+
+    def check(self) -> float:
+        """Kiểm tra pool còn kết nối được tới server (validate trên một connection), trả về thời gian kiểm tra (giây)"""
+        start = time.perf_counter()
+        conn = self.acquire()
+        try:
+            if self.validate:
+                self.validate(conn)
+        except Exception as e:
+            self.last_error = str(e)
+            self._close(conn)
+            raise
+        self.release(conn)
+        return time.perf_counter() - start
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for conn, _ in idle:
+            self._close(conn)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            idle = len(self._idle)
+        return {
+            "idle": idle,
+            "min_size": self.min_size,
+            "max_idle": self.max_idle,
+            "created": self.created,
+            "discarded": self.discarded,
+            "last_error": self.last_error
+        }
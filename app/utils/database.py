@@ -1,10 +1,19 @@
 # database.py
-from clickhouse_driver import Client
-from config import CLICKHOUSE_CONFIG, MYSQL_CONFIG
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+from config import (
+    CLICKHOUSE_CONFIG, MYSQL_CONFIG, MYSQL_POOL_MIN_SIZE, MYSQL_POOL_MAX_IDLE, REDSHIFT_POOL_MIN_SIZE, REDSHIFT_POOL_MAX_IDLE,
+    CLICKHOUSE_POOL_MIN_SIZE, CLICKHOUSE_POOL_MAX_IDLE, POOL_IDLE_TIMEOUT, POOL_VALIDATE_AFTER
+)
+from app.utils.connection_pool import ConnectionPool
+from app.utils.metrics import span
 import mysql.connector
+import psycopg2
 
 
 def get_clickhouse_client():
+    # Import khi tạo client: clickhouse_driver chỉ cần cho chat
+    from clickhouse_driver import Client
     return Client(
         host=CLICKHOUSE_CONFIG['host'],
         port=CLICKHOUSE_CONFIG['port'],
@@ -13,13 +22,142 @@ def get_clickhouse_client():
         database=CLICKHOUSE_CONFIG['database']
     )
 
+class TracedCursor:
+    """Bọc cursor MySQL: thời gian execute/fetch được ghi vào stage "mysql" (xem app.utils.metrics)"""
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, *args, **kwargs):
+        with span("mysql"):
+            return self._cursor.execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        with span("mysql"):
+            return self._cursor.executemany(*args, **kwargs)
+
+    def fetchone(self):
+        with span("mysql"):
+            return self._cursor.fetchone()
+
+    def fetchmany(self, *args, **kwargs):
+        with span("mysql"):
+            return self._cursor.fetchmany(*args, **kwargs)
+
+    def fetchall(self):
+        with span("mysql"):
+            return self._cursor.fetchall()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._cursor.close()
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+class TracedConnection:
+    """Bọc connection MySQL để cursor và commit được đo thời gian"""
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, *args, **kwargs):
+        return TracedCursor(self._conn.cursor(*args, **kwargs))
+
+    def commit(self):
+        with span("mysql"):
+            return self._conn.commit()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+def _connect_mysql():
+    with span("mysql"):
+        return mysql.connector.connect(
+            host=MYSQL_CONFIG['host'],
+            port=MYSQL_CONFIG['port'],
+            user=MYSQL_CONFIG['user'],
+            password=MYSQL_CONFIG['password'],
+            database=MYSQL_CONFIG['database']
+        )
+
+def _reset_mysql(conn):
+    # Kết thúc transaction (kể cả transaction chỉ đọc) để lần dùng sau không thấy snapshot cũ
+    if conn.in_transaction:
+        conn.rollback()
+
+def _validate_mysql(conn):
+    conn.ping(reconnect=False)
+
+mysql_pool = ConnectionPool(
+    "mysql", _connect_mysql, close=lambda conn: conn.close(), reset=_reset_mysql, validate=_validate_mysql,
+    min_size=MYSQL_POOL_MIN_SIZE, max_idle=MYSQL_POOL_MAX_IDLE, idle_timeout=POOL_IDLE_TIMEOUT, validate_after=POOL_VALIDATE_AFTER
+)
+
 def get_mysql_connection():
-    return mysql.connector.connect(
-        host=MYSQL_CONFIG['host'],
-        port=MYSQL_CONFIG['port'],
-        user=MYSQL_CONFIG['user'],
-        password=MYSQL_CONFIG['password'],
-        database=MYSQL_CONFIG['database']
-    )
+    """Connection MySQL từ pool; conn.close() trả connection về pool"""
+    return TracedConnection(mysql_pool.connection())
+
+def _validate_redshift(conn):
+    if conn.closed:
+        raise ConnectionError("Redshift connection closed")
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT 1")
+    conn.rollback()
+
+# Pool Redshift theo cấu hình kết nối (thực tế chỉ có REDSHIFT_CONFIG)
+_redshift_pools: Dict[tuple, ConnectionPool] = {}
+
+def get_redshift_pool(redshift_config: Dict) -> ConnectionPool:
+    key = tuple(sorted(redshift_config.items()))
+    pool = _redshift_pools.get(key)
+    if pool is None:
+        pool = _redshift_pools.setdefault(key, ConnectionPool(
+            "redshift", lambda: psycopg2.connect(**redshift_config), close=lambda conn: conn.close(),
+            # rollback đóng named cursor và huỷ SET LOCAL của query trước
+            reset=lambda conn: conn.rollback(), validate=_validate_redshift,
+            min_size=REDSHIFT_POOL_MIN_SIZE, max_idle=REDSHIFT_POOL_MAX_IDLE,
+            idle_timeout=POOL_IDLE_TIMEOUT, validate_after=POOL_VALIDATE_AFTER
+        ))
+    return pool
+
+def get_redshift_connection(redshift_config: Dict):
+    """Connection Redshift (psycopg2) từ pool; conn.close() trả connection về pool"""
+    return get_redshift_pool(redshift_config).connection()
+
+def _validate_clickhouse(client):
+    client.execute("SELECT 1")
+
+def _reset_clickhouse(client):
+    # Client lỗi giữa chừng (timeout, KILL QUERY) tự ngắt kết nối; không giữ lại client đó
+    if not client.connection.connected:
+        raise ConnectionError("ClickHouse client disconnected")
+
+def _connect_clickhouse():
+    client = get_clickhouse_client()
+    # clickhouse_driver chỉ kết nối ở lần execute đầu tiên: kết nối ngay để connection trong pool đã sẵn sàng
+    client.connection.force_connect()
+    return client
+
+clickhouse_pool = ConnectionPool(
+    "clickhouse", _connect_clickhouse, close=lambda client: client.disconnect(), reset=_reset_clickhouse,
+    validate=_validate_clickhouse, min_size=CLICKHOUSE_POOL_MIN_SIZE, max_idle=CLICKHOUSE_POOL_MAX_IDLE,
+    idle_timeout=POOL_IDLE_TIMEOUT, validate_after=POOL_VALIDATE_AFTER
+)
+
+@contextmanager
+def pooled_clickhouse_client() -> Iterator:
+    """Client ClickHouse từ pool trong khối with; client bị bỏ (không trả về pool) nếu khối with lỗi"""
+    client = clickhouse_pool.acquire()
+    try:
+        yield client
+    except BaseException:
+        clickhouse_pool.discard(client)
+        raise
+    clickhouse_pool.release(client)
 
-    
+def all_pools() -> List[ConnectionPool]:
+    return [mysql_pool, clickhouse_pool] + list(_redshift_pools.values())
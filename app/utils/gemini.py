@@ -1,16 +1,20 @@
-import google.generativeai as genai
+from functools import lru_cache
 from config import GEMINI_API_KEY
-from app.services.user_service import get_user_role
+from app.services.user_service import get_cached_user_role
 from app.services.permission_service import check_table_access, get_allowed_tables_prompt
 import json
 
-# Cấu hình Gemini API
-genai.configure(api_key=GEMINI_API_KEY)
+@lru_cache(maxsize=None)
+def get_genai():
+    """Import và cấu hình Gemini SDK ở lần gọi đầu tiên (import SDK mất gần 1 giây, không cần cho worker chỉ phục vụ dashboard)"""
+    import google.generativeai as genai
+    genai.configure(api_key=GEMINI_API_KEY)
+    return genai
 
 def convert_to_sql(question: str, username: str) -> tuple:
     """Convert Vietnamese question to SQL with role-based access control using Gemini"""
     # Get user role
-    role = get_user_role(username)
+    role = get_cached_user_role(username)
     if not role:
         raise Exception("Không tìm thấy role của user")
 
@@ -77,7 +81,7 @@ def convert_to_sql(question: str, username: str) -> tuple:
 
     try:
         # Khởi tạo model Gemini
-        model = genai.GenerativeModel('gemini-2.0-flash-lite')  # Thay đổi tên model nếu cần
+        model = get_genai().GenerativeModel('gemini-2.0-flash-lite')  # Thay đổi tên model nếu cần
         
         # Gửi yêu cầu tới Gemini
         response = model.generate_content(
@@ -0,0 +1,31 @@
+import hashlib
+import json
+from typing import Optional
+from fastapi import Request, Response
+from app.utils.compression import strip_etag_encoding
+
+# Dữ liệu theo user: chỉ cho phép cache ở client và luôn phải kiểm tra lại bằng ETag
+CACHE_CONTROL_REVALIDATE = "private, no-cache"
+
+def build_etag(*parts) -> str:
+    """Tạo strong ETag từ các thành phần quyết định nội dung response (updated_at, fingerprint cache, ...)"""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return f'"{hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]}"'
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """Kiểm tra header If-None-Match (so sánh weak theo RFC 7232, bỏ qua hậu tố encoding do CompressionMiddleware thêm vào)"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(strip_etag_encoding(tag.removeprefix("W/")) == etag for tag in candidates)
+
+def check_not_modified(request: Request, response: Response, etag: str, cache_control: str = CACHE_CONTROL_REVALIDATE) -> Optional[Response]:
+    """Gắn ETag/Cache-Control vào response; trả về response 304 nếu client đã có bản mới nhất"""
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    return None
@@ -0,0 +1,172 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+from starlette.routing import Match
+
+# Bucket (giây) cho latency: từ truy vấn metadata vài ms tới query warehouse hàng chục giây
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+class Histogram:
+    """Histogram kiểu Prometheus (bucket cộng dồn, _sum, _count) theo bộ nhãn, an toàn khi gọi từ nhiều thread"""
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        for labels, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, ('le', _format_value(bound)))} {cumulative}")
+            cumulative += series[len(self.buckets)]
+            lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, ('le', '+Inf'))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {series[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+REQUEST_LATENCY = Histogram(
+    "bi_http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route", "status")
+)
+STAGE_LATENCY = Histogram(
+    "bi_stage_duration_seconds", "Time spent in each processing stage (mysql, warehouse, format, llm, chart, serialize).", ("stage",)
+)
+_registry: List[Histogram] = [REQUEST_LATENCY, STAGE_LATENCY]
+
+def register(metric: Histogram) -> Histogram:
+    """Thêm metric vào danh sách được xuất ở /metrics"""
+    _registry.append(metric)
+    return metric
+
+def render_metrics() -> str:
+    """Xuất toàn bộ metric theo text format của Prometheus"""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+class RequestTimings:
+    """Tổng thời gian và số lần của từng stage trong một request (các thread của request có thể cùng ghi)"""
+    def __init__(self):
+        self.stages: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            entry = self.stages.setdefault(stage, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    def server_timing(self, total: float) -> str:
+        """Giá trị header Server-Timing (ms)"""
+        with self._lock:
+            items = sorted(self.stages.items())
+        parts = [f'{stage};dur={seconds * 1000:.1f};desc="{count}x"' for stage, (seconds, count) in items]
+        parts.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(parts)
+
+# Timings của request hiện tại; threadpool của Starlette/anyio copy context nên span trong thread vẫn ghi vào đúng request
+_current_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+def record_stage(stage: str, seconds: float):
+    """Ghi thời gian một stage vào histogram và vào timings của request hiện tại (nếu có)"""
+    STAGE_LATENCY.observe(seconds, stage)
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.add(stage, seconds)
+
+@contextmanager
+def span(stage: str):
+    """Đo thời gian khối with như một stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+# (endpoint, method) -> route template, dùng chung cho các middleware cần nhãn theo route
+_route_paths: Dict[tuple, str] = {}
+
+def route_template(scope) -> str:
+    """Route template của request đã qua router (ví dụ /api/dashboards/{dashboard_id}), "unmatched" nếu không khớp route nào"""
+    app = scope.get("app")
+    endpoint = scope.get("endpoint")
+    if app is None or endpoint is None:
+        return "unmatched"
+    key = (endpoint, scope["method"])
+    path = _route_paths.get(key)
+    if path is None:
+        path = "unmatched"
+        for route in app.router.routes:
+            if getattr(route, "endpoint", None) is endpoint and route.matches(scope)[0] == Match.FULL:
+                path = route.path
+                break
+        _route_paths[key] = path
+    return path
+
+class MetricsMiddleware:
+    """
+    ASGI middleware đo latency từng request theo route template (không theo path thực để tránh bùng nổ nhãn)
+    và gắn header Server-Timing với thời gian các stage khi server_timing=True.
+    """
+    def __init__(self, app, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current_timings.set(timings)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", timings.server_timing(time.perf_counter() - start).encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_LATENCY.observe(time.perf_counter() - start, scope["method"], route_template(scope), str(status_code))
+            _current_timings.reset(token)
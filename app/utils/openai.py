@@ -1,16 +1,21 @@
 # utils.py
-import openai
 import json
+from functools import lru_cache
 from config import OPENAI_API_KEY
-from app.services.user_service import get_user_role
+from app.services.user_service import get_cached_user_role
 from app.services.permission_service import check_table_access, get_allowed_tables_prompt
 
-openai.api_key = OPENAI_API_KEY
+@lru_cache(maxsize=None)
+def get_openai():
+    """Import và cấu hình OpenAI SDK ở lần gọi đầu tiên"""
+    import openai
+    openai.api_key = OPENAI_API_KEY
+    return openai
 
 def convert_to_sql(question: str, username: str) -> tuple:
     """Convert Vietnamese question to SQL with role-based access control"""
     # Get user role
-    role = get_user_role(username)
+    role = get_cached_user_role(username)
     if not role:
         raise Exception("Không tìm thấy role của user")
 
@@ -76,7 +81,7 @@ def convert_to_sql(question: str, username: str) -> tuple:
     """
     
     try:
-        response = openai.chat.completions.create(
+        response = get_openai().chat.completions.create(
             model="gpt-4o-mini-2024-07-18",
             messages=[
                 {"role": "system", "content": "Bạn là một chuyên gia SQL giỏi, nhiệm vụ của bạn là chuyển đổi câu hỏi thành câu lệnh SQL chính xác theo đúng quyền truy cập và cung cấp metadata về kết quả."},
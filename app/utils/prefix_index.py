@@ -0,0 +1,26 @@
+from bisect import bisect_left
+from typing import Any, Iterable, List, Optional, Tuple
+
+class PrefixIndex:
+    """Index tìm kiếm theo prefix (không phân biệt hoa thường) trên danh sách key đã sắp xếp, dùng bisect"""
+    def __init__(self, entries: Iterable[Tuple[str, Any]]):
+        items = sorted(((key.lower(), value) for key, value in entries), key=lambda item: item[0])
+        self.keys = [key for key, _ in items]
+        self.values = [value for _, value in items]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def range(self, prefix: str) -> Tuple[int, int]:
+        """Vị trí [start, end) của các key bắt đầu bằng prefix"""
+        prefix = prefix.lower()
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + "\uffff", lo=start)
+        return start, end
+
+    def search(self, prefix: str, limit: Optional[int] = None) -> List[Any]:
+        """Trả về các value có key bắt đầu bằng prefix, theo thứ tự key"""
+        start, end = self.range(prefix)
+        if limit is not None:
+            end = min(end, start + limit)
+        return self.values[start:end]
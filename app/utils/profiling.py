@@ -0,0 +1,190 @@
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+from app.utils.metrics import route_template
+
+# Frame lá của thread đang rảnh (chờ việc trong threadpool, event loop chờ I/O): không tính vào profile
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+MAX_STACK_DEPTH = 128
+
+_THREAD_SUFFIX = re.compile(r"_\d+$")
+_ROOT = os.getcwd() + os.sep
+
+class ProfileSession:
+    """Các stack đã lấy mẫu trong lúc một request được profile, ở dạng folded (frame gốc;...;frame lá -> số mẫu)"""
+    def __init__(self):
+        self.stacks: Counter = Counter()
+        self.samples = 0
+
+    def add(self, stacks: Sequence[str]):
+        self.samples += 1
+        self.stacks.update(stacks)
+
+def folded_stacks(stacks: Dict[str, int]) -> str:
+    """Định dạng folded stacks ("frame gốc;...;frame lá số_mẫu"), dùng trực tiếp với flamegraph.pl, inferno hoặc speedscope"""
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(stacks.items(), key=lambda item: -item[1]))
+
+class SamplingProfiler:
+    """
+    Profiler thống kê: một thread nền đọc stack của mọi thread (sys._current_frames) mỗi interval giây,
+    chỉ chạy khi có session đang mở. Stack được lấy từ cả event loop và threadpool nên mỗi process chỉ mở
+    tối đa max_sessions session cùng lúc để mẫu không bị lẫn giữa các request.
+    """
+    def __init__(self, interval: float = 0.005, max_sessions: int = 1):
+        self.interval = interval
+        self.max_sessions = max_sessions
+        self._sessions: List[ProfileSession] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._labels: Dict[tuple, str] = {}
+
+    def start_session(self) -> Optional[ProfileSession]:
+        """Mở session mới, None nếu đã đủ max_sessions session đang chạy"""
+        with self._lock:
+            if len(self._sessions) >= self.max_sessions:
+                return None
+            session = ProfileSession()
+            self._sessions.append(session)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+                self._thread.start()
+            self._wakeup.set()
+            return session
+
+    def stop_session(self, session: ProfileSession):
+        with self._lock:
+            if session in self._sessions:
+                self._sessions.remove(session)
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while True:
+            with self._lock:
+                if not self._sessions:
+                    self._wakeup.clear()
+            self._wakeup.wait()
+            time.sleep(self.interval)
+            stacks = self._sample(own_ident)
+            with self._lock:
+                for session in self._sessions:
+                    session.add(stacks)
+
+    def _label(self, code) -> str:
+        key = (code.co_filename, code.co_name, code.co_firstlineno)
+        label = self._labels.get(key)
+        if label is None:
+            filename = code.co_filename
+            if "site-packages" + os.sep in filename:
+                filename = filename.split("site-packages" + os.sep, 1)[1]
+            elif filename.startswith(_ROOT):
+                filename = filename[len(_ROOT):]
+            else:
+                filename = os.path.basename(filename)
+            label = self._labels[key] = f"{code.co_name} ({filename}:{code.co_firstlineno})"
+        return label
+
+    def _sample(self, own_ident: int) -> List[str]:
+        names = {thread.ident: _THREAD_SUFFIX.sub("", thread.name) for thread in threading.enumerate()}
+        stacks = []
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            code = frame.f_code
+            if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                continue
+            labels = []
+            while frame is not None and len(labels) < MAX_STACK_DEPTH:
+                labels.append(self._label(frame.f_code))
+                frame = frame.f_back
+            labels.append(names.get(ident, "thread"))
+            stacks.append(";".join(reversed(labels)))
+        return stacks
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profile một phần request: ngẫu nhiên theo sample_rate, request có header
+    X-Profile-Request bằng header_token, hoặc request của các user trong users.
+    Profile được lưu theo route template qua store(record) (sau khi response gửi xong)
+    và id của nó được trả về trong header X-Profile-Id.
+    """
+    def __init__(self, app, profiler: SamplingProfiler, store: Callable[[Dict], Awaitable], sample_rate: float = 0.0,
+                 header_token: str = "", users: Sequence[str] = (), verify_token: Optional[Callable[[str], str]] = None):
+        self.app = app
+        self.profiler = profiler
+        self.store = store
+        self.sample_rate = sample_rate
+        self.header_token = header_token.encode("latin-1")
+        self.users = set(users)
+        self.verify_token = verify_token
+
+    def _username(self, headers: Dict[bytes, bytes]) -> Optional[str]:
+        authorization = headers.get(b"authorization", b"").decode("latin-1")
+        if not self.verify_token or not authorization.lower().startswith("bearer "):
+            return None
+        try:
+            return self.verify_token(authorization[7:])
+        except Exception:
+            return None
+
+    def _trigger(self, scope) -> Optional[tuple]:
+        """Lý do profile request (và username nếu biết), None nếu không profile"""
+        headers = dict(scope["headers"])
+        if self.header_token and headers.get(b"x-profile-request") == self.header_token:
+            return "header", self._username(headers)
+        username = self._username(headers) if self.users else None
+        if username in self.users:
+            return "user", username
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sampled", username
+        return None
+
+    async def __call__(self, scope, receive, send):
+        trigger = self._trigger(scope) if scope["type"] == "http" else None
+        session = self.profiler.start_session() if trigger else None
+        if session is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex[:16]
+        started_at = time.time()
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message = {**message, "headers": list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode("latin-1"))]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.profiler.stop_session(session)
+            if session.samples:
+                await self.store({
+                    "id": profile_id,
+                    "route": route_template(scope),
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status_code,
+                    "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+                    "started_at": started_at,
+                    "trigger": trigger[0],
+                    "username": trigger[1],
+                    "samples": session.samples,
+                    "interval_ms": self.profiler.interval * 1000,
+                    "stacks": dict(session.stacks)
+                })
@@ -0,0 +1,125 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional
+from app.utils.metrics import DEFAULT_BUCKETS
+from config import QUERY_SLOW_THRESHOLD, QUERY_STATS_MAX_KEYS
+
+logger = logging.getLogger(__name__)
+
+# Bucket latency dùng chung với /metrics; bucket cuối (+Inf) nằm sau DEFAULT_BUCKETS
+LATENCY_BUCKETS = DEFAULT_BUCKETS
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|\$\d+")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_sql(sql: str) -> str:
+    """Chuẩn hoá câu SQL thành dạng fingerprint: literal và placeholder thành ?, danh sách IN (?, ?, ...) thành (?), gộp khoảng trắng"""
+    normalized = _STRING_LITERAL.sub("?", sql)
+    normalized = _PLACEHOLDER.sub("?", normalized)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _IN_LIST.sub("(?)", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip().lower()
+
+def fingerprint(normalized_sql: str) -> str:
+    return hashlib.sha1(normalized_sql.encode("utf-8")).hexdigest()[:16]
+
+def bucket_index(seconds: float) -> int:
+    return bisect_left(LATENCY_BUCKETS, seconds)
+
+def percentile_from_buckets(buckets: List[int], quantile: float) -> Optional[float]:
+    """Ước lượng percentile từ histogram: trả về cận trên của bucket chứa percentile (None nếu rơi vào bucket +Inf)"""
+    total = sum(buckets)
+    if not total:
+        return None
+    rank = quantile * total
+    cumulative = 0
+    for index, count in enumerate(buckets):
+        cumulative += count
+        if cumulative >= rank:
+            return LATENCY_BUCKETS[index] if index < len(LATENCY_BUCKETS) else None
+    return None
+
+class QueryStatsCollector:
+    """
+    Gộp thống kê query warehouse trong process theo (fingerprint, source, dataset, chart, user)
+    cho đến lần flush tiếp theo. Latency được giữ dưới dạng histogram để p95 gộp được giữa các lần flush.
+    """
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self.window_start = time.time()
+        self._stats: Dict[tuple, Dict] = {}
+        self._dropped = 0
+        self._lock = threading.Lock()
+
+    def record(self, source: str, sql: str, duration: float, rows: int, size_bytes: int,
+               dataset_id: Optional[int] = None, chart_id: Optional[int] = None, username: Optional[str] = None):
+        normalized = normalize_sql(sql)
+        query_fingerprint = fingerprint(normalized)
+        if duration >= QUERY_SLOW_THRESHOLD:
+            logger.warning(
+                f"Slow {source} query {query_fingerprint} ({duration:.2f}s, {rows} rows, dataset {dataset_id}, "
+                f"chart {chart_id}, user {username}): {normalized[:1000]}"
+            )
+        key = (query_fingerprint, source, dataset_id, chart_id, username)
+        with self._lock:
+            entry = self._stats.get(key)
+            if entry is None:
+                if len(self._stats) >= self.max_keys:
+                    self._dropped += 1
+                    return
+                entry = self._stats[key] = {
+                    "fingerprint": query_fingerprint,
+                    "source": source,
+                    "sample_query": normalized,
+                    "dataset_id": dataset_id,
+                    "chart_id": chart_id,
+                    "username": username,
+                    "calls": 0,
+                    "total_time": 0.0,
+                    "max_time": 0.0,
+                    "total_rows": 0,
+                    "total_bytes": 0,
+                    "latency_buckets": [0] * (len(LATENCY_BUCKETS) + 1)
+                }
+            entry["calls"] += 1
+            entry["total_time"] += duration
+            entry["max_time"] = max(entry["max_time"], duration)
+            entry["total_rows"] += rows
+            entry["total_bytes"] += size_bytes
+            entry["latency_buckets"][bucket_index(duration)] += 1
+
+    def drain(self) -> Dict:
+        """Lấy toàn bộ thống kê của cửa sổ hiện tại và bắt đầu cửa sổ mới"""
+        with self._lock:
+            stats, dropped, window_start = list(self._stats.values()), self._dropped, self.window_start
+            self._stats = {}
+            self._dropped = 0
+            self.window_start = time.time()
+        return {"window_start": window_start, "stats": stats, "dropped": dropped}
+
+    def restore(self, drained: Dict):
+        """Gộp lại thống kê chưa ghi được (flush lỗi) để lần flush sau ghi tiếp"""
+        with self._lock:
+            self.window_start = min(self.window_start, drained["window_start"])
+            self._dropped += drained["dropped"]
+            for entry in drained["stats"]:
+                key = (entry["fingerprint"], entry["source"], entry["dataset_id"], entry["chart_id"], entry["username"])
+                current = self._stats.get(key)
+                if current is None:
+                    self._stats[key] = entry
+                    continue
+                current["calls"] += entry["calls"]
+                current["total_time"] += entry["total_time"]
+                current["max_time"] = max(current["max_time"], entry["max_time"])
+                current["total_rows"] += entry["total_rows"]
+                current["total_bytes"] += entry["total_bytes"]
+                current["latency_buckets"] = [a + b for a, b in zip(current["latency_buckets"], entry["latency_buckets"])]
+
+query_stats = QueryStatsCollector(QUERY_STATS_MAX_KEYS)
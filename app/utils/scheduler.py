@@ -0,0 +1,36 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+_tasks: Dict[str, asyncio.Task] = {}
+
+def start_periodic_task(name: str, interval_seconds: int, func: Callable[[], Awaitable], initial_delay: int = 0) -> asyncio.Task:
+    """Chạy func định kỳ trong background cho đến khi app shutdown"""
+    if name in _tasks and not _tasks[name].done():
+        return _tasks[name]
+
+    async def runner():
+        if initial_delay:
+            await asyncio.sleep(initial_delay)
+        while True:
+            try:
+                await func()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Lỗi của một lần chạy không được làm dừng cả vòng lặp
+                logger.error(f"Periodic task {name} failed: {str(e)}")
+            await asyncio.sleep(interval_seconds)
+
+    _tasks[name] = asyncio.create_task(runner(), name=name)
+    logger.info(f"Started periodic task {name} every {interval_seconds}s")
+    return _tasks[name]
+
+async def stop_all_tasks():
+    """Huỷ tất cả các task định kỳ khi app shutdown"""
+    for task in _tasks.values():
+        task.cancel()
+    await asyncio.gather(*_tasks.values(), return_exceptions=True)
+    _tasks.clear()
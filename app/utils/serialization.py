@@ -0,0 +1,41 @@
+from datetime import date
+from decimal import Decimal
+from typing import Any
+import numpy as np
+import orjson
+from fastapi.responses import ORJSONResponse
+from app.utils.metrics import span
+
+# orjson tự xử lý datetime, numpy array/scalar, dataclass; key không phải str (index của DataFrame) được chuyển thành str
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+def _default(obj: Any):
+    """Xử lý các kiểu orjson không hỗ trợ sẵn (Decimal từ Redshift/MySQL, pandas Series, numpy scalar đặc biệt)"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if hasattr(obj, "tolist"):
+        # pandas Series / Index
+        return obj.tolist()
+    if isinstance(obj, date):
+        return obj.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+def dumps(data: Any) -> bytes:
+    """Serialize dữ liệu thành JSON (bytes) bằng orjson"""
+    return orjson.dumps(data, default=_default, option=ORJSON_OPTIONS)
+
+def dumps_str(data: Any) -> str:
+    """Serialize dữ liệu thành JSON (str), dùng khi lưu vào cột TEXT/JSON của MySQL"""
+    return dumps(data).decode("utf-8")
+
+def loads(data: Any) -> Any:
+    """Parse JSON (str hoặc bytes) bằng orjson"""
+    return orjson.loads(data)
+
+class FastJSONResponse(ORJSONResponse):
+    """Response class mặc định của app: serialize bằng orjson với hỗ trợ numpy/Decimal"""
+    def render(self, content: Any) -> bytes:
+        with span("serialize"):
+            return dumps(content)
@@ -1,9 +1,13 @@
-import pandas as pd
-from sklearn.linear_model import LinearRegression
+from __future__ import annotations
 import numpy as np
-from typing import Tuple, Optional, Dict, List, Any
+from typing import TYPE_CHECKING, Tuple, Optional, Dict, List, Any
 from app.utils import gemini, openai
 from app.services.permission_service import get_role_table_groups, execute_query_with_permission
+from app.utils.metrics import span
+
+# pandas, sklearn và plotly chỉ cần cho chat: import khi dùng lần đầu để worker khởi động nhanh
+if TYPE_CHECKING:
+    import pandas as pd
 
 def predict_trend(df: pd.DataFrame, x_col: str, y_col: str, future_periods: int = 5) -> Tuple[Optional[pd.DataFrame], Optional[float]]:
     """
@@ -18,6 +22,9 @@ def predict_trend(df: pd.DataFrame, x_col: str, y_col: str, future_periods: int
     Returns:
         Tuple[Optional[pd.DataFrame], Optional[float]]: DataFrame kết hợp dữ liệu thực tế và dự đoán, cùng với R² score.
     """
+    import pandas as pd
+    from sklearn.linear_model import LinearRegression
+
     if df.empty or x_col not in df.columns or y_col not in df.columns:
         return None, None
 
@@ -77,6 +84,8 @@ def create_chart(df: pd.DataFrame, chart_type: str, chart_title: str, columns_me
     if df.empty:
         return None
 
+    import plotly.express as px
+
     try:
         # Rename columns based on metadata if available
         if columns_metadata:
@@ -139,7 +148,7 @@ def create_chart(df: pd.DataFrame, chart_type: str, chart_title: str, columns_me
 
     return None
 
-def handle_query(question: str, client: Any, username: str, selected_model: str = "Gemini") -> Tuple[
+def handle_query(question: str, client: Any, username: str, selected_model: str = "Gemini", cancel_scope: Any = None) -> Tuple[
     Optional[pd.DataFrame], Optional[Dict], str, str, List[str], str
 ]:
     """
@@ -150,32 +159,38 @@ def handle_query(question: str, client: Any, username: str, selected_model: str
         client (Any): Client ClickHouse để thực thi query.
         username (str): Tên người dùng để kiểm tra quyền.
         selected_model (str): Model AI để chuyển đổi câu hỏi thành SQL (OpenAI hoặc Gemini).
+        cancel_scope (Any): CancelScope của request, dùng để huỷ query khi client ngắt kết nối.
 
     Returns:
         Tuple: (df_display, chart_fig, sql_query, explanation, recommendation, chart_title)
     """
+    import pandas as pd
+
     try:
         # Chọn model AI
         convert_func = openai.convert_to_sql if selected_model == "OpenAI" else gemini.convert_to_sql
 
         # Chuyển đổi câu hỏi thành SQL với kiểm tra quyền
-        sql_query, explanation, chart_title, suggested_chart_type, recommendation, columns_metadata = convert_func(
-            question, username
-        )
+        with span("llm"):
+            sql_query, explanation, chart_title, suggested_chart_type, recommendation, columns_metadata = convert_func(
+                question, username
+            )
 
         # Nếu không có SQL, trả về ngay
         if not sql_query:
             return None, None, sql_query, explanation, recommendation, chart_title
 
         # Thực thi query với kiểm tra quyền
-        result = execute_query_with_permission(client, sql_query, username)
+        with span("warehouse"):
+            result = execute_query_with_permission(client, sql_query, username, cancel_scope)
 
         if result:
             # Tạo DataFrame từ kết quả
             df = pd.DataFrame(result[0], columns=[col[0] for col in result[1]])
 
             # Tạo biểu đồ với loại biểu đồ được đề xuất
-            chart_fig = create_chart(df, suggested_chart_type, chart_title, columns_metadata)
+            with span("chart"):
+                chart_fig = create_chart(df, suggested_chart_type, chart_title, columns_metadata)
 
             # Format tên hiển thị cho DataFrame
             df_display = df.copy()
@@ -0,0 +1,73 @@
+"""
+Benchmark đường chart query: build_query (SQL + lookup dataset/rollup trên MySQL giả lập),
+pivot/format kết quả và build_and_execute_query/stream_query đầu-cuối qua driver DB-API giả lập.
+
+Chạy riêng từ thư mục gốc của repo:
+    python -m benchmarks.bench_chart_query --quick
+"""
+import argparse
+from typing import List
+from app.model.chart_query import ChartQueryModel
+from benchmarks.fake_dbapi import installed
+from benchmarks.harness import BenchCase, header, format_row, measure
+from benchmarks.synthetic import DEFAULT_SHAPES, Shape, chart_driver, chart_result, query_data_for
+
+def _format_case(shape: Shape) -> BenchCase:
+    driver = chart_driver(shape)
+
+    def setup():
+        plan = ChartQueryModel.build_query(query_data_for(shape))
+        return plan, chart_result(shape)[1]
+
+    return BenchCase(
+        f"chart_query.format_results/{shape.name}",
+        lambda arg: ChartQueryModel.format_results(arg[1], arg[0]),
+        setup=setup, items=shape.rows, context=lambda: installed(driver)
+    )
+
+def _execute_case(shape: Shape) -> BenchCase:
+    driver = chart_driver(shape)
+    query_data = query_data_for(shape)
+    return BenchCase(
+        f"chart_query.build_and_execute_query/{shape.name}",
+        lambda _: ChartQueryModel.build_and_execute_query(query_data, {}),
+        items=shape.rows, context=lambda: installed(driver)
+    )
+
+def _stream_case(shape: Shape) -> BenchCase:
+    driver = chart_driver(shape)
+    query_data = query_data_for(shape)
+
+    def consume(_):
+        for _line in ChartQueryModel.stream_query(query_data, {}):
+            pass
+
+    return BenchCase(f"chart_query.stream_query/{shape.name}", consume, items=shape.rows, context=lambda: installed(driver))
+
+def cases(quick: bool = False) -> List[BenchCase]:
+    shapes = [shape.scaled(0.1) for shape in DEFAULT_SHAPES] if quick else DEFAULT_SHAPES
+    small = shapes[0]
+    driver = chart_driver(small)
+    result = [BenchCase(
+        "chart_query.build_query",
+        lambda _: ChartQueryModel.build_query(query_data_for(small)),
+        context=lambda: installed(driver)
+    )]
+    for shape in shapes:
+        result.append(_format_case(shape))
+        result.append(_execute_case(shape))
+        if not shape.dimensions:
+            result.append(_stream_case(shape))
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chart query building, pivoting và serialization")
+    parser.add_argument("--quick", action="store_true", help="Giảm số dòng 10 lần")
+    parser.add_argument("--min-time", type=float, default=0.5)
+    args = parser.parse_args()
+    print(header())
+    for case in cases(args.quick):
+        print(format_row(case.name, measure(case, args.min_time)))
+
+if __name__ == "__main__":
+    main()
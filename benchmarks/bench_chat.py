@@ -0,0 +1,52 @@
+"""
+Benchmark phần xử lý kết quả chat query: create_chart và predict_trend trên DataFrame tổng hợp.
+
+Chạy riêng từ thư mục gốc của repo:
+    python -m benchmarks.bench_chat --quick
+"""
+import argparse
+from typing import List
+from app.utils.utils import create_chart, predict_trend
+from benchmarks.harness import BenchCase, header, format_row, measure
+from benchmarks.synthetic import chat_frame
+
+ROW_COUNTS = [1000, 10000, 100000]
+CHART_TYPES = ["Line Chart", "Bar Chart"]
+COLUMNS_METADATA = {
+    "created_at": {"display_name": "Thời gian"},
+    "amount": {"display_name": "Doanh thu"},
+    "transactions": {"display_name": "Số giao dịch"},
+    "partner": {"display_name": "Đối tác"},
+}
+
+def cases(quick: bool = False) -> List[BenchCase]:
+    row_counts = [rows // 10 for rows in ROW_COUNTS] if quick else ROW_COUNTS
+    result = []
+    for rows in row_counts:
+        for chart_type in CHART_TYPES:
+            result.append(BenchCase(
+                f"chat.create_chart/{chart_type.lower().replace(' ', '_')}/{rows}r",
+                lambda frame, chart_type=chart_type: create_chart(frame, chart_type, "Doanh thu theo giờ", COLUMNS_METADATA),
+                setup=lambda rows=rows: chat_frame(rows), items=rows
+            ))
+        result.append(BenchCase(
+            f"chat.predict_trend/{rows}r",
+            lambda frame: predict_trend(frame, "created_at", "amount", future_periods=30),
+            setup=lambda rows=rows: chat_frame(rows), items=rows
+        ))
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark create_chart và predict_trend")
+    parser.add_argument("--quick", action="store_true", help="Giảm số dòng 10 lần")
+    parser.add_argument("--min-time", type=float, default=0.5)
+    args = parser.parse_args()
+    print(header())
+    for case in cases(args.quick):
+        try:
+            print(format_row(case.name, measure(case, args.min_time)))
+        except Exception as e:
+            print(f"{case.name:<52} error: {type(e).__name__}: {e}")
+
+if __name__ == "__main__":
+    main()
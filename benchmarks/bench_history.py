@@ -0,0 +1,57 @@
+"""
+Benchmark serialize/deserialize lịch sử chat: save_query_history (DataFrame + chart -> JSON, INSERT qua MySQL giả lập)
+và deserialize_dataframe (JSON -> DataFrame khi đọc lại lịch sử).
+
+Chạy riêng từ thư mục gốc của repo:
+    python -m benchmarks.bench_history --quick
+"""
+import argparse
+from typing import List
+from app.services.history_service import deserialize_dataframe, save_query_history
+from app.utils.serialization import dumps_str
+from benchmarks.fake_dbapi import FakeDriver, installed
+from benchmarks.harness import BenchCase, header, format_row, measure
+from benchmarks.synthetic import chat_frame
+
+ROW_COUNTS = [1000, 10000, 50000]
+
+def _chart_fig(rows: int) -> dict:
+    """Dict Plotly cỡ tương đương chart của một kết quả chat"""
+    frame = chat_frame(rows)
+    return {
+        "data": [{"type": "scatter", "x": frame["created_at"].astype(str).tolist(), "y": frame["amount"].tolist()}],
+        "layout": {"title": {"text": "Doanh thu theo giờ"}}
+    }
+
+def _serialized_frame(rows: int) -> str:
+    frame = chat_frame(rows)
+    frame["created_at"] = frame["created_at"].astype(str)
+    return dumps_str(frame.to_dict())
+
+def cases(quick: bool = False) -> List[BenchCase]:
+    row_counts = [rows // 10 for rows in ROW_COUNTS] if quick else ROW_COUNTS
+    driver = FakeDriver()
+    result = []
+    for rows in row_counts:
+        result.append(BenchCase(
+            f"history.save_query_history/{rows}r",
+            lambda arg: save_query_history("bench", "Doanh thu theo giờ?", "", "SELECT 1", arg[0], "Line Chart", arg[1], "Doanh thu"),
+            setup=lambda rows=rows: (chat_frame(rows), _chart_fig(rows)), items=rows, context=lambda: installed(driver)
+        ))
+        result.append(BenchCase(
+            f"history.deserialize_dataframe/{rows}r",
+            deserialize_dataframe, setup=lambda rows=rows: _serialized_frame(rows), items=rows
+        ))
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark serialize lịch sử chat")
+    parser.add_argument("--quick", action="store_true", help="Giảm số dòng 10 lần")
+    parser.add_argument("--min-time", type=float, default=0.5)
+    args = parser.parse_args()
+    print(header())
+    for case in cases(args.quick):
+        print(format_row(case.name, measure(case, args.min_time)))
+
+if __name__ == "__main__":
+    main()
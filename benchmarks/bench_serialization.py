@@ -0,0 +1,98 @@
+"""
+So sánh tốc độ serialize response chart giữa đường cũ (pydantic validate + json stdlib)
+và đường mới (orjson trực tiếp, không validate lại).
+
+Chạy từ thư mục gốc của repo:
+    python -m benchmarks.bench_serialization --labels 10000 --datasets 5
+"""
+import argparse
+import json
+import timeit
+from datetime import datetime, timedelta
+from typing import List
+import numpy as np
+import pandas as pd
+from app.schemas.chart_query import ChartQueryResponse
+from app.utils.serialization import dumps
+from benchmarks.harness import BenchCase
+
+def build_chart_payload(n_labels: int, n_datasets: int) -> dict:
+    """Payload Chart.js dạng datasets giống kết quả của ChartQueryModel.build_and_execute_query"""
+    start = datetime(2024, 1, 1)
+    labels = [(start + timedelta(hours=i)).isoformat() for i in range(n_labels)]
+    datasets = [
+        {"label": f"partner_{d}", "data": [float(i * (d + 1)) for i in range(n_labels)]}
+        for d in range(n_datasets)
+    ]
+    return {"labels": labels, "datasets": datasets}
+
+def build_history_frame(n_rows: int) -> dict:
+    """DataFrame.to_dict() chứa numpy types giống dữ liệu lưu trong query_history"""
+    df = pd.DataFrame({
+        "created_at": pd.date_range("2024-01-01", periods=n_rows, freq="h").astype(str),
+        "amount": np.random.rand(n_rows) * 1000,
+        "count": np.arange(n_rows, dtype=np.int64),
+    })
+    return df.to_dict()
+
+def stdlib_chart_response(payload: dict) -> bytes:
+    # Tương đương FastAPI: validate theo response_model, dump mode json rồi json.dumps
+    content = ChartQueryResponse(**payload).model_dump(mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+def orjson_chart_response(payload: dict) -> bytes:
+    return dumps(payload)
+
+def stdlib_history(data: dict) -> str:
+    # Đường cũ của history_service: chuyển đổi numpy đệ quy rồi json.dumps
+    def convert(value):
+        if isinstance(value, dict):
+            return {str(k): convert(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [convert(v) for v in value]
+        if isinstance(value, np.generic):
+            return value.item()
+        return value
+    return json.dumps(convert(data))
+
+def orjson_history(data: dict) -> bytes:
+    return dumps(data)
+
+def bench(name: str, func, arg, number: int) -> float:
+    best = min(timeit.repeat(lambda: func(arg), number=number, repeat=5)) / number
+    print(f"{name:<32} {best * 1000:10.3f} ms/op")
+    return best
+
+def cases(quick: bool = False) -> List[BenchCase]:
+    """Các case cho benchmarks.run (chỉ đường orjson đang dùng trong app)"""
+    n_labels = 1000 if quick else 10000
+    n_rows = 500 if quick else 5000
+    return [
+        BenchCase(f"serialization.chart_response/{n_labels}x5", orjson_chart_response,
+                  setup=lambda: build_chart_payload(n_labels, 5), items=n_labels),
+        BenchCase(f"serialization.history/{n_rows}r", orjson_history,
+                  setup=lambda: build_history_frame(n_rows), items=n_rows),
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON serialization của response chart")
+    parser.add_argument("--labels", type=int, default=10000)
+    parser.add_argument("--datasets", type=int, default=5)
+    parser.add_argument("--history-rows", type=int, default=5000)
+    parser.add_argument("--number", type=int, default=10)
+    args = parser.parse_args()
+
+    payload = build_chart_payload(args.labels, args.datasets)
+    print(f"Chart payload: {args.labels} labels x {args.datasets} datasets, {len(dumps(payload)) / 1024:.0f} KiB")
+    old = bench("pydantic + json (chart)", stdlib_chart_response, payload, args.number)
+    new = bench("orjson (chart)", orjson_chart_response, payload, args.number)
+    print(f"Speedup: {old / new:.1f}x\n")
+
+    history = build_history_frame(args.history_rows)
+    print(f"History data: {args.history_rows} rows")
+    old = bench("convert + json (history)", stdlib_history, history, args.number)
+    new = bench("orjson (history)", orjson_history, history, args.number)
+    print(f"Speedup: {old / new:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Driver DB-API giả lập thay cho Redshift (psycopg2), MySQL (mysql.connector) và ClickHouse (clickhouse_driver)
+khi chạy benchmark: không cần kết nối thật, kết quả được sinh theo câu SQL.
+
+Ví dụ:
+    driver = FakeDriver()
+    driver.route(r"FROM datasets", ["database", "table_name", "schema_name", "profile"], [("dev", "t", "public", None)])
+    driver.route(r"GROUP BY", columns, rows)
+    with installed(driver):
+        ChartQueryModel.build_and_execute_query(query_data, {})
+"""
+import re
+import time
+from contextlib import contextmanager
+from typing import Callable, List, Optional, Sequence, Tuple, Union
+from unittest import mock
+
+Result = Tuple[Sequence[str], Sequence[tuple]]
+Handler = Union[Result, Callable[[str, Optional[Sequence]], Result]]
+
+class FakeDriver:
+    """Tập các route (regex trên câu SQL -> kết quả); route khớp đầu tiên được dùng, không khớp thì trả về rỗng"""
+    def __init__(self, latency: float = 0.0):
+        # Độ trễ mô phỏng mỗi lần execute (giây), 0 để chỉ đo phần xử lý phía Python
+        self.latency = latency
+        self.routes: List[Tuple[re.Pattern, Handler]] = []
+        self.executed = 0
+
+    def route(self, pattern: str, columns_or_handler, rows: Optional[Sequence[tuple]] = None):
+        handler = columns_or_handler if callable(columns_or_handler) else (list(columns_or_handler), rows or [])
+        self.routes.append((re.compile(pattern, re.IGNORECASE | re.DOTALL), handler))
+        return self
+
+    def resolve(self, sql: str, params: Optional[Sequence] = None) -> Result:
+        self.executed += 1
+        if self.latency:
+            time.sleep(self.latency)
+        for pattern, handler in self.routes:
+            if pattern.search(sql):
+                return handler(sql, params) if callable(handler) else handler
+        return [], []
+
+    def connect(self, *args, **kwargs) -> "FakeConnection":
+        return FakeConnection(self, dictionary=kwargs.get("cursor_factory") is not None)
+
+class FakeCursor:
+    def __init__(self, driver: FakeDriver, dictionary: bool = False, name: Optional[str] = None):
+        self.driver = driver
+        self.dictionary = dictionary
+        self.name = name
+        self.arraysize = 1
+        self.itersize = 2000
+        self.description = None
+        self.rowcount = -1
+        self.lastrowid = None
+        self._rows: Sequence[tuple] = []
+        self._position = 0
+
+    def execute(self, sql: str, params: Optional[Sequence] = None):
+        columns, rows = self.driver.resolve(sql, params)
+        self.description = [(column, None, None, None, None, None, None) for column in columns] or None
+        self._rows = rows
+        self._position = 0
+        self.rowcount = len(rows)
+
+    def executemany(self, sql: str, seq_of_params: Sequence[Sequence]):
+        for params in seq_of_params:
+            self.execute(sql, params)
+
+    def _convert(self, rows: Sequence[tuple]) -> List:
+        if not self.dictionary:
+            return list(rows)
+        columns = [column[0] for column in self.description or []]
+        return [dict(zip(columns, row)) for row in rows]
+
+    def fetchone(self):
+        if self._position >= len(self._rows):
+            return None
+        self._position += 1
+        return self._convert(self._rows[self._position - 1:self._position])[0]
+
+    def fetchmany(self, size: Optional[int] = None):
+        size = size or self.arraysize
+        batch = self._rows[self._position:self._position + size]
+        self._position += len(batch)
+        return self._convert(batch)
+
+    def fetchall(self):
+        batch = self._rows[self._position:]
+        self._position = len(self._rows)
+        return self._convert(batch)
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class FakeConnection:
+    closed = 0
+    autocommit = True
+    in_transaction = False
+    connected = True
+
+    def __init__(self, driver: FakeDriver, dictionary: bool = False):
+        self.driver = driver
+        self.dictionary = dictionary
+
+    def cursor(self, dictionary: bool = False, cursor_factory=None, name: Optional[str] = None, **kwargs) -> FakeCursor:
+        return FakeCursor(self.driver, dictionary or cursor_factory is not None or self.dictionary, name)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def cancel(self):
+        pass
+
+    def ping(self, reconnect: bool = False):
+        pass
+
+    def force_connect(self):
+        pass
+
+    def is_connected(self) -> bool:
+        return not self.closed
+
+    def close(self):
+        self.closed = 1
+
+class _ProfileInfo:
+    def __init__(self, rows: int):
+        self.rows = rows
+        self.bytes = 0
+
+class _LastQuery:
+    def __init__(self, rows: int):
+        self.profile_info = _ProfileInfo(rows)
+
+class FakeClickHouseClient:
+    """Giả lập clickhouse_driver.Client.execute(..., with_column_types=True)"""
+    def __init__(self, driver: FakeDriver, *args, **kwargs):
+        self.driver = driver
+        self.connection = FakeConnection(driver)
+        self.last_query = None
+
+    def execute(self, sql: str, params=None, with_column_types: bool = False, **kwargs):
+        columns, rows = self.driver.resolve(sql, params)
+        self.last_query = _LastQuery(len(rows))
+        if with_column_types:
+            return list(rows), [(column, "String") for column in columns]
+        return list(rows)
+
+    def disconnect(self):
+        pass
+
+@contextmanager
+def installed(driver: FakeDriver):
+    """
+    Thay psycopg2.connect, mysql.connector.connect và ClickHouse Client bằng driver giả lập trong khối with.
+    Pool connection của app được làm rỗng khi vào và ra khỏi khối with để không dùng lại connection của driver khác.
+    """
+    import clickhouse_driver
+    import mysql.connector
+    import psycopg2
+    from app.utils.database import all_pools
+    with mock.patch.object(psycopg2, "connect", driver.connect), \
+            mock.patch.object(mysql.connector, "connect", driver.connect), \
+            mock.patch.object(clickhouse_driver, "Client", lambda *args, **kwargs: FakeClickHouseClient(driver)):
+        for pool in all_pools():
+            pool.close_all()
+        try:
+            yield driver
+        finally:
+            for pool in all_pools():
+                pool.close_all()
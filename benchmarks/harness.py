@@ -0,0 +1,119 @@
+"""
+Khung đo cho benchmark suite: latency từng lần gọi (p50/p95), throughput, bộ nhớ cấp phát (tracemalloc)
+và so sánh với baseline đã lưu trong benchmarks/baselines.json.
+"""
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+BASELINE_PATH = Path(__file__).with_name("baselines.json")
+
+class BenchCase:
+    """
+    Một trường hợp benchmark. setup() chạy một lần và trả về đối số cho func;
+    items là số phần tử (dòng, label, ...) mỗi lần gọi, dùng để tính throughput theo phần tử.
+    """
+    def __init__(self, name: str, func: Callable[[Any], Any], setup: Optional[Callable[[], Any]] = None,
+                 items: int = 1, context: Optional[Callable[[], Any]] = None):
+        self.name = name
+        self.func = func
+        self.setup = setup
+        self.items = items
+        # Context manager bao quanh cả setup và phần đo (ví dụ cài driver DB giả lập)
+        self.context = context
+
+def _percentile(sorted_values: List[float], quantile: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, int(round(quantile * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+def measure(case: BenchCase, min_time: float = 0.5, max_runs: int = 10000) -> Dict:
+    """Chạy case cho đến khi đủ min_time giây (ít nhất 5 lần), trả về thống kê latency/throughput/bộ nhớ"""
+    if case.context:
+        with case.context():
+            return _measure(case, min_time, max_runs)
+    return _measure(case, min_time, max_runs)
+
+def _measure(case: BenchCase, min_time: float, max_runs: int) -> Dict:
+    arg = case.setup() if case.setup else None
+    case.func(arg)  # warm-up: cache import, regex, ...
+
+    durations = []
+    deadline = time.perf_counter() + min_time
+    while len(durations) < 5 or (time.perf_counter() < deadline and len(durations) < max_runs):
+        start = time.perf_counter()
+        case.func(arg)
+        durations.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        case.func(arg)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    durations.sort()
+    p50 = _percentile(durations, 0.5)
+    return {
+        "runs": len(durations),
+        "mean_ms": statistics.fmean(durations) * 1000,
+        "p50_ms": p50 * 1000,
+        "p95_ms": _percentile(durations, 0.95) * 1000,
+        "ops_per_sec": 1 / p50 if p50 else float("inf"),
+        "items_per_sec": case.items / p50 if p50 else float("inf"),
+        "peak_alloc_kib": peak / 1024
+    }
+
+def format_row(name: str, result: Dict, baseline: Optional[Dict] = None) -> str:
+    row = (
+        f"{name:<52} {result['p50_ms']:10.3f} {result['p95_ms']:10.3f} "
+        f"{result['items_per_sec']:14,.0f} {result['peak_alloc_kib']:12,.0f}"
+    )
+    if baseline:
+        row += f" {result['p50_ms'] / baseline['p50_ms']:8.2f}x"
+    return row
+
+def header(with_baseline: bool = False) -> str:
+    row = f"{'benchmark':<52} {'p50 ms':>10} {'p95 ms':>10} {'items/s':>14} {'peak KiB':>12}"
+    return row + (f" {'vs base':>9}" if with_baseline else "")
+
+def load_baselines(path: Path = BASELINE_PATH) -> Dict[str, Dict]:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text())["results"]
+
+def save_baselines(results: Dict[str, Dict], path: Path = BASELINE_PATH, merge: bool = True):
+    """Lưu kết quả làm baseline (giữ baseline của các case không chạy lần này khi merge=True)"""
+    stored = load_baselines(path) if merge else {}
+    stored.update({
+        name: {key: round(value, 4) for key, value in result.items() if key in ("p50_ms", "p95_ms", "peak_alloc_kib")}
+        for name, result in results.items()
+    })
+    path.write_text(json.dumps({
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "machine": platform.machine()
+        },
+        "results": dict(sorted(stored.items()))
+    }, indent=2) + "\n")
+
+def find_regressions(results: Dict[str, Dict], baselines: Dict[str, Dict], tolerance: float) -> List[str]:
+    """Các case có p50 chậm hơn baseline quá tolerance (0.3 = 30%) hoặc peak alloc tăng quá tolerance"""
+    regressions = []
+    for name, result in results.items():
+        baseline = baselines.get(name)
+        if not baseline:
+            continue
+        if result["p50_ms"] > baseline["p50_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p50 {baseline['p50_ms']:.3f} -> {result['p50_ms']:.3f} ms")
+        # Bỏ qua chênh lệch nhỏ (< 64 KiB) do tracemalloc và cache nội bộ của thư viện
+        if result["peak_alloc_kib"] > baseline["peak_alloc_kib"] * (1 + tolerance) + 64:
+            regressions.append(f"{name}: peak alloc {baseline['peak_alloc_kib']:.0f} -> {result['peak_alloc_kib']:.0f} KiB")
+    return regressions
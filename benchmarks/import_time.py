@@ -0,0 +1,72 @@
+"""
+Kiểm tra thời gian import app.main (cold start của worker) so với ngân sách, và các thư viện nặng
+chỉ cần cho chat (pandas, sklearn, plotly, SDK LLM, clickhouse_driver) không bị import lúc khởi động.
+Mỗi lần đo chạy trong một process mới; lấy lần nhanh nhất để giảm nhiễu. Thoát với mã 1 nếu vượt ngân sách.
+
+    python -m benchmarks.import_time --budget 1.5 --runs 3 --top 15
+"""
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Module không được import khi khởi động (được import khi dùng lần đầu)
+LAZY_MODULES = ["pandas", "sklearn", "scipy", "plotly", "google.generativeai", "openai", "clickhouse_driver"]
+
+MEASURE_CODE = """
+import json, sys, time
+start = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - start
+print(json.dumps({"elapsed": elapsed, "loaded": [name for name in %r if name in sys.modules]}))
+"""
+
+def measure_once() -> Dict:
+    output = subprocess.run(
+        [sys.executable, "-c", MEASURE_CODE % (LAZY_MODULES,)], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def top_imports(limit: int) -> List[Tuple[str, float]]:
+    """Các module có thời gian import cộng dồn lớn nhất (python -X importtime), đơn vị giây"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stderr
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        entries.append((name.rstrip(), int(cumulative) / 1e6))
+    return sorted(entries, key=lambda entry: -entry[1])[:limit]
+
+def main():
+    parser = argparse.ArgumentParser(description="Kiểm tra ngân sách thời gian import của app.main")
+    parser.add_argument("--budget", type=float, default=1.5, help="Thời gian import tối đa (giây)")
+    parser.add_argument("--runs", type=int, default=3, help="Số lần đo (mỗi lần một process mới)")
+    parser.add_argument("--top", type=int, default=0, help="In N module import chậm nhất")
+    args = parser.parse_args()
+
+    results = [measure_once() for _ in range(args.runs)]
+    elapsed = min(result["elapsed"] for result in results)
+    loaded = sorted({name for result in results for name in result["loaded"]})
+    print(f"import app.main: {elapsed:.3f}s (best of {args.runs}, budget {args.budget:.3f}s)")
+    if args.top:
+        for name, seconds in top_imports(args.top):
+            print(f"  {seconds:8.3f}s  {name}")
+
+    failures = []
+    if elapsed > args.budget:
+        failures.append(f"import time {elapsed:.3f}s exceeds budget {args.budget:.3f}s")
+    if loaded:
+        failures.append(f"modules imported at startup that should be lazy: {', '.join(loaded)}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Chạy toàn bộ benchmark suite và so sánh với baseline.
+
+Chạy từ thư mục gốc của repo:
+    python -m benchmarks.run                     # chạy và in kết quả
+    python -m benchmarks.run --compare           # so với benchmarks/baselines.json, exit 1 nếu chậm hơn quá --tolerance
+    python -m benchmarks.run --save-baseline     # ghi kết quả làm baseline mới (không ghi nếu có case lỗi)
+    python -m benchmarks.run --quick --filter chart_query
+
+Case lỗi luôn làm lệnh exit 1.
+Baseline phụ thuộc máy chạy: chỉ so sánh kết quả đo trên cùng một máy (xem "meta" trong baselines.json),
+hoặc lưu lại baseline trước khi thay đổi code rồi chạy --compare sau khi thay đổi.
+"""
+import argparse
+import logging
+import sys
+import warnings
+from benchmarks import bench_chart_query, bench_chat, bench_history, bench_serialization
+from benchmarks.harness import find_regressions, format_row, header, load_baselines, measure, save_baselines
+
+SUITES = [bench_chart_query, bench_chat, bench_history, bench_serialization]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark suite của business-intelligence-service")
+    parser.add_argument("--quick", action="store_true", help="Giảm kích thước dữ liệu 10 lần")
+    parser.add_argument("--filter", default="", help="Chỉ chạy các case có tên chứa chuỗi này")
+    parser.add_argument("--min-time", type=float, default=0.5, help="Thời gian đo tối thiểu mỗi case (giây)")
+    parser.add_argument("--compare", action="store_true", help="So sánh với baseline đã lưu")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="Mức chậm hơn baseline cho phép khi --compare (0.3 = 30%%)")
+    parser.add_argument("--save-baseline", action="store_true", help="Lưu kết quả làm baseline")
+    args = parser.parse_args()
+
+    # Log và warning của app/pandas (SQL sinh ra, slow query, parse datetime...) làm nhiễu kết quả
+    logging.disable(logging.WARNING)
+    warnings.simplefilter("ignore")
+    baselines = load_baselines() if args.compare else {}
+    results, errors = {}, []
+    print(header(with_baseline=args.compare))
+    for suite in SUITES:
+        for case in suite.cases(args.quick):
+            if args.filter not in case.name:
+                continue
+            try:
+                result = measure(case, args.min_time)
+            except Exception as e:
+                errors.append(case.name)
+                print(f"{case.name:<52} error: {type(e).__name__}: {e}")
+                continue
+            results[case.name] = result
+            print(format_row(case.name, result, baselines.get(case.name)))
+
+    if errors:
+        print(f"\n{len(errors)} case(s) failed: {', '.join(errors)}")
+    if args.save_baseline:
+        # Không lưu baseline khi có case lỗi: baseline sẽ thiếu case hoặc đo nhầm đường lỗi
+        if errors:
+            print("Baselines not saved because some cases failed")
+        else:
+            save_baselines(results)
+            print(f"\nSaved {len(results)} baselines")
+    regressions = []
+    if args.compare:
+        regressions = find_regressions(results, baselines, args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+        elif not errors:
+            print("\nNo regressions")
+    sys.exit(1 if errors or regressions else 0)
+
+if __name__ == "__main__":
+    main()
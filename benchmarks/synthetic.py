@@ -0,0 +1,96 @@
+"""
+Dữ liệu tổng hợp cho benchmark: kết quả chart query theo hình dạng (rows x labels x dimensions x value fields)
+và DataFrame giống kết quả chat query.
+"""
+import random
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from benchmarks.fake_dbapi import FakeDriver
+
+class Shape:
+    """
+    Hình dạng kết quả chart query: rows dòng, labels cột label, dimensions giá trị phân biệt của
+    dimension field (0 = không có dimension), values value field.
+    """
+    def __init__(self, rows: int, labels: int = 1, dimensions: int = 0, values: int = 1):
+        self.rows = rows
+        self.labels = labels
+        self.dimensions = dimensions
+        self.values = values
+
+    @property
+    def name(self) -> str:
+        return f"{self.rows}r_{self.labels}l_{self.dimensions}d_{self.values}v"
+
+    def scaled(self, factor: float) -> "Shape":
+        return Shape(max(1, int(self.rows * factor)), self.labels, self.dimensions, self.values)
+
+# Các hình dạng mặc định: chart nhỏ, chart nhiều label, pivot theo dimension, nhiều value field, kết quả lớn
+DEFAULT_SHAPES = [
+    Shape(1000),
+    Shape(10000, labels=2),
+    Shape(10000, labels=1, dimensions=20),
+    Shape(10000, labels=1, values=4),
+    Shape(100000),
+]
+
+def query_data_for(shape: Shape, dataset_id: int = 1) -> Dict:
+    """query_data của chart tương ứng với shape (cột value_col_i được SUM)"""
+    return {
+        "dataset_id": dataset_id,
+        "chart_type": "bar",
+        "label_fields": [f"label_{i}" for i in range(shape.labels)],
+        "value_fields": [f"SUM(value_col_{i})" for i in range(shape.values)],
+        "dimension_field": "dimension" if shape.dimensions else None,
+        "filters": {},
+        "limit": None,
+        "sort_order": None
+    }
+
+def chart_result(shape: Shape, seed: int = 42) -> Tuple[List[str], List[tuple]]:
+    """
+    Kết quả Redshift của chart query theo thứ tự cột của ChartQueryModel: labels, dimension, value_0..n.
+    Giá trị là Decimal như SUM trên cột NUMERIC của Redshift.
+    """
+    rng = random.Random(seed)
+    columns = [f"label_{i}" for i in range(shape.labels)]
+    if shape.dimensions:
+        columns.append("dimension")
+    columns += [f"value_{i}" for i in range(shape.values)]
+
+    start = datetime(2024, 1, 1)
+    rows = []
+    for n in range(shape.rows):
+        if shape.dimensions:
+            group, dimension = divmod(n, shape.dimensions)
+        else:
+            group, dimension = n, None
+        labels = [(start + timedelta(hours=group)).isoformat()] + [f"segment_{i}_{group % 97}" for i in range(1, shape.labels)]
+        row = labels + ([f"partner_{dimension}"] if shape.dimensions else [])
+        row += [Decimal(rng.randint(0, 10_000_000)) / 100 for _ in range(shape.values)]
+        rows.append(tuple(row))
+    return columns, rows
+
+def chart_driver(shape: Shape, latency: float = 0.0, profile: Optional[str] = None) -> FakeDriver:
+    """FakeDriver trả lời các query của ChartQueryModel (dataset, rollup, EXPLAIN, query chính) cho shape"""
+    columns, rows = chart_result(shape)
+    driver = FakeDriver(latency)
+    driver.route(r"FROM datasets", ["database", "table_name", "schema_name", "profile"], [("dev", "transactions", "public", profile)])
+    driver.route(r"FROM dataset_rollups", ["id", "dataset_id", "name", "grain_columns", "measures", "time_column",
+                                           "owner", "row_count", "watermark", "refreshed_at", "created_at"], [])
+    driver.route(r"^\s*EXPLAIN", ["QUERY PLAN"], [(f"XN HashAggregate  (cost=1000.00..2000.00 rows={shape.rows} width=32)",)])
+    driver.route(r"GROUP BY", columns, rows)
+    return driver
+
+def chat_frame(rows: int, seed: int = 42) -> pd.DataFrame:
+    """DataFrame giống kết quả chat query trên ClickHouse: cột thời gian, số thực, số nguyên và chuỗi"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "created_at": pd.date_range("2024-01-01", periods=rows, freq="h"),
+        "amount": rng.random(rows) * 1000,
+        "transactions": rng.integers(0, 1000, rows, dtype=np.int64),
+        "partner": [f"partner_{i % 50}" for i in range(rows)],
+    })
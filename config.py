@@ -1,5 +1,6 @@
 # config.py
 from dotenv import load_dotenv
+import json
 import os
 
 # Load file .env
@@ -58,8 +59,108 @@ GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 
 MAX_ATTEMPTS =  int(os.getenv('MAX_ATTEMPTS', 5)) # Giới hạn số lần đăng nhập sai
 LOCKOUT_TIME = int(os.getenv('LOCKOUT_TIME', 300)) # Thời gian khoá nếu đăng nhập thất bại
+LOGIN_HASH_WORKERS = int(os.getenv('LOGIN_HASH_WORKERS', 2)) # Số thread kiểm tra mật khẩu bcrypt
+LOGIN_MAX_PENDING = int(os.getenv('LOGIN_MAX_PENDING', 64)) # Số lượt đăng nhập tối đa chờ kiểm tra mật khẩu trước khi trả về 503
+LOGIN_HASH_CACHE_SIZE = int(os.getenv('LOGIN_HASH_CACHE_SIZE', 10000)) # Số password hash tối đa cache trong process
+LOGIN_HASH_CACHE_TTL = int(os.getenv('LOGIN_HASH_CACHE_TTL', 60)) # Thời gian cache password hash (giây)
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 10000)) # Số JWT đã xác thực tối đa cache trong process
+TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', 300)) # Thời gian cache JWT đã xác thực (giây), không vượt quá thời điểm hết hạn của token
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 10000)) # Số user tối đa được cache role
+USER_ROLE_CACHE_TTL = int(os.getenv('USER_ROLE_CACHE_TTL', 30)) # Thời gian cache role và bảng được phép của user (giây)
 
 BI_FRONTEND_URL = os.environ.get("BI_FRONTEND_URL", "http://localhost:3000")
+SSO_POOL_SIZE = int(os.getenv('SSO_POOL_SIZE', 20)) # Số kết nối keep-alive tối đa tới SSO
+SSO_RETRIES = int(os.getenv('SSO_RETRIES', 2)) # Số lần thử lại khi lỗi kết nối hoặc SSO trả về 502/503/504
+SSO_CONNECT_TIMEOUT = float(os.getenv('SSO_CONNECT_TIMEOUT', 3)) # Timeout kết nối tới SSO (giây)
+SSO_READ_TIMEOUT = float(os.getenv('SSO_READ_TIMEOUT', 10)) # Timeout chờ SSO trả lời (giây)
+SSO_USER_CACHE_SIZE = int(os.getenv('SSO_USER_CACHE_SIZE', 10000)) # Số access token SSO tối đa cache thông tin user
+SSO_USER_CACHE_TTL = int(os.getenv('SSO_USER_CACHE_TTL', 60)) # Thời gian cache thông tin user đã xác thực qua SSO (giây)
 
+# Cache kết quả chart
+CHART_CACHE_TTL = int(os.getenv('CHART_CACHE_TTL', 900)) # Kết quả cũ hơn thời gian này (giây) sẽ được tính lại
+CHART_CACHE_MAX_STALE = int(os.getenv('CHART_CACHE_MAX_STALE', 86400)) # Thời gian giữ kết quả trong Redis để phục vụ stale-while-revalidate (giây)
+CHART_REFRESH_LOCK_TIME = int(os.getenv('CHART_REFRESH_LOCK_TIME', 120)) # Thời gian khoá refresh nền cho một chart (giây)
+INCREMENTAL_WINDOW_SECONDS = int(os.getenv('INCREMENTAL_WINDOW_SECONDS', 172800)) # Cửa sổ thời gian mặc định được query lại khi refresh incremental (giây)
+INCREMENTAL_FULL_REFRESH_INTERVAL = int(os.getenv('INCREMENTAL_FULL_REFRESH_INTERVAL', 86400)) # Chu kỳ tính lại toàn bộ chart incremental để lấy dữ liệu đến muộn (giây)
 
-    
+# HTTP cache cho các API metadata (schema, bảng, cột)
+METADATA_CACHE_MAX_AGE = int(os.getenv('METADATA_CACHE_MAX_AGE', 300)) # Thời gian client được dùng lại response metadata (giây)
+
+# Nén response (gzip, br/zstd nếu đã cài brotli/zstandard)
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024)) # Response nhỏ hơn kích thước này (bytes) không được nén
+
+# Catalog Redshift (schema, bảng, cột) cache trong Redis và trong process
+CATALOG_REFRESH_INTERVAL = int(os.getenv('CATALOG_REFRESH_INTERVAL', 3600)) # Chu kỳ làm mới catalog (giây)
+
+# Profile cột của dataset (số giá trị distinct, tỉ lệ null, min/max, top values)
+DATASET_PROFILE_INTERVAL = int(os.getenv('DATASET_PROFILE_INTERVAL', 3600)) # Chu kỳ kiểm tra dataset cần profile lại (giây)
+DATASET_PROFILE_MAX_AGE = int(os.getenv('DATASET_PROFILE_MAX_AGE', 86400)) # Profile cũ hơn thời gian này (giây) sẽ được tính lại
+PROFILE_SAMPLE_ROWS = int(os.getenv('PROFILE_SAMPLE_ROWS', 1000000)) # Số dòng lấy mẫu khi tính top values
+PROFILE_TOP_VALUES = int(os.getenv('PROFILE_TOP_VALUES', 10)) # Số top values lưu cho mỗi cột
+PROFILE_TOP_VALUES_MAX_DISTINCT = int(os.getenv('PROFILE_TOP_VALUES_MAX_DISTINCT', 1000)) # Chỉ tính top values cho cột có ít giá trị distinct hơn
+QUERY_MAX_GROUPS = int(os.getenv('QUERY_MAX_GROUPS', 100000)) # Số nhóm ước lượng tối đa của chart query trước khi tự giới hạn
+QUERY_AUTO_LIMIT = int(os.getenv('QUERY_AUTO_LIMIT', 1000)) # LIMIT tự động áp dụng cho query có quá nhiều nhóm
+QUERY_FUSION_MAX_GROUPS = int(os.getenv('QUERY_FUSION_MAX_GROUPS', 10000)) # Số nhóm ước lượng tối đa để gộp query của các chart có sort/limit khác nhau
+DIMENSION_MAX_DISTINCT = int(os.getenv('DIMENSION_MAX_DISTINCT', 50)) # Cảnh báo khi dimension_field có nhiều giá trị hơn
+
+# Ước lượng chi phí (EXPLAIN) và giới hạn query đồng thời lên warehouse
+# Cost lấy từ node đầu tiên dưới các node leader (Limit/Merge/Sort); Seq Scan của Redshift tính khoảng 0.01 mỗi dòng
+QUERY_COST_CONFIRM_THRESHOLD = float(os.getenv('QUERY_COST_CONFIRM_THRESHOLD', 1e7)) # Query ad-hoc có cost lớn hơn (~1 tỷ dòng quét) phải gửi confirm_expensive
+QUERY_COST_MAX = float(os.getenv('QUERY_COST_MAX', 1e9)) # Query có cost lớn hơn (~100 tỷ dòng quét) luôn bị từ chối
+EXPLAIN_CACHE_TTL = int(os.getenv('EXPLAIN_CACHE_TTL', 600)) # Thời gian cache kết quả EXPLAIN theo câu query (giây)
+EXPLAIN_CACHE_SIZE = int(os.getenv('EXPLAIN_CACHE_SIZE', 1000)) # Số câu query tối đa giữ kết quả EXPLAIN
+QUERY_MAX_CONCURRENCY = int(os.getenv('QUERY_MAX_CONCURRENCY', 8)) # Số query chạy đồng thời tối đa mỗi process
+QUERY_USER_CONCURRENCY = int(os.getenv('QUERY_USER_CONCURRENCY', 2)) # Số query đồng thời tối đa của một user
+QUERY_ROLE_CONCURRENCY = json.loads(os.getenv('QUERY_ROLE_CONCURRENCY', '{"superadmin": 8}')) # Giới hạn theo role, ví dụ {"analyst": 4}
+QUERY_DEFAULT_ROLE_CONCURRENCY = int(os.getenv('QUERY_DEFAULT_ROLE_CONCURRENCY', 6)) # Giới hạn cho role không có trong QUERY_ROLE_CONCURRENCY
+QUERY_QUEUE_TIMEOUT = float(os.getenv('QUERY_QUEUE_TIMEOUT', 30)) # Thời gian chờ tối đa trong hàng đợi trước khi trả về 503 (giây)
+QUERY_STATEMENT_TIMEOUT = int(os.getenv('QUERY_STATEMENT_TIMEOUT', 120)) # Thời gian chạy tối đa của một query Redshift/ClickHouse (giây)
+DISCONNECT_POLL_INTERVAL = float(os.getenv('DISCONNECT_POLL_INTERVAL', 0.5)) # Chu kỳ kiểm tra client ngắt kết nối khi đang chạy query (giây)
+QUERY_FETCH_BATCH_SIZE = int(os.getenv('QUERY_FETCH_BATCH_SIZE', 5000)) # Số dòng mỗi lần FETCH từ server-side cursor của Redshift
+
+# Autocomplete giá trị filter
+FILTER_VALUES_SAMPLE_ROWS = int(os.getenv('FILTER_VALUES_SAMPLE_ROWS', 1000000)) # Số dòng lấy mẫu khi lấy giá trị distinct của cột
+FILTER_VALUES_MAX = int(os.getenv('FILTER_VALUES_MAX', 50000)) # Số giá trị tối đa lưu cho mỗi cột
+FILTER_VALUES_REFRESH_INTERVAL = int(os.getenv('FILTER_VALUES_REFRESH_INTERVAL', 3600)) # Chu kỳ làm mới index giá trị filter (giây)
+
+# Rollup (bảng tổng hợp trước) cho dataset
+ROLLUP_SCHEMA = os.getenv('ROLLUP_SCHEMA', 'bi_rollups') # Schema Redshift chứa các bảng rollup
+ROLLUP_REFRESH_INTERVAL = int(os.getenv('ROLLUP_REFRESH_INTERVAL', 3600)) # Chu kỳ làm mới incremental các rollup (giây)
+ROLLUP_REFRESH_LOCK_TIME = int(os.getenv('ROLLUP_REFRESH_LOCK_TIME', 7200)) # Thời gian giữ lock làm mới một rollup, cần lớn hơn lần full refresh lâu nhất (giây)
+
+# Pre-warm cache cho dashboard
+PREWARM_INTERVAL = int(os.getenv('PREWARM_INTERVAL', 600)) # Chu kỳ pre-warm (giây)
+PREWARM_CONCURRENCY = int(os.getenv('PREWARM_CONCURRENCY', 2)) # Số query chạy song song tối đa khi pre-warm
+PREWARM_RECENT_WINDOW = int(os.getenv('PREWARM_RECENT_WINDOW', 86400)) # Dashboard được xem trong khoảng này (giây) sẽ được pre-warm
+DASHBOARD_QUERY_CONCURRENCY = int(os.getenv('DASHBOARD_QUERY_CONCURRENCY', 4)) # Số nhóm query chạy song song khi tải dữ liệu một dashboard
+
+# Metrics và tracing
+SERVER_TIMING_ENABLED = os.getenv('SERVER_TIMING_ENABLED', 'false').lower() == 'true' # Gắn header Server-Timing (thời gian từng stage) vào response
+QUERY_SLOW_THRESHOLD = float(os.getenv('QUERY_SLOW_THRESHOLD', 5)) # Query warehouse chạy lâu hơn sẽ được ghi vào slow query log (giây)
+QUERY_STATS_FLUSH_INTERVAL = int(os.getenv('QUERY_STATS_FLUSH_INTERVAL', 60)) # Chu kỳ ghi thống kê query fingerprint vào MySQL (giây)
+QUERY_STATS_MAX_KEYS = int(os.getenv('QUERY_STATS_MAX_KEYS', 5000)) # Số nhóm thống kê tối đa giữ trong process giữa hai lần flush
+QUERY_STATS_RETENTION_HOURS = int(os.getenv('QUERY_STATS_RETENTION_HOURS', 24 * 30)) # Thống kê query cũ hơn sẽ bị xoá khỏi bảng query_stats (giờ)
+
+# Sampling profiler cho request production (opt-in)
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true' # Bật middleware profile request
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0.01)) # Tỷ lệ request được profile ngẫu nhiên (0.01 = 1%)
+PROFILING_HEADER_TOKEN = os.getenv('PROFILING_HEADER_TOKEN', '') # Request có header X-Profile-Request bằng giá trị này luôn được profile (rỗng = tắt)
+PROFILING_USERS = [user for user in os.getenv('PROFILING_USERS', '').split(',') if user] # Danh sách username (phân cách bởi dấu phẩy) luôn được profile
+PROFILING_INTERVAL = float(os.getenv('PROFILING_INTERVAL', 0.005)) # Chu kỳ lấy mẫu stack (giây)
+PROFILING_MAX_CONCURRENT = int(os.getenv('PROFILING_MAX_CONCURRENT', 1)) # Số request được profile cùng lúc tối đa mỗi process
+PROFILING_MAX_PER_ROUTE = int(os.getenv('PROFILING_MAX_PER_ROUTE', 20)) # Số profile gần nhất giữ lại cho mỗi route
+PROFILING_RETENTION = int(os.getenv('PROFILING_RETENTION', 86400)) # Thời gian giữ profile trong Redis (giây)
+
+# Pool connection và warm-up khi khởi động
+MYSQL_POOL_MIN_SIZE = int(os.getenv('MYSQL_POOL_MIN_SIZE', 4)) # Số connection MySQL tạo sẵn khi khởi động
+MYSQL_POOL_MAX_IDLE = int(os.getenv('MYSQL_POOL_MAX_IDLE', 16)) # Số connection MySQL rảnh tối đa giữ lại
+REDSHIFT_POOL_MIN_SIZE = int(os.getenv('REDSHIFT_POOL_MIN_SIZE', 2)) # Số connection Redshift tạo sẵn khi khởi động
+REDSHIFT_POOL_MAX_IDLE = int(os.getenv('REDSHIFT_POOL_MAX_IDLE', 8)) # Số connection Redshift rảnh tối đa giữ lại
+CLICKHOUSE_POOL_MIN_SIZE = int(os.getenv('CLICKHOUSE_POOL_MIN_SIZE', 1)) # Số client ClickHouse tạo sẵn khi khởi động
+CLICKHOUSE_POOL_MAX_IDLE = int(os.getenv('CLICKHOUSE_POOL_MAX_IDLE', 4)) # Số client ClickHouse rảnh tối đa giữ lại
+REDIS_POOL_MIN_SIZE = int(os.getenv('REDIS_POOL_MIN_SIZE', 4)) # Số connection Redis mở sẵn khi khởi động
+POOL_IDLE_TIMEOUT = int(os.getenv('POOL_IDLE_TIMEOUT', 300)) # Connection rảnh lâu hơn sẽ bị đóng (giây), nhỏ hơn wait_timeout của server
+POOL_VALIDATE_AFTER = int(os.getenv('POOL_VALIDATE_AFTER', 30)) # Connection rảnh lâu hơn được ping trước khi dùng lại (giây)
+POOL_MAINTENANCE_INTERVAL = int(os.getenv('POOL_MAINTENANCE_INTERVAL', 60)) # Chu kỳ đóng connection hết hạn và bổ sung pool tới min size (giây)
+READINESS_REQUIRED = [name for name in os.getenv('READINESS_REQUIRED', 'mysql,redis').split(',') if name] # Backend phải kết nối được thì worker mới ready
+READINESS_CHECK_TTL = float(os.getenv('READINESS_CHECK_TTL', 5)) # Kết quả kiểm tra backend cho readiness probe được dùng lại trong khoảng này (giây)
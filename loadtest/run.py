@@ -0,0 +1,130 @@
+"""
+Load test cho BI service: chạy người dùng ảo theo kịch bản rồi báo cáo throughput và tail latency theo endpoint.
+
+    # Tự khởi động server trên backend giả lập (SQLite, fakeredis, stub LLM, SSO giả lập)
+    python -m loadtest.run --spawn --users 50 --duration 120 --mix dashboard_open=6,chart_query=3,chat=1,sso_login=1
+    # Hoặc chạy vào một server đã có (ví dụ staging)
+    python -m loadtest.run --url http://localhost:8000 --users 20 --duration 60
+"""
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+import httpx
+from loadtest.scenarios import Recorder, parse_mix, run_load
+
+def _percentile(sorted_values: List[float], quantile: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, int(round(quantile * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+def summarize(recorder: Recorder) -> Dict:
+    """Thống kê theo endpoint: số request, lỗi, status, rps và p50/p90/p95/p99/max (ms)"""
+    elapsed = (recorder.finished_at or time.perf_counter()) - recorder.started_at
+    endpoints = {}
+    for endpoint, durations in sorted(recorder.latencies.items()):
+        durations = sorted(durations)
+        endpoints[endpoint] = {
+            "count": len(durations),
+            "errors": recorder.errors.get(endpoint, 0),
+            "statuses": recorder.statuses.get(endpoint, {}),
+            "rps": len(durations) / elapsed if elapsed else 0.0,
+            **{f"p{int(q * 100)}_ms": _percentile(durations, q) * 1000 for q in (0.5, 0.9, 0.95, 0.99)},
+            "max_ms": durations[-1] * 1000
+        }
+    total = sum(item["count"] for item in endpoints.values())
+    return {
+        "elapsed_s": elapsed,
+        "requests": total,
+        "errors": sum(item["errors"] for item in endpoints.values()),
+        "rps": total / elapsed if elapsed else 0.0,
+        "endpoints": endpoints
+    }
+
+def format_report(summary: Dict) -> str:
+    lines = [
+        f"{'endpoint':<42} {'count':>7} {'err':>5} {'rps':>8} {'p50':>9} {'p90':>9} {'p95':>9} {'p99':>9} {'max':>9}  status"
+    ]
+    for endpoint, item in summary["endpoints"].items():
+        statuses = " ".join(f"{status}:{count}" for status, count in sorted(item["statuses"].items()))
+        lines.append(
+            f"{endpoint:<42} {item['count']:>7} {item['errors']:>5} {item['rps']:>8.2f} "
+            f"{item['p50_ms']:>9.1f} {item['p90_ms']:>9.1f} {item['p95_ms']:>9.1f} {item['p99_ms']:>9.1f} {item['max_ms']:>9.1f}  {statuses}"
+        )
+    lines.append(
+        f"total: {summary['requests']} requests, {summary['errors']} errors, "
+        f"{summary['rps']:.2f} req/s in {summary['elapsed_s']:.1f}s (latency in ms)"
+    )
+    # Endpoint lỗi toàn bộ: latency đo được là của đường lỗi, không dùng được làm số liệu hiệu năng
+    failed = [endpoint for endpoint, item in summary["endpoints"].items() if item["count"] and item["errors"] == item["count"]]
+    for endpoint in failed:
+        lines.append(f"WARNING: every request to {endpoint} failed; its latency is error-path latency")
+    return "\n".join(lines)
+
+def wait_until_ready(url: str, process: Optional[subprocess.Popen], timeout: float = 120.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            # /health/ready trả về 200 khi worker đã warm-up xong pool connection
+            if httpx.get(url + "/health/ready", timeout=5).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"Server at {url} not ready after {timeout}s")
+
+def spawn_server(args) -> subprocess.Popen:
+    command = [
+        sys.executable, "-m", "loadtest.server", "--data-dir", args.data_dir, "--port", str(args.port),
+        "--rows", str(args.rows), "--llm-latency", str(args.llm_latency), "--llm-jitter", str(args.llm_jitter),
+        "--warehouse-latency", str(args.warehouse_latency), "--sso-latency", str(args.sso_latency)
+    ]
+    return subprocess.Popen(command)
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test BI service theo kịch bản dashboard/chart/chat")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", help="URL của server đã chạy sẵn")
+    target.add_argument("--spawn", action="store_true", help="Tự khởi động server trên backend giả lập")
+    parser.add_argument("--users", type=int, default=20, help="Số người dùng ảo đồng thời")
+    parser.add_argument("--duration", type=float, default=60, help="Thời gian chạy (giây)")
+    parser.add_argument("--ramp-up", type=float, default=10, help="Thời gian khởi động dần các user (giây)")
+    parser.add_argument("--think-time", type=float, default=1.0, help="Think time trung bình giữa hai kịch bản (giây)")
+    parser.add_argument("--mix", help="Trọng số các kịch bản (mặc định dashboard_open=6,chart_query=3,chat=1, "
+                                      "thêm sso_login=1 khi --spawn vì chỉ server giả lập có SSO giả lập)")
+    parser.add_argument("--user-pool", type=int, default=50, help="Số tài khoản loadtest_* đã seed")
+    parser.add_argument("--json", dest="json_path", help="Ghi kết quả ra file JSON")
+    # Tùy chọn cho --spawn
+    parser.add_argument("--data-dir", default="/tmp/bi-loadtest")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--llm-jitter", type=float, default=0.0)
+    parser.add_argument("--warehouse-latency", type=float, default=0.0)
+    parser.add_argument("--sso-latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix or ("dashboard_open=6,chart_query=3,chat=1" + (",sso_login=1" if args.spawn else "")))
+    process = spawn_server(args) if args.spawn else None
+    url = args.url or f"http://127.0.0.1:{args.port}"
+    try:
+        wait_until_ready(url, process)
+        recorder = asyncio.run(run_load(url, args.users, args.duration, args.ramp_up, mix, args.think_time, args.user_pool))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    summary = summarize(recorder)
+    print(format_report(summary))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"config": {key: value for key, value in vars(args).items() if key != "json_path"}, **summary}, f, indent=2)
+    sys.exit(1 if summary["errors"] else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Kịch bản người dùng ảo cho load test: mỗi user đăng nhập rồi lặp lại các kịch bản theo trọng số
+(mở dashboard, chart query ad-hoc, chat, đăng nhập SSO) với think time giữa các request.
+Latency được ghi theo endpoint (route template) để báo cáo throughput và tail latency.
+"""
+import asyncio
+import random
+import time
+from typing import Callable, Dict, List, Optional
+import httpx
+from loadtest.seed import CHART_TEMPLATES, LOADTEST_PASSWORD
+
+CHAT_QUESTIONS = [
+    "Doanh thu theo trạng thái giao dịch?",
+    "Top 20 đối tác theo doanh thu?",
+    "Doanh thu theo ngày trong 6 tháng qua?",
+    "Số giao dịch theo phương thức thanh toán và trạng thái?",
+    "Tỷ lệ giao dịch thất bại theo ngày?",
+    "Đối tác nào có nhiều giao dịch hoàn tiền nhất?",
+]
+
+class Recorder:
+    """Gom kết quả request theo endpoint: latency (giây), status code và lỗi kết nối"""
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.statuses: Dict[str, Dict[str, int]] = {}
+        self.errors: Dict[str, int] = {}
+        self.started_at = time.perf_counter()
+        self.finished_at: Optional[float] = None
+
+    def record(self, endpoint: str, duration: float, status: str, ok: bool):
+        self.latencies.setdefault(endpoint, []).append(duration)
+        statuses = self.statuses.setdefault(endpoint, {})
+        statuses[status] = statuses.get(status, 0) + 1
+        if not ok:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, username: str, think_time: float, rng: random.Random):
+        self.client = client
+        self.recorder = recorder
+        self.username = username
+        self.think_time = think_time
+        self.rng = rng
+        self.headers: Dict[str, str] = {}
+        self.dashboard_ids: List[int] = []
+        # ETag theo dashboard (kèm filter) để gửi lại If-None-Match như trình duyệt
+        self.etags: Dict[str, str] = {}
+
+    async def request(self, endpoint: str, method: str, url: str, expected=(200,), **kwargs) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers={**self.headers, **kwargs.pop("headers", {})}, **kwargs)
+            # Đọc hết body (kể cả response stream) trước khi tính latency
+            await response.aread()
+        except httpx.HTTPError as e:
+            self.recorder.record(endpoint, time.perf_counter() - start, type(e).__name__, False)
+            return None
+        self.recorder.record(endpoint, time.perf_counter() - start, str(response.status_code), response.status_code in expected)
+        return response
+
+    async def think(self):
+        if self.think_time:
+            await asyncio.sleep(self.rng.expovariate(1 / self.think_time))
+
+    async def login(self) -> bool:
+        response = await self.request("POST /api/auth/login", "POST", "/api/auth/login",
+                                      json={"username": self.username, "password": LOADTEST_PASSWORD})
+        if response is None or response.status_code != 200:
+            return False
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        response = await self.request("GET /api/dashboards/get", "GET", "/api/dashboards/get")
+        if response is not None and response.status_code == 200:
+            self.dashboard_ids = [item["id"] for item in response.json().get("dashboards", [])]
+        return True
+
+    async def dashboard_open(self):
+        """Mở một dashboard: danh sách, chi tiết dashboard rồi dữ liệu của mọi chart (có thể kèm filter ngày)"""
+        await self.request("GET /api/dashboards/get", "GET", "/api/dashboards/get")
+        if not self.dashboard_ids:
+            return
+        dashboard_id = self.rng.choice(self.dashboard_ids)
+        await self.request("GET /api/dashboards/{dashboard_id}", "GET", f"/api/dashboards/{dashboard_id}")
+        params = {}
+        if self.rng.random() < 0.3:
+            day = self.rng.randint(1, 28)
+            params["filters"] = (
+                '{"created_at": {"operator": "between", "value": '
+                f'["2024-02-{day:02d}T00:00:00Z", "2024-03-{day:02d}T00:00:00Z"], "filterType": "custom"}}}}'
+            )
+        key = f"{dashboard_id}:{params.get('filters')}"
+        headers = {"If-None-Match": self.etags[key]} if key in self.etags else {}
+        response = await self.request("GET /api/dashboards/{dashboard_id}/data", "GET", f"/api/dashboards/{dashboard_id}/data",
+                                      expected=(200, 304), params=params, headers=headers)
+        if response is not None and response.headers.get("ETag"):
+            self.etags[key] = response.headers["ETag"]
+
+    async def chart_query(self):
+        """Chart query ad-hoc như khi người dùng chỉnh chart trong editor"""
+        _, label_fields, value_fields, dimension_field, config = self.rng.choice(CHART_TEMPLATES)
+        payload = {
+            "dataset_id": 1, "chart_type": "bar", "label_fields": label_fields, "value_fields": value_fields,
+            "filters": {}, "dimension_field": dimension_field, "limit": config.get("limit"),
+            "sort_order": config.get("sortOrder", "desc")
+        }
+        if self.rng.random() < 0.5:
+            payload["filters"] = {"status": {"operator": "=", "value": self.rng.choice(["success", "failed", "pending"])}}
+        await self.request("POST /api/charts/query", "POST", "/api/charts/query", json=payload)
+
+    async def sso_login(self):
+        """Đăng nhập lại qua SSO (cần SSO giả lập của loadtest.standins: authorization code là username)"""
+        await self.request("GET /api/auth/sso/redirect", "GET", "/api/auth/sso/redirect")
+        response = await self.request("POST /api/auth/sso", "POST", "/api/auth/sso", json={"authorization_code": self.username})
+        if response is not None and response.status_code == 200:
+            self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def chat(self):
+        await self.request("POST /api/chat/query", "POST", "/api/chat/query", json={"question": self.rng.choice(CHAT_QUESTIONS)})
+
+SCENARIOS: Dict[str, Callable[[VirtualUser], object]] = {
+    "dashboard_open": VirtualUser.dashboard_open,
+    "chart_query": VirtualUser.chart_query,
+    "chat": VirtualUser.chat,
+    "sso_login": VirtualUser.sso_login,
+}
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """'dashboard_open=6,chart_query=3,chat=1' -> trọng số theo kịch bản"""
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario '{name}', expected one of {sorted(SCENARIOS)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+async def run_user(client: httpx.AsyncClient, recorder: Recorder, index: int, usernames: List[str], mix: Dict[str, float],
+                   think_time: float, start_delay: float, deadline: float, seed: int):
+    rng = random.Random(seed + index)
+    await asyncio.sleep(start_delay)
+    user = VirtualUser(client, recorder, usernames[index % len(usernames)], think_time, rng)
+    if not await user.login():
+        return
+    names, weights = list(mix), list(mix.values())
+    while time.perf_counter() < deadline:
+        await SCENARIOS[rng.choices(names, weights)[0]](user)
+        await user.think()
+
+async def run_load(base_url: str, users: int, duration: float, ramp_up: float, mix: Dict[str, float],
+                   think_time: float = 1.0, user_pool: int = 50, timeout: float = 120.0, seed: int = 42) -> Recorder:
+    """Chạy users người dùng ảo trong duration giây (khởi động dần trong ramp_up giây)"""
+    usernames = ["loadtest_admin"] + [f"loadtest_{i}" for i in range(1, user_pool)]
+    recorder = Recorder()
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        await asyncio.gather(*(
+            run_user(client, recorder, index, usernames, mix, think_time, ramp_up * index / max(users, 1), deadline, seed)
+            for index in range(users)
+        ))
+    recorder.finished_at = time.perf_counter()
+    return recorder
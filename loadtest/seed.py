@@ -0,0 +1,150 @@
+"""
+Tạo dữ liệu cho load test: metadata (users, roles, datasets, charts, dashboards, ...) và warehouse (bảng transactions)
+trên SQLite trong data dir. Dữ liệu sinh theo seed cố định để các lần chạy so sánh được với nhau.
+
+    python -m loadtest.seed --data-dir /tmp/bi-loadtest --rows 500000 --dashboards 5 --charts-per-dashboard 8
+"""
+import argparse
+import json
+import random
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+import bcrypt
+
+LOADTEST_PASSWORD = "loadtest"
+
+METADATA_SCHEMA = """
+CREATE TABLE users (username TEXT PRIMARY KEY, password TEXT, email TEXT, active INT DEFAULT 1, created_at TEXT);
+CREATE TABLE roles (id INTEGER PRIMARY KEY, role_name TEXT);
+CREATE TABLE user_roles (username TEXT, role_id INT);
+CREATE TABLE table_groups (id INTEGER PRIMARY KEY, group_name TEXT);
+CREATE TABLE tables (id INTEGER PRIMARY KEY, table_name TEXT, description TEXT, group_id INT);
+CREATE TABLE role_group_permissions (role_id INT, group_id INT);
+CREATE TABLE datasets (id INTEGER PRIMARY KEY, `database` TEXT, table_name TEXT, schema_name TEXT, profile TEXT, profiled_at TEXT);
+CREATE TABLE charts (id INTEGER PRIMARY KEY, name TEXT, dataset_id INT, query TEXT, config TEXT, owner TEXT, created_at TEXT, updated_at TEXT);
+CREATE TABLE dashboards (id INTEGER PRIMARY KEY, name TEXT, layout TEXT, owner TEXT, description TEXT, filters TEXT, created_at TEXT, updated_at TEXT);
+CREATE TABLE shared (resource_type TEXT, resource_id INT, shared_with TEXT, shared_by TEXT);
+CREATE TABLE comments (id INTEGER PRIMARY KEY, resource_type TEXT, resource_id INT, username TEXT, content TEXT, created_at TEXT);
+CREATE TABLE dataset_rollups (id INTEGER PRIMARY KEY, dataset_id INT, name TEXT, grain_columns TEXT, measures TEXT, time_column TEXT,
+    owner TEXT, row_count INT, watermark TEXT, refreshed_at TEXT, created_at TEXT);
+CREATE TABLE query_history (id TEXT PRIMARY KEY, username TEXT, timestamp TEXT, question TEXT, explanation TEXT, sql_query TEXT,
+    data TEXT, chart_type TEXT, chart_fig TEXT, chart_title TEXT, execution_time REAL);
+CREATE TABLE query_stats (id INTEGER PRIMARY KEY, window_start TEXT, fingerprint TEXT, source TEXT, sample_query TEXT, dataset_id INT,
+    chart_id INT, username TEXT, calls INT, total_time REAL, max_time REAL, total_rows INT, total_bytes INT, latency_buckets TEXT);
+"""
+
+WAREHOUSE_SCHEMA = """
+CREATE TABLE transactions (transaction_id INT, partner_id INT, amount REAL, status TEXT, payment_method TEXT, created_at TEXT);
+CREATE INDEX idx_transactions_created_at ON transactions (created_at);
+CREATE TABLE pg_namespace (nspname TEXT);
+INSERT INTO pg_namespace VALUES ('public');
+CREATE VIEW svv_tables AS
+    SELECT 'public' AS table_schema, name AS table_name, 'BASE TABLE' AS table_type
+    FROM sqlite_master WHERE type = 'table' AND name NOT IN ('pg_namespace');
+CREATE VIEW svv_columns AS
+    SELECT 'public' AS table_schema, m.name AS table_name, p.name AS column_name, lower(p.type) AS data_type, p.cid + 1 AS ordinal_position
+    FROM sqlite_master m JOIN pragma_table_info(m.name) p
+    WHERE m.type = 'table' AND m.name NOT IN ('pg_namespace');
+"""
+
+# Các chart mẫu trên bảng transactions: (tên, label_fields, value_fields, dimension_field, config)
+CHART_TEMPLATES = [
+    ("Doanh thu theo ngày", ["created_day"], ["SUM(amount)"], None, {"sortOrder": "asc"}),
+    ("Giao dịch theo trạng thái", ["status"], ["COUNT(transaction_id)"], None, {}),
+    ("Top đối tác", ["partner_id"], ["SUM(amount)"], None, {"limit": 20, "sortOrder": "desc"}),
+    ("Số giao dịch theo đối tác", ["partner_id"], ["COUNT(transaction_id)"], None, {"limit": 20, "sortOrder": "desc"}),
+    ("Doanh thu theo phương thức", ["payment_method"], ["SUM(amount)", "AVG(amount)"], None, {}),
+    ("Trạng thái theo phương thức", ["payment_method"], ["COUNT(transaction_id)"], "status", {}),
+    ("Doanh thu theo ngày và trạng thái", ["created_day"], ["SUM(amount)"], "status", {}),
+    ("Giá trị lớn nhất theo đối tác", ["partner_id"], ["MAX(amount)"], None, {"limit": 50, "sortOrder": "desc"}),
+]
+
+STATUSES = ["success", "failed", "pending", "refunded"]
+PAYMENT_METHODS = ["card", "wallet", "bank_transfer", "qr"]
+
+def seed(data_dir: str, rows: int = 200000, dashboards: int = 5, charts_per_dashboard: int = 8, users: int = 50, seed_value: int = 42):
+    """Tạo lại metadata.sqlite và warehouse.sqlite trong data_dir"""
+    rng = random.Random(seed_value)
+    directory = Path(data_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+    for name in ("metadata.sqlite", "warehouse.sqlite"):
+        (directory / name).unlink(missing_ok=True)
+
+    warehouse = sqlite3.connect(directory / "warehouse.sqlite")
+    warehouse.execute("PRAGMA journal_mode=WAL")
+    warehouse.executescript(WAREHOUSE_SCHEMA)
+    # created_day: label theo ngày cho chart time series (tương đương cột date trong warehouse thật)
+    warehouse.execute("ALTER TABLE transactions ADD COLUMN created_day TEXT")
+    start = datetime(2024, 1, 1)
+    batch = []
+    for transaction_id in range(rows):
+        created_at = start + timedelta(seconds=rng.randint(0, 180 * 86400))
+        batch.append((
+            transaction_id, rng.randint(1, 500), round(rng.lognormvariate(4, 1), 2), rng.choices(STATUSES, [85, 8, 5, 2])[0],
+            rng.choice(PAYMENT_METHODS), created_at.isoformat(sep=" "), created_at.date().isoformat()
+        ))
+        if len(batch) >= 50000:
+            warehouse.executemany("INSERT INTO transactions VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+            batch = []
+    warehouse.executemany("INSERT INTO transactions VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+    warehouse.commit()
+    warehouse.close()
+
+    metadata = sqlite3.connect(directory / "metadata.sqlite")
+    metadata.execute("PRAGMA journal_mode=WAL")
+    metadata.executescript(METADATA_SCHEMA)
+    now = datetime.now().isoformat(sep=" ", timespec="seconds")
+    password = bcrypt.hashpw(LOADTEST_PASSWORD.encode("utf-8"), bcrypt.gensalt(10)).decode("utf-8")
+    metadata.executemany("INSERT INTO roles (id, role_name) VALUES (?, ?)", [(1, "superadmin"), (2, "analyst")])
+    metadata.execute("INSERT INTO table_groups (id, group_name) VALUES (1, 'payments')")
+    metadata.execute("INSERT INTO tables (table_name, description, group_id) VALUES ('transactions', 'Giao dịch thanh toán', 1)")
+    # Chat kiểm tra quyền theo nhóm bảng của role (chỉ role 'admin' được bỏ qua): cấp nhóm payments cho cả hai role
+    metadata.executemany("INSERT INTO role_group_permissions (role_id, group_id) VALUES (?, ?)", [(1, 1), (2, 1)])
+    usernames = ["loadtest_admin"] + [f"loadtest_{i}" for i in range(1, users)]
+    metadata.executemany("INSERT INTO users VALUES (?, ?, ?, 1, ?)", [(name, password, f"{name}@example.com", now) for name in usernames])
+    metadata.executemany("INSERT INTO user_roles VALUES (?, ?)", [(name, 1 if name == "loadtest_admin" else 2) for name in usernames])
+    metadata.execute("INSERT INTO datasets (id, `database`, table_name, schema_name) VALUES (1, 'dev', 'transactions', 'public')")
+
+    chart_id = 0
+    for dashboard_id in range(1, dashboards + 1):
+        layout = []
+        for position in range(charts_per_dashboard):
+            chart_id += 1
+            name, label_fields, value_fields, dimension_field, config = CHART_TEMPLATES[(chart_id - 1) % len(CHART_TEMPLATES)]
+            query = {
+                "dataset_id": 1, "chart_type": "bar", "label_fields": label_fields, "value_fields": value_fields,
+                "filters": {}, "dimension_field": dimension_field
+            }
+            metadata.execute(
+                "INSERT INTO charts VALUES (?, ?, 1, ?, ?, 'loadtest_admin', ?, ?)",
+                (chart_id, f"{name} #{chart_id}", json.dumps(query), json.dumps({"colorScheme": "tableau10", **config}), now, now)
+            )
+            layout.append({"i": str(chart_id), "x": (position % 2) * 6, "y": position // 2 * 4, "w": 6, "h": 4,
+                           "type": "chart", "content": {"chart_id": chart_id}})
+        metadata.execute(
+            "INSERT INTO dashboards VALUES (?, ?, ?, 'loadtest_admin', ?, NULL, ?, ?)",
+            (dashboard_id, f"Dashboard {dashboard_id}", json.dumps(layout), "Load test dashboard", now, now)
+        )
+        # Mọi user đều xem được dashboard và các chart của nó qua bảng shared (đường kiểm tra quyền giống user thật)
+        metadata.executemany(
+            "INSERT INTO shared VALUES (?, ?, ?, 'loadtest_admin')",
+            [("dashboard", dashboard_id, name) for name in usernames[1:]]
+            + [("chart", int(item["i"]), name) for item in layout for name in usernames[1:]]
+        )
+    metadata.commit()
+    metadata.close()
+    return {"rows": rows, "dashboards": dashboards, "charts": chart_id, "users": len(usernames)}
+
+def main():
+    parser = argparse.ArgumentParser(description="Tạo dữ liệu SQLite cho load test")
+    parser.add_argument("--data-dir", default="/tmp/bi-loadtest")
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--dashboards", type=int, default=5)
+    parser.add_argument("--charts-per-dashboard", type=int, default=8)
+    parser.add_argument("--users", type=int, default=50)
+    args = parser.parse_args()
+    print(seed(args.data_dir, args.rows, args.dashboards, args.charts_per_dashboard, args.users))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""
+Chạy FastAPI app trên các backend giả lập của loadtest.standins (tạo dữ liệu nếu data dir còn trống).
+
+    python -m loadtest.server --data-dir /tmp/bi-loadtest --port 8001 --llm-latency 0.8 --warehouse-latency 0.05
+"""
+import argparse
+from pathlib import Path
+import uvicorn
+from loadtest import seed, standins
+
+def main():
+    parser = argparse.ArgumentParser(description="Chạy BI service trên backend giả lập để load test")
+    parser.add_argument("--data-dir", default="/tmp/bi-loadtest")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--rows", type=int, default=200000, help="Số dòng bảng transactions khi tạo dữ liệu")
+    parser.add_argument("--reseed", action="store_true", help="Tạo lại dữ liệu kể cả khi đã có")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Độ trễ stub LLM (giây)")
+    parser.add_argument("--llm-jitter", type=float, default=0.0, help="Dao động ± của độ trễ LLM (giây)")
+    parser.add_argument("--warehouse-latency", type=float, default=0.0, help="Độ trễ thêm mỗi câu lệnh warehouse (giây)")
+    parser.add_argument("--sso-latency", type=float, default=0.0, help="Độ trễ mỗi request tới SSO giả lập (giây)")
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.reseed or not (Path(args.data_dir) / "metadata.sqlite").exists():
+        print("seeding", seed.seed(args.data_dir, rows=args.rows))
+
+    standins.install(args.data_dir, warehouse_latency=args.warehouse_latency,
+                     llm_latency=args.llm_latency, llm_jitter=args.llm_jitter, sso_latency=args.sso_latency)
+    from app.main import app
+    # Truyền object app (không phải import string) để các patch của standins có hiệu lực; vì vậy chỉ chạy một worker
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning", access_log=False)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+SSO server giả lập (Appota SSO) cho load test và test: chạy HTTP server trong thread nền, trả lời
+/api/token, /api/generate/access_token và /api/token/valid như AppotaSSO mong đợi.
+
+Authorization code là username đã seed (ví dụ "loadtest_3"); user_info trả về email "<code>@example.com"
+nên check_sso_user_exists tìm được user. Code hoặc access token không hợp lệ nhận về payload rỗng.
+
+    with StubSSOServer(latency=0.05) as sso:
+        sso_client = AppotaSSO(base_url=sso.url)
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import urlencode
+
+TOKEN_PREFIX = "stub-sso-"
+EMAIL_DOMAIN = "example.com"
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_Server"
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return self._send(400, {"error": "invalid JSON"})
+        stub = self.server.stub
+        stub.record(self.path)
+        if stub.latency:
+            time.sleep(stub.latency)
+        if self.path == "/api/token":
+            query = urlencode({"client_id": payload.get("client_id", ""), "redirect_uri": payload.get("redirect_uri", ""),
+                               "response_type": payload.get("response_type", "code")})
+            return self._send(200, {"redirect_uri": f"{stub.url}/authorize?{query}"})
+        if self.path == "/api/generate/access_token":
+            code = payload.get("authorization_code")
+            return self._send(200, {"access_token": f"{TOKEN_PREFIX}{code}"} if code else {})
+        if self.path == "/api/token/valid":
+            token = payload.get("access_token") or ""
+            if not token.startswith(TOKEN_PREFIX):
+                return self._send(200, {"user_info": None})
+            username = token[len(TOKEN_PREFIX):]
+            return self._send(200, {"user_info": {"email": f"{username}@{EMAIL_DOMAIN}", "name": username, "avatar": None}})
+        self._send(404, {"error": f"unknown path {self.path}"})
+
+    def _send(self, status: int, body: Dict):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    stub: "StubSSOServer"
+
+class StubSSOServer:
+    """SSO server giả lập chạy trong thread nền; port=0 chọn port trống. calls đếm số request theo path"""
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[_Server] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def record(self, path: str):
+        with self._lock:
+            self.calls[path] = self.calls.get(path, 0) + 1
+
+    def start(self) -> "StubSSOServer":
+        self._server = _Server((self.host, self.port), _Handler)
+        self._server.stub = self
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-sso", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "StubSSOServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
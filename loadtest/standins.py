@@ -0,0 +1,267 @@
+"""
+Backend giả lập cho load test: MySQL, Redshift và ClickHouse chạy trên SQLite (file trong data dir),
+Redis bằng fakeredis, bộ chuyển câu hỏi -> SQL (gemini/openai) bằng stub xác định với độ trễ cấu hình được
+và Appota SSO bằng loadtest.sso.StubSSOServer.
+
+install() phải được gọi trước khi import app.main (redis_client được tạo lúc import).
+"""
+import hashlib
+import os
+import random
+import re
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+from loadtest.sso import StubSSOServer
+
+# Câu hỏi chat mẫu -> SQL (dialect chung của ClickHouse và SQLite); stub chọn theo hash của câu hỏi
+CHAT_TEMPLATES: List[Dict] = [
+    {
+        "sql_query": "SELECT status, COUNT(*) AS transactions, SUM(amount) AS amount FROM transactions GROUP BY status",
+        "chart_title": "Giao dịch theo trạng thái",
+        "suggested_chart_type": "Pie Chart",
+        "columns": {"status": {"display_name": "Trạng thái"}, "transactions": {"display_name": "Số giao dịch"}, "amount": {"display_name": "Doanh thu"}},
+    },
+    {
+        "sql_query": "SELECT partner_id, SUM(amount) AS amount FROM transactions GROUP BY partner_id ORDER BY amount DESC LIMIT 20",
+        "chart_title": "Top đối tác theo doanh thu",
+        "suggested_chart_type": "Bar Chart",
+        "columns": {"partner_id": {"display_name": "Đối tác"}, "amount": {"display_name": "Doanh thu"}},
+    },
+    {
+        "sql_query": "SELECT substr(created_at, 1, 10) AS day, SUM(amount) AS amount FROM transactions GROUP BY day ORDER BY day",
+        "chart_title": "Doanh thu theo ngày",
+        "suggested_chart_type": "Line Chart",
+        "columns": {"day": {"display_name": "Ngày"}, "amount": {"display_name": "Doanh thu"}},
+    },
+    {
+        "sql_query": "SELECT payment_method, status, COUNT(*) AS transactions FROM transactions GROUP BY payment_method, status",
+        "chart_title": "Giao dịch theo phương thức thanh toán",
+        "suggested_chart_type": "Bar Chart",
+        "columns": {"payment_method": {"display_name": "Phương thức"}, "transactions": {"display_name": "Số giao dịch"}},
+    },
+]
+
+_settings = {"data_dir": None, "warehouse_latency": 0.0, "llm_latency": 0.0, "llm_jitter": 0.0}
+# SSO giả lập do install() khởi động
+sso_server: Optional[StubSSOServer] = None
+
+def metadata_path() -> str:
+    return str(Path(_settings["data_dir"]) / "metadata.sqlite")
+
+def warehouse_path() -> str:
+    return str(Path(_settings["data_dir"]) / "warehouse.sqlite")
+
+_LEFT = re.compile(r"\bLEFT\(([^,()]+),\s*(\d+)\)", re.IGNORECASE)
+_SCHEMA_PREFIX = re.compile(r'\b(?:"public"|public|pg_catalog)\.', re.IGNORECASE)
+
+def translate_mysql(sql: str) -> str:
+    """Chuyển các cú pháp MySQL mà app dùng sang SQLite"""
+    sql = sql.replace("%s", "?")
+    return re.sub(r"\bNOW\(\)", "CURRENT_TIMESTAMP", sql, flags=re.IGNORECASE)
+
+def translate_warehouse(sql: str) -> str:
+    """Chuyển các cú pháp Redshift/ClickHouse mà app dùng sang SQLite (bảng nằm trong schema main)"""
+    sql = translate_mysql(sql)
+    sql = _SCHEMA_PREFIX.sub("", sql)
+    sql = _LEFT.sub(r"substr(\1, 1, \2)", sql)
+    sql = re.sub(r"\bAPPROXIMATE\s+COUNT", "COUNT", sql, flags=re.IGNORECASE)
+    return sql.replace("RANDOM() <", "(ABS(RANDOM()) % 1000000) / 1000000.0 <")
+
+class SQLiteCursor:
+    """Cursor DB-API trên SQLite, hỗ trợ dictionary=True (mysql.connector) và cursor_factory/name (psycopg2)"""
+    def __init__(self, connection: "SQLiteConnection", dictionary: bool = False):
+        self.connection = connection
+        self.dictionary = dictionary
+        self._cursor = connection.raw.cursor()
+        self.description = None
+        self.itersize = 2000
+        self.arraysize = 1
+
+    def execute(self, sql: str, params: Optional[Sequence] = None):
+        statement = sql.strip()
+        upper = statement[:16].upper()
+        if upper.startswith("SET ") or upper.startswith("KILL "):
+            self.description = None
+            return
+        if upper.startswith("EXPLAIN"):
+            # Redshift EXPLAIN: plan có node leader (Merge/Sort, cost ~1e12) trên node aggregate có cost nhỏ
+            self._cursor.execute(
+                "SELECT 'XN Merge  (cost=1000000000200.00..1000000000202.50 rows=1000 width=32)' "
+                "UNION ALL SELECT '  ->  XN Network  (cost=1000000000200.00..1000000000202.50 rows=1000 width=32)' "
+                "UNION ALL SELECT '        ->  XN Sort  (cost=1000000000200.00..1000000000202.50 rows=1000 width=32)' "
+                "UNION ALL SELECT '              ->  XN HashAggregate  (cost=100.00..200.00 rows=1000 width=32)'"
+            )
+            self.description = self._cursor.description
+            return
+        if self.connection.warehouse and _settings["warehouse_latency"]:
+            time.sleep(_settings["warehouse_latency"])
+        translate = translate_warehouse if self.connection.warehouse else translate_mysql
+        self._cursor.execute(translate(statement), tuple(params or ()))
+        self.description = self._cursor.description
+
+    def executemany(self, sql: str, seq_of_params: Sequence[Sequence]):
+        translate = translate_warehouse if self.connection.warehouse else translate_mysql
+        self._cursor.executemany(translate(sql), [tuple(params) for params in seq_of_params])
+
+    def _rows(self, rows: List[tuple]) -> List:
+        if not self.dictionary:
+            return [tuple(row) for row in rows]
+        columns = [column[0] for column in self._cursor.description]
+        return [dict(zip(columns, row)) for row in rows]
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        return None if row is None else self._rows([row])[0]
+
+    def fetchmany(self, size: Optional[int] = None):
+        return self._rows(self._cursor.fetchmany(size or self.arraysize))
+
+    def fetchall(self):
+        return self._rows(self._cursor.fetchall())
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self) -> Optional[int]:
+        return self._cursor.lastrowid
+
+    def close(self):
+        self._cursor.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class SQLiteConnection:
+    autocommit = True
+
+    def __init__(self, path: str, warehouse: bool = False, dictionary: bool = False):
+        self.raw = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.warehouse = warehouse
+        self.dictionary = dictionary
+        self.closed = 0
+
+    def cursor(self, dictionary: bool = False, cursor_factory=None, name: Optional[str] = None, **kwargs) -> SQLiteCursor:
+        return SQLiteCursor(self, dictionary or cursor_factory is not None or self.dictionary)
+
+    def commit(self):
+        self.raw.commit()
+
+    def rollback(self):
+        self.raw.rollback()
+
+    def cancel(self):
+        # Tương đương pg_cancel_backend: dừng câu lệnh đang chạy
+        self.raw.interrupt()
+
+    @property
+    def in_transaction(self) -> bool:
+        return self.raw.in_transaction
+
+    def ping(self, reconnect: bool = False):
+        self.raw.execute("SELECT 1")
+
+    def is_connected(self) -> bool:
+        return not self.closed
+
+    def close(self):
+        if not self.closed:
+            self.raw.close()
+            self.closed = 1
+
+class _ProfileInfo:
+    def __init__(self, rows: int):
+        self.rows = rows
+        self.bytes = 0
+
+class _LastQuery:
+    def __init__(self, rows: int):
+        self.profile_info = _ProfileInfo(rows)
+
+class _ClickHouseConnection(SQLiteConnection):
+    """Tương ứng client.connection của clickhouse_driver (connected, force_connect)"""
+    @property
+    def connected(self) -> bool:
+        return not self.closed
+
+    def force_connect(self):
+        pass
+
+class SQLiteClickHouseClient:
+    """Thay clickhouse_driver.Client: execute(..., with_column_types=True) trên warehouse SQLite"""
+    def __init__(self, *args, **kwargs):
+        self.connection = _ClickHouseConnection(warehouse_path(), warehouse=True)
+        self.last_query = None
+
+    def execute(self, sql: str, params=None, with_column_types: bool = False, **kwargs):
+        cursor = self.connection.cursor()
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        self.last_query = _LastQuery(len(rows))
+        if with_column_types:
+            return rows, [(column[0], "String") for column in cursor.description or []]
+        return rows
+
+    def disconnect(self):
+        self.connection.close()
+
+def stub_convert_to_sql(question: str, username: str) -> tuple:
+    """
+    Stub xác định cho gemini/openai convert_to_sql: cùng câu hỏi luôn ra cùng SQL,
+    chờ llm_latency ± llm_jitter giây để mô phỏng thời gian gọi LLM.
+    """
+    digest = int(hashlib.sha256(question.encode("utf-8")).hexdigest(), 16)
+    template = CHAT_TEMPLATES[digest % len(CHAT_TEMPLATES)]
+    latency = _settings["llm_latency"]
+    if _settings["llm_jitter"]:
+        latency += random.uniform(-_settings["llm_jitter"], _settings["llm_jitter"])
+    if latency > 0:
+        time.sleep(latency)
+    return (
+        template["sql_query"],
+        f"Truy vấn mẫu cho câu hỏi: {question}",
+        template["chart_title"],
+        template["suggested_chart_type"],
+        ["Doanh thu theo ngày?", "Top đối tác theo doanh thu?"],
+        template["columns"],
+    )
+
+def install(data_dir: str, warehouse_latency: float = 0.0, llm_latency: float = 0.5, llm_jitter: float = 0.0,
+            sso_latency: float = 0.0):
+    """Cài các backend giả lập vào process hiện tại; gọi trước khi import app.main"""
+    global sso_server
+    _settings.update(data_dir=data_dir, warehouse_latency=warehouse_latency, llm_latency=llm_latency, llm_jitter=llm_jitter)
+    os.environ["APP_ENV"] = "local"
+
+    # auth_service đọc URL_AUTHENICATION_SERVICE lúc import
+    sso_server = StubSSOServer(latency=sso_latency).start()
+    os.environ["URL_AUTHENICATION_SERVICE"] = sso_server.url
+
+    import fakeredis
+    import redis
+    server = fakeredis.FakeServer()
+    redis.StrictRedis = lambda *args, **kwargs: fakeredis.FakeStrictRedis(server=server, decode_responses=kwargs.get("decode_responses", False))
+    redis.Redis = redis.StrictRedis
+
+    import mysql.connector
+    import psycopg2
+    mysql.connector.connect = lambda *args, **kwargs: SQLiteConnection(metadata_path())
+    psycopg2.connect = lambda *args, cursor_factory=None, **kwargs: SQLiteConnection(
+        warehouse_path(), warehouse=True, dictionary=cursor_factory is not None
+    )
+
+    import clickhouse_driver
+    clickhouse_driver.Client = SQLiteClickHouseClient
+
+    from app.utils import gemini, openai
+    gemini.convert_to_sql = stub_convert_to_sql
+    openai.convert_to_sql = stub_convert_to_sql